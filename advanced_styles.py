@@ -1,6 +1,11 @@
-from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup, QRect, QPoint, QSize
-from PyQt5.QtWidgets import QGraphicsDropShadowEffect, QPushButton
-from PyQt5.QtGui import QColor
+import colorsys
+import sys
+
+from PyQt5.QtCore import (Qt, QAbstractAnimation, QEasingCurve, QEvent, QPropertyAnimation,
+                          QSize, pyqtProperty)
+from PyQt5.QtWidgets import (QGraphicsDropShadowEffect, QPushButton, QStyle,
+                             QStyleOptionButton, QStylePainter)
+from PyQt5.QtGui import QColor, QImage
 
 # Advanced UI Styles
 ADVANCED_STYLES = """
@@ -68,14 +73,14 @@ QLabel#albumArt {
 }
 
 /* Interactive Playlist */
-QListWidget::item:selected {
+QListView#playlistView::item:selected {
     background: rgba(123, 95, 255, 0.3);
     border-left: 3px solid #7d5fff;
     color: white;
     font-weight: bold;
 }
 
-QListWidget::item:hover {
+QListView#playlistView::item:hover {
     background: rgba(123, 95, 255, 0.1);
 }
 
@@ -137,71 +142,126 @@ QLineEdit#searchBar:focus {
 """
 
 class AnimatedButton(QPushButton):
+    """Push button with a hover grow and an optional idle "pulse".
+
+    Both effects are applied when painting: the button is drawn inset by
+    HOVER_GROW pixels at rest, grows into that margin on hover and bobs up
+    within it while pulsing. Its geometry never changes, so animating it
+    costs no relayout, and a repaint is only requested when the drawn
+    rectangle moves by a whole pixel. The pulse stops while the button is
+    hidden or its window minimized.
+    """
+
+    HOVER_GROW = 2  # Pixels the button grows by on each side when hovered
+    PULSE_LIFT = 2  # Pixels the button rises by at the top of a pulse
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._grow = 0.0
+        self._lift = 0.0
+        self._pulsing = False
+        self._watched_window = None
         self.setup_animations()
-        self._scale = 1.0
 
     def setup_animations(self):
         # Hover animation
-        self.hover_anim = QPropertyAnimation(self, b"geometry")
+        self.hover_anim = QPropertyAnimation(self, b"grow", self)
         self.hover_anim.setDuration(200)
         self.hover_anim.setEasingCurve(QEasingCurve.OutQuad)
 
-        # Pulse animation
-        self.pulse_anim = QPropertyAnimation(self, b"pos")
+        # Pulse animation: up and back down once per loop
+        self.pulse_anim = QPropertyAnimation(self, b"lift", self)
         self.pulse_anim.setDuration(1000)
         self.pulse_anim.setLoopCount(-1)
+        self.pulse_anim.setStartValue(0.0)
+        self.pulse_anim.setKeyValueAt(0.5, float(self.PULSE_LIFT))
+        self.pulse_anim.setEndValue(0.0)
         self.pulse_anim.setEasingCurve(QEasingCurve.InOutQuad)
 
-    def enterEvent(self, event):
-        # Store original geometry
-        original_geometry = self.geometry()
-        
-        # Calculate new geometry with slight expansion
-        new_geometry = QRect(
-            original_geometry.x() - 2,
-            original_geometry.y() - 2,
-            original_geometry.width() + 4,
-            original_geometry.height() + 4
-        )
-        
-        # Start hover animation
-        self.hover_anim.setStartValue(original_geometry)
-        self.hover_anim.setEndValue(new_geometry)
+    def _set_grow(self, value):
+        old, self._grow = self._grow, value
+        if round(old) != round(value):
+            self.update()
+
+    def _set_lift(self, value):
+        old, self._lift = self._lift, value
+        if round(old) != round(value):
+            self.update()
+
+    grow = pyqtProperty(float, lambda self: self._grow, _set_grow)
+    lift = pyqtProperty(float, lambda self: self._lift, _set_lift)
+
+    def sizeHint(self):
+        return super().sizeHint() + QSize(2 * self.HOVER_GROW, 2 * self.HOVER_GROW)
+
+    def paintEvent(self, event):
+        inset = self.HOVER_GROW - round(self._grow)
+        lift = min(round(self._lift), inset)
+        option = QStyleOptionButton()
+        self.initStyleOption(option)
+        option.rect = self.rect().adjusted(inset, inset - lift, -inset, -inset - lift)
+        painter = QStylePainter(self)
+        painter.drawControl(QStyle.CE_PushButton, option)
+
+    def _animate_grow(self, target):
+        # Start from wherever the previous animation left off, so quick
+        # enter/leave sequences never accumulate
+        self.hover_anim.stop()
+        self.hover_anim.setStartValue(self._grow)
+        self.hover_anim.setEndValue(target)
         self.hover_anim.start()
-        
+
+    def enterEvent(self, event):
+        self._animate_grow(float(self.HOVER_GROW))
         super().enterEvent(event)
 
     def leaveEvent(self, event):
-        # Return to original size
-        original_geometry = self.geometry()
-        new_geometry = QRect(
-            original_geometry.x() + 2,
-            original_geometry.y() + 2,
-            original_geometry.width() - 4,
-            original_geometry.height() - 4
-        )
-        
-        self.hover_anim.setStartValue(original_geometry)
-        self.hover_anim.setEndValue(new_geometry)
-        self.hover_anim.start()
-        
+        self._animate_grow(0.0)
         super().leaveEvent(event)
 
     def startPulse(self):
-        # Store original position
-        self._original_pos = self.pos()
-        
-        # Set up pulse animation
-        self.pulse_anim.setStartValue(self._original_pos)
-        self.pulse_anim.setEndValue(QPoint(self._original_pos.x(), self._original_pos.y() - 2))
-        self.pulse_anim.start()
+        self._pulsing = True
+        self._update_pulse()
 
     def stopPulse(self):
-        self.pulse_anim.stop()
-        if hasattr(self, '_original_pos'):
-            self.move(self._original_pos)
+        self._pulsing = False
+        self._update_pulse()
+
+    def _update_pulse(self):
+        window = self.window()
+        running = self._pulsing and self.isVisible() and not window.isMinimized()
+        if running:
+            if self.pulse_anim.state() == QAbstractAnimation.Paused:
+                self.pulse_anim.resume()
+            elif self.pulse_anim.state() == QAbstractAnimation.Stopped:
+                self.pulse_anim.start()
+        elif self._pulsing:
+            if self.pulse_anim.state() == QAbstractAnimation.Running:
+                self.pulse_anim.pause()
+        else:
+            self.pulse_anim.stop()
+            self._set_lift(0.0)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        window = self.window()
+        if window is not self._watched_window:
+            # Minimizing doesn't hide child widgets, so watch the window's state
+            if self._watched_window is not None:
+                self._watched_window.removeEventFilter(self)
+            window.installEventFilter(self)
+            self._watched_window = window
+        self._update_pulse()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._update_pulse()
+
+    def eventFilter(self, obj, event):
+        if obj is self._watched_window and event.type() == QEvent.WindowStateChange:
+            self._update_pulse()
+        return False
+
 
 def create_shadow_effect(widget, blur_radius=15, color=Qt.black, offset=(0, 3)):
     shadow = QGraphicsDropShadowEffect()
@@ -211,25 +271,106 @@ def create_shadow_effect(widget, blur_radius=15, color=Qt.black, offset=(0, 3)):
     widget.setGraphicsEffect(shadow)
     return shadow
 
-def extract_colors_from_art(image_path):
-    """Extract dominant colors from album art"""
-    from PIL import Image
-    import colorsys
-    
+DEFAULT_ACCENT = "#7d5fff"
+PALETTE_SAMPLE = 64  # Longest side of the pixel grid the palette is computed from
+
+# Byte offsets of red, green and blue within a 32-bit QImage pixel
+_RGB_OFFSETS = (2, 1, 0) if sys.byteorder == "little" else (1, 2, 3)
+
+
+def _load_art(art):
+    """QImage from a QImage, encoded image bytes or a file path"""
+    if isinstance(art, QImage):
+        return art
+    image = QImage()
+    if isinstance(art, str):
+        image.load(art)
+    elif art:
+        image.loadFromData(art)
+    return image
+
+
+def _pixel_view(image):
+    """(height, width, 4) uint8 array over the QImage's own pixel buffer"""
+    import numpy as np
+
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    rows = np.frombuffer(ptr, np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+
+def extract_palette(art, colors=5, iterations=8):
+    """Dominant colors of album art as [("#rrggbb", share)], most common first.
+
+    art may be a QImage, encoded image bytes or a file path. Pixels are
+    read in place from the image buffer through a strided NumPy view of at
+    most PALETTE_SAMPLE x PALETTE_SAMPLE pixels, quantized to 5 bits per
+    channel and histogrammed; k-means then runs over the occupied bins
+    weighted by their counts, so the cost does not depend on the cover size.
+    """
+    import numpy as np
+
+    image = _load_art(art)
+    if image.isNull():
+        return []
+    if image.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32,
+                              QImage.Format_ARGB32_Premultiplied):
+        image = image.convertToFormat(QImage.Format_RGB32)
+
+    pixels = _pixel_view(image)
+    step = max(1, max(image.width(), image.height()) // PALETTE_SAMPLE)
+    sample = pixels[::step, ::step]
+    red, green, blue = (sample[:, :, offset].ravel() >> 3 for offset in _RGB_OFFSETS)
+    bins = (red.astype(np.int32) << 10) | (green.astype(np.int32) << 5) | blue
+    counts = np.bincount(bins, minlength=1 << 15)
+
+    used = np.flatnonzero(counts)
+    weights = counts[used].astype(np.float64)
+    points = np.stack(((used >> 10) & 31, (used >> 5) & 31, used & 31), axis=1) * 8.0 + 4.0
+
+    # Seed with the most common bins, then refine
+    k = min(colors, len(used))
+    centers = points[np.argsort(weights)[::-1][:k]]
+    for _ in range(iterations):
+        # |p - c|^2 without the |p|^2 term, which is the same for every center
+        distances = (centers ** 2).sum(axis=1) - 2.0 * points @ centers.T
+        labels = distances.argmin(axis=1)
+        totals = np.bincount(labels, weights=weights, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=weights * points[:, channel], minlength=k)
+                         for channel in range(3)], axis=1)
+        centers = np.where(totals[:, None] > 0, sums / np.maximum(totals, 1)[:, None], centers)
+
+    ranked = [i for i in np.argsort(totals)[::-1] if totals[i] > 0]
+    shares = totals / totals.sum()
+    return [("#%02x%02x%02x" % tuple(int(round(c)) for c in centers[i]), float(shares[i]))
+            for i in ranked]
+
+
+def extract_colors_from_art(art):
+    """Accent color for album art as "#rrggbb", DEFAULT_ACCENT if there is none.
+
+    Picks the palette color with the best mix of coverage and saturation,
+    skipping near-black, near-white and grey ones, and adjusts its
+    lightness so it reads well against both themes.
+    """
     try:
-        img = Image.open(image_path)
-        img = img.resize((50, 50))
-        colors = img.getcolors(50*50)
-        
-        if not colors:
-            return "#7d5fff"
-        
-        dominant_color = max(colors, key=lambda x: x[0])[1]
-        r, g, b = dominant_color
-        
-        h, l, s = colorsys.rgb_to_hls(r/255, g/255, b/255)
-        base_color = f"hsl({int(h*360)}, {int(s*100)}%, {int(l*100)}%)"
-        
-        return base_color
-    except:
-        return "#7d5fff" 
\ No newline at end of file
+        palette = extract_palette(art)
+    except Exception as e:
+        print(f"Error extracting colors: {str(e)}")
+        return DEFAULT_ACCENT
+
+    best, best_score = None, 0.0
+    for color, share in palette:
+        h, l, s = colorsys.rgb_to_hls(*(c / 255 for c in QColor(color).getRgb()[:3]))
+        if l < 0.12 or l > 0.92 or s < 0.15:
+            continue
+        score = share * (0.2 + s)
+        if score > best_score:
+            best, best_score = (h, l, s), score
+    if best is None:
+        return DEFAULT_ACCENT
+
+    h, l, s = best
+    r, g, b = colorsys.hls_to_rgb(h, min(max(l, 0.4), 0.65), max(s, 0.45))
+    return "#%02x%02x%02x" % (round(r * 255), round(g * 255), round(b * 255))
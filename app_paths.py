@@ -0,0 +1,26 @@
+import os
+import sys
+
+APP_DIR_NAME = "ProfessionalMusicPlayer"
+
+
+def user_data_dir():
+    """Return the per-user directory for the library database and caches.
+
+    MUSIC_PLAYER_DATA_DIR overrides the platform default (benchmarks use it
+    to keep their throwaway libraries out of the real one).
+    """
+    override = os.environ.get("MUSIC_PLAYER_DATA_DIR")
+    if override:
+        os.makedirs(override, exist_ok=True)
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+
+    path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
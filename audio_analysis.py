@@ -0,0 +1,221 @@
+import hashlib
+import math
+import os
+
+from app_paths import user_data_dir
+
+WAVEFORM_BINS = 800  # Columns in a stored waveform
+ANALYSIS_RATE = 44100  # Tracks are decoded (and resampled) to this rate
+
+# ITU-R BS.1770 loudness measurement: 400 ms blocks every 100 ms, gated
+SEGMENT_SECONDS = 0.1
+BLOCK_SEGMENTS = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+FFT_SIZE = 1 << 16  # Chunk length for applying the K-weighting filter
+FILTER_WARMUP = 1 << 13  # Samples of overlap, much longer than the filter's response
+WAVEFORM_CHUNK = 1 << 20  # Samples converted to float at a time when computing a waveform
+
+
+def analysis_dtype(bins=WAVEFORM_BINS):
+    """Record stored per track: integrated loudness plus peak/RMS columns"""
+    import numpy as np
+
+    return np.dtype([("loudness", "<f4"), ("peak", "<f2", (bins,)), ("rms", "<f2", (bins,))])
+
+
+def decode(file_path):
+    """Decode an audio file to a (samples, channels) int16 array at ANALYSIS_RATE.
+
+    The array is a view of the decoded pygame Sound rather than a copy, so
+    a track is held in memory once. Uses pygame's mixer with the dummy
+    audio driver, so it must run in a process of its own (see init_worker)
+    rather than next to playback.
+    """
+    import pygame
+
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(frequency=ANALYSIS_RATE, size=-16, channels=2)
+    return pygame.sndarray.samples(pygame.mixer.Sound(file_path))
+
+
+def waveform(samples, bins=WAVEFORM_BINS):
+    """Per-column peak and RMS of int16 samples, both scaled to 0..1.
+
+    Columns are computed a group at a time, so only about WAVEFORM_CHUNK
+    samples are ever converted to float, however long the track.
+    """
+    import numpy as np
+
+    count = len(samples)
+    if count < bins:
+        samples = np.concatenate((samples, np.zeros((bins - count, samples.shape[1]),
+                                                    samples.dtype)))
+        count = bins
+    bounds = np.linspace(0, count, bins + 1).astype(np.int64)
+    bounds[-1] = count
+    peak = np.zeros(bins)
+    rms = np.zeros(bins)
+    group = max(1, WAVEFORM_CHUNK * bins // count)  # Columns per chunk
+    for first in range(0, bins, group):
+        last = min(first + group, bins)
+        chunk = samples[bounds[first]:bounds[last]]
+        starts = bounds[first:last] - bounds[first]
+        lengths = np.diff(bounds[first:last + 1])
+
+        # Work on one channel column at a time; reducing across a short axis is slow
+        channels = chunk.shape[1]
+        mono = np.zeros(len(chunk), np.float32)
+        for channel in range(channels):
+            column = chunk[:, channel].astype(np.float32)
+            mono += column
+            np.maximum(peak[first:last], np.maximum.reduceat(np.abs(column), starts),
+                       out=peak[first:last])
+        mono *= 1.0 / (channels * 32768.0)
+        rms[first:last] = np.sqrt(np.add.reduceat(mono * mono, starts, dtype=np.float64) / lengths)
+    return peak / 32768.0, rms
+
+
+def _k_weighting(frequencies, rate):
+    """Complex response of the BS.1770 K-weighting filter at the given frequencies"""
+    import numpy as np
+
+    z = np.exp(-1j * 2 * np.pi * frequencies / rate)  # z^-1
+
+    # Stage 1: high shelf modelling the head's acoustic effect
+    k = math.tan(math.pi * 1681.974450955533 / rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (((vh + vb * k / q + k * k) + 2 * (k * k - vh) * z + (vh - vb * k / q + k * k) * z * z)
+             / (a0 + 2 * (k * k - 1) * z + (1 - k / q + k * k) * z * z))
+
+    # Stage 2: the RLB high-pass
+    k = math.tan(math.pi * 38.13547087602444 / rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    highpass = (1 - 2 * z + z * z) / (1 + 2 * (k * k - 1) / a0 * z + (1 - k / q + k * k) / a0 * z * z)
+    return shelf * highpass
+
+
+def integrated_loudness(samples, rate=ANALYSIS_RATE):
+    """Gated integrated loudness of int16 samples in LUFS, or None for silence.
+
+    The K-weighting filter is applied in the frequency domain, FFT_SIZE
+    samples at a time with at least FILTER_WARMUP samples of overlap
+    (overlap-save), which keeps the work vectorized; the filter's impulse
+    response decays well within the overlap. Each chunk's output is summed
+    straight into 100 ms segments, so memory use does not grow with the
+    length of the track.
+    """
+    import numpy as np
+
+    segment = int(rate * SEGMENT_SECONDS)
+    segments = len(samples) // segment
+    if segments < BLOCK_SEGMENTS:
+        return None
+
+    count = segments * segment
+    step = (FFT_SIZE - FILTER_WARMUP) // segment * segment  # Whole segments per chunk
+    warmup = FFT_SIZE - step
+    response = _k_weighting(np.fft.rfftfreq(FFT_SIZE, 1 / rate), rate)
+    energy = np.zeros(segments)
+    signal = np.zeros(FFT_SIZE, np.float32)
+    for channel in range(samples.shape[1]):
+        for start in range(0, count, step):
+            # Zeros stand in for the silence before the track and after its end
+            first = start - warmup
+            end = min(first + FFT_SIZE, count)
+            signal[:] = 0
+            signal[max(0, -first):end - first] = samples[max(0, first):end, channel]
+            chunk = np.fft.irfft(np.fft.rfft(signal) * response, FFT_SIZE)
+            kept = chunk[warmup:warmup + min(step, count - start)]
+            energy[start // segment:(start + len(kept)) // segment] += (
+                (kept * kept).reshape(-1, segment).sum(axis=1))
+    energy /= segment * 32768.0 * 32768.0
+
+    # Mean square of each 400 ms block, the blocks overlapping by 75%
+    totals = np.concatenate(([0.0], np.cumsum(energy)))
+    blocks = (totals[BLOCK_SEGMENTS:] - totals[:-BLOCK_SEGMENTS]) / BLOCK_SEGMENTS
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(blocks)
+
+    gated = blocks[levels > ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+    threshold = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = blocks[(levels > ABSOLUTE_GATE) & (levels > threshold)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+class AnalysisCache:
+    """Analysis results on disk, one memory-mappable .npy record per track.
+
+    Files are named after a hash of the track's path, size and modification
+    time, so an edited file is simply analyzed again. Loading maps the file
+    instead of reading it, which keeps cache hits cheap on the GUI thread.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(user_data_dir(), "waveforms")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, file_path):
+        """Cache file for file_path as it is now, or None if it doesn't exist"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key = f"{file_path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode("utf-8", "surrogatepass")
+        return os.path.join(self.directory, hashlib.blake2b(key, digest_size=16).hexdigest() + ".npy")
+
+    def load(self, file_path):
+        """Mapped analysis record for file_path, or None if not analyzed yet"""
+        import numpy as np
+
+        cache_path = self.path_for(file_path)
+        if cache_path is None or not os.path.exists(cache_path):
+            return None
+        try:
+            return np.load(cache_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Error loading waveform: {str(e)}")
+            return None
+
+    def store(self, file_path, record):
+        import numpy as np
+
+        cache_path = self.path_for(file_path)
+        if cache_path is None:
+            return None
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, record)
+        os.replace(temp_path, cache_path)
+        return cache_path
+
+
+def init_worker():
+    # Decoding goes through SDL; keep analysis processes off the sound card
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+
+def analyze_file(file_path, cache_dir=None):
+    """Decode file_path, compute its waveform and loudness and cache them.
+
+    Runs in a worker process; returns the cache file written.
+    """
+    import numpy as np
+
+    cache = AnalysisCache(cache_dir)
+    samples = decode(file_path)
+    peak, rms = waveform(samples)
+    loudness = integrated_loudness(samples)
+
+    record = np.zeros((), analysis_dtype())
+    record["peak"] = peak
+    record["rms"] = rms
+    record["loudness"] = np.nan if loudness is None else loudness
+    return cache.store(file_path, record)
@@ -0,0 +1,198 @@
+import time
+
+pygame = None  # Imported by AudioEngine._music() on first use
+
+# get_pos() lagging the wall clock by more than this means the stream restarted
+SWITCH_TOLERANCE_MS = 250
+
+
+class AudioEngine:
+    """Wrapper around pygame.mixer.music that keeps the next track pre-opened.
+
+    With crossfade off, the next file is handed to ``pygame.mixer.music.queue``.
+    SDL_mixer opens it right away and switches to it from the audio callback
+    when the current stream ends, so there is no stop/load/play gap. The
+    switch is detected in ``tick()`` by the stream position falling behind
+    where the wall clock says it should be, i.e. starting over.
+
+    Nothing here needs polling: ``time_to_transition()`` tells the caller
+    when ``tick()`` next has work to do, so it can sleep until then.
+
+    pygame has a single music stream, so two tracks cannot overlap. With a
+    crossfade configured, the current track is faded out for the last
+    ``crossfade_ms`` and the next one is started with a matching fade-in.
+
+    Importing pygame and opening the audio device take longer than building
+    the whole window, so both wait until something is actually played.
+    """
+
+    def __init__(self, crossfade_ms=0):
+        self.crossfade_ms = crossfade_ms
+        self.current = None  # Path of the track being played
+        self.queued = None  # Path of the preloaded next track
+        self.duration = 0.0
+        self._offset = 0.0  # Stream start position in seconds (play(start=...))
+        self._queued_duration = 0.0
+        self._last_pos = 0  # get_pos() at _last_time
+        self._last_time = time.monotonic()
+        self._fading = False
+        self._paused = False
+        self._mixer_queued = False  # True while a file sits in pygame's queue
+        self._volume = 1.0
+        self._started = False  # True once the mixer is open
+
+    def _music(self):
+        """Return pygame.mixer.music, opening the audio device on first use"""
+        global pygame
+        if not self._started:
+            if pygame is None:
+                import pygame
+            pygame.mixer.init()
+            pygame.mixer.music.set_volume(self._volume)
+            self._started = True
+        return pygame.mixer.music
+
+    def play(self, path, duration=0.0, start=0.0, fade_ms=0):
+        """Open path and start playing it, dropping any preloaded track"""
+        music = self._music()
+        music.stop()
+        music.load(path)
+        music.play(start=start, fade_ms=fade_ms)
+        self.current = path
+        self.queued = None
+        self.duration = duration
+        self._offset = start
+        self._fading = False
+        self._paused = False
+        self._mixer_queued = False  # Loading drops whatever pygame had queued
+        self._mark(0)
+
+    def preload(self, path, duration=0.0):
+        """Open path as the track to play once the current one finishes"""
+        if self.crossfade_ms:
+            self.unqueue()  # A file queued while crossfade was off would still follow
+        else:
+            self._music().queue(path)
+            self._mixer_queued = True
+        self.queued = path
+        self._queued_duration = duration
+
+    def unqueue(self):
+        """Drop the preloaded track, so nothing follows the current one"""
+        if self._mixer_queued and self.current is not None:
+            # pygame can't take a file off its queue, but reopening the current one clears it
+            paused = self._paused
+            self.play(self.current, self.duration, start=self.position())
+            if paused:
+                self.pause()
+        self.queued = None
+
+    def seek(self, position):
+        """Jump to position (seconds) in the open stream.
+
+        SDL_mixer's decoders seek in place (MP3 through a frame index built
+        on first seek, Ogg by granule position, WAV by sample offset), so the
+        file is only reopened if the format refuses to seek. The preloaded
+        next track stays queued either way.
+        """
+        music = self._music()
+        try:
+            music.set_pos(position)
+        except pygame.error:
+            queued, queued_duration = self.queued, self._queued_duration
+            self.play(self.current, self.duration, start=position)
+            if queued is not None:
+                self.preload(queued, queued_duration)
+            return
+
+        # get_pos() keeps counting across set_pos(), so rebase the offset
+        pos = max(music.get_pos(), 0)
+        self._offset = position - pos / 1000.0
+        self._mark(pos)
+
+    def pause(self):
+        if self._started:
+            pygame.mixer.music.pause()
+            self._paused = True
+
+    def unpause(self):
+        music = self._music()
+        music.unpause()
+        self._paused = False
+        self._mark(music.get_pos())
+
+    def stop(self):
+        if self._started:
+            pygame.mixer.music.stop()
+        self.current = None
+        self.queued = None
+        self._paused = False
+        self._mixer_queued = False
+
+    def set_volume(self, volume):
+        self._volume = volume
+        if self._started:
+            pygame.mixer.music.set_volume(volume)
+
+    def position(self):
+        """Seconds played in the current track"""
+        if not self._started:
+            return self._offset
+        return self._offset + max(pygame.mixer.music.get_pos(), 0) / 1000.0
+
+    def time_to_transition(self):
+        """Seconds until tick() next has work to do, or None if unknown"""
+        if self._fading:
+            return self.crossfade_ms / 1000.0
+        if not self.duration:
+            return None
+        self._mark(self._music().get_pos())
+        remaining = self.duration - self.position()
+        if self.crossfade_ms and self.queued is not None:
+            remaining -= self.crossfade_ms / 1000.0
+        return max(remaining, 0.0)
+
+    def _mark(self, pos):
+        self._last_pos = max(pos, 0)
+        self._last_time = time.monotonic()
+
+    def tick(self):
+        """Advance transition state; call when time_to_transition() elapses.
+
+        Returns "switched" when the preloaded track has taken over (current
+        and duration now describe it), "ended" when playback stopped with
+        nothing to switch to, or None.
+        """
+        music = self._music()
+        pos = music.get_pos()
+
+        if self._fading:
+            if music.get_busy():
+                return None
+            next_path, duration = self.queued, self._queued_duration
+            if next_path is None:
+                self._fading = False
+                return "ended"
+            self.play(next_path, duration, fade_ms=self.crossfade_ms)
+            return "switched"
+
+        expected = self._last_pos + (time.monotonic() - self._last_time) * 1000
+        if self.queued is not None and 0 <= pos < expected - SWITCH_TOLERANCE_MS:
+            # SDL_mixer moved on to the queued file; positions restart at 0
+            self.current = self.queued
+            self.duration = self._queued_duration
+            self.queued = None
+            self._mixer_queued = False
+            self._offset = 0.0
+            self._mark(pos)
+            return "switched"
+        self._mark(pos)
+
+        if not music.get_busy():
+            return "ended"
+
+        if (self.crossfade_ms and self.queued is not None and self.duration
+                and self.duration - self.position() <= self.crossfade_ms / 1000.0):
+            music.fadeout(self.crossfade_ms)
+            self._fading = True
+        return None
@@ -0,0 +1,294 @@
+"""Benchmarks for the playlist, search and metadata hot paths.
+
+Drives a real MusicPlayer (offscreen, with its data directory in a temporary
+folder) through the operations users wait on:
+
+- add_tracks: appending 1k / 10k / 100k tracks to a playlist
+- search: per-keystroke latency while typing a query into a 100k playlist
+- switch_playlist: switching to a 50k playlist, first time and again
+- import/export: replacing all playlists from a large JSON file and back
+- queue: "play next" and playing the head of a 10k play queue, saved as it
+  changes, and restoring that queue at startup
+- update_song_info: tag and cover lookup for a generated library, cold and
+  warm cache, plus decoding one cover and extracting its accent color
+
+Each case reports milliseconds (the best of several runs) and is compared
+with benchmarks/baselines.json. A case slower than its baseline by more than
+the tolerance (and by at least --min-delta ms) counts as a regression and
+the script exits non-zero.
+
+    python benchmarks/bench_hotpaths.py [--quick] [--only SUBSTRING]
+                                        [--tolerance 0.5] [--save-baseline]
+
+Baselines are machine specific; re-save them when changing hardware.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+BASELINES = os.path.join(HERE, "baselines.json")
+
+
+def best_of(fn, setup=None, repeat=3):
+    """Fastest of repeat timed calls to fn, in milliseconds; setup runs untimed"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+class Suite:
+    def __init__(self, data_dir, quick=False):
+        from PyQt5.QtWidgets import QApplication
+        import music_player
+
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.data_dir = data_dir
+        self.quick = quick
+        self.player = music_player.MusicPlayer()
+        self.results = {}
+        self._playlist_count = 0
+
+    def record(self, name, ms):
+        self.results[name] = ms
+        print(f"  {name:<36} {ms:10.2f} ms", flush=True)
+
+    def fresh_playlist(self, paths=()):
+        """Make a new playlist (optionally pre-filled) current, with an empty search index"""
+        from playlist import Playlist
+        from search_index import SearchIndex
+
+        p = self.player
+        self._playlist_count += 1
+        name = f"bench {self._playlist_count}"
+        p.playlist_store.create(name)
+        p.playlists[name] = Playlist()
+        p.search_index = SearchIndex()
+        p.search_bar.clear()
+        p.set_current_playlist(name)
+        if paths:
+            p.add_tracks(paths)
+        return name
+
+    def bench_add_tracks(self):
+        from fixtures import synthetic_paths
+
+        sizes = (1000, 10000) if self.quick else (1000, 10000, 100000)
+        for size in sizes:
+            paths = synthetic_paths(size)
+            self.record(f"add_tracks[{size}]",
+                        best_of(lambda: self.player.add_tracks(paths), self.fresh_playlist))
+
+    def bench_search(self):
+        from fixtures import synthetic_paths
+
+        p = self.player
+        size = 10000 if self.quick else 100000
+        self.fresh_playlist(synthetic_paths(size))
+        while p.index_timer.isActive():
+            p.index_idle()  # What the idle timer does before anyone types
+        query = "track 4242"
+
+        def type_query():
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                p.search_playlist(query[:end])
+                keystrokes.append((time.perf_counter() - start) * 1000)
+
+        runs = []
+        for _ in range(3):
+            keystrokes = []
+            p.search_playlist("")
+            type_query()
+            runs.append(keystrokes)
+        self.record(f"search_keystroke_mean[{size}]", min(statistics.mean(r) for r in runs))
+        self.record(f"search_keystroke_max[{size}]", min(max(r) for r in runs))
+        p.search_playlist("")
+
+    def bench_switch_playlist(self):
+        from fixtures import synthetic_paths
+
+        p = self.player
+        size = 5000 if self.quick else 50000
+        target = self.fresh_playlist(synthetic_paths(size))
+        other = self.fresh_playlist()
+
+        def unload():
+            p.set_current_playlist(other)
+            p.playlists[target] = None
+
+        self.record(f"switch_playlist_cold[{size}]",
+                    best_of(lambda: p.set_current_playlist(target), unload))
+        self.record(f"switch_playlist_warm[{size}]",
+                    best_of(lambda: p.set_current_playlist(target),
+                            lambda: p.set_current_playlist(other)))
+
+    def bench_import_export(self):
+        from fixtures import synthetic_paths
+
+        p = self.player
+        per_playlist = 1000 if self.quick else 10000
+        paths = synthetic_paths(per_playlist * 10)
+        playlists = {"Default": []}
+        for i in range(10):
+            playlists[f"List {i}"] = paths[i * per_playlist:(i + 1) * per_playlist]
+        json_path = os.path.join(self.data_dir, "playlists.json")
+        with open(json_path, "w") as f:
+            json.dump(playlists, f)
+
+        total = per_playlist * 10
+        self.record(f"import_playlists[{total}]",
+                    best_of(lambda: p.import_playlists(json_path)))
+        export_path = os.path.join(self.data_dir, "export.json")
+        self.record(f"export_playlists[{total}]",
+                    best_of(lambda: p.export_playlists(export_path)))
+
+    def bench_queue(self):
+        from fixtures import synthetic_paths
+        from play_queue import PlayQueue
+
+        p = self.player
+        size = 1000 if self.quick else 10000
+        paths = synthetic_paths(size)
+        steps = 100
+
+        def fill():
+            p.clear_queue()
+            p.queue_tracks(paths)
+
+        def play_next():
+            for path in paths[:steps]:
+                p.queue_tracks([path], up_next=True)
+
+        def dequeue():
+            for _ in range(steps):
+                p.on_dequeued(p.engine.queue.pop())
+
+        self.record(f"queue_play_next[{size}, per track]", best_of(play_next, fill) / steps)
+        self.record(f"queue_dequeue[{size}, per track]", best_of(dequeue, fill) / steps)
+        self.record(f"queue_restore[{size}]",
+                    best_of(lambda: PlayQueue(p.playlist_store.load_queue())))
+        p.clear_queue()
+
+    def bench_song_info(self):
+        from advanced_styles import extract_colors_from_art
+        from cover_art import decode_cover
+        from fixtures import make_library
+        from metadata_cache import MetadataCache
+        from tag_reader import read_cover
+
+        p = self.player
+        count = 50 if self.quick else 200
+        library = make_library(os.path.join(self.data_dir, "library"), count)
+        cover = read_cover(library[0])
+
+        def lookup_all():
+            for path in library:
+                cache.get(path)
+
+        def cold_cache():
+            nonlocal cache
+            cache.close()
+            os.remove(db_path)
+            cache = MetadataCache(db_path)
+
+        db_path = os.path.join(self.data_dir, "bench-metadata.db")
+        cache = MetadataCache(db_path)
+        self.record("metadata_get_cold[per track]",
+                    best_of(lookup_all, cold_cache) / count)
+        self.record("metadata_get_warm[per track]", best_of(lookup_all) / count)
+        cache.close()
+
+        infos = [(path, p.metadata_cache.get(path)) for path in library]
+
+        def show_all():
+            for path, info in infos:
+                p.update_song_info(path, info)
+
+        self.record("update_song_info[per track]", best_of(show_all) / count)
+        self.record("decode_cover[600px jpeg]", best_of(lambda: decode_cover(cover), repeat=10))
+        thumbnail = decode_cover(cover)
+        self.record("extract_colors[200px cover]",
+                    best_of(lambda: extract_colors_from_art(thumbnail), repeat=10))
+        p.cover_loader.pool.waitForDone()
+
+    def run(self, only=None):
+        for name in ("add_tracks", "search", "switch_playlist", "import_export", "queue",
+                     "song_info"):
+            if only and only not in name:
+                continue
+            print(f"{name}:", flush=True)
+            getattr(self, f"bench_{name}")()
+        return self.results
+
+
+def compare(results, baselines, tolerance, min_delta):
+    """Print results against baselines and return the names that regressed"""
+    regressions = []
+    print(f"\n{'case':<38} {'ms':>10} {'baseline':>10} {'ratio':>7}")
+    for name, ms in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name:<38} {ms:10.2f} {'-':>10} {'new':>7}")
+            continue
+        ratio = ms / baseline if baseline else float("inf")
+        flag = ""
+        # Sub-millisecond cases need an absolute margin as well, or noise trips them
+        if ratio > 1 + tolerance and ms - baseline > min_delta:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<38} {ms:10.2f} {baseline:10.2f} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast check")
+    parser.add_argument("--only", help="run only cases whose group contains this text")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown over baseline (0.5 = 50%%)")
+    parser.add_argument("--min-delta", type=float, default=0.1,
+                        help="ignore slowdowns smaller than this many ms")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the new baselines")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Keep the benchmark's library and caches away from the user's
+        os.environ["MUSIC_PLAYER_DATA_DIR"] = data_dir
+        results = Suite(data_dir, args.quick).run(args.only)
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines.update((name, round(ms, 3)) for name, ms in results.items())
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaselines saved to {BASELINES}")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance, args.min_delta)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
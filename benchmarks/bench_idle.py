@@ -0,0 +1,98 @@
+"""Idle benchmark: CPU time and repaints while the player sits there playing.
+
+Plays a generated track in a real MusicPlayer (offscreen, silent audio
+driver) and leaves the event loop alone for a few seconds in each of these
+states:
+
+- playing: window shown, pulse and progress updates running
+- minimized: playing with the window minimized
+- paused: window shown, nothing playing
+
+For each it reports process CPU time as a percentage of one core and the
+number of widget paint events per second. The script exits non-zero when
+the playing state uses more CPU than the budget.
+
+    python benchmarks/bench_idle.py [--seconds 5] [--budget-percent 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def measure(app, seconds, paints):
+    """(CPU percent, paints per second) over seconds of running the event loop"""
+    from PyQt5.QtCore import QTimer
+
+    paints.count = 0
+    cpu, wall = time.process_time(), time.perf_counter()
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec_()
+    wall = time.perf_counter() - wall
+    return 100 * (time.process_time() - cpu) / wall, paints.count / wall
+
+
+def run(data_dir, seconds):
+    from PyQt5.QtCore import QEvent, QObject
+    from PyQt5.QtWidgets import QApplication
+    from fixtures import write_mp3
+    import music_player
+
+    class PaintCounter(QObject):
+        count = 0
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                self.count += 1
+            return False
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    paints = PaintCounter()
+    app.installEventFilter(paints)
+
+    track = os.path.join(data_dir, "idle.mp3")
+    write_mp3(track, "Idle", "Bench", "Bench", seconds=int(seconds * 4) + 10)
+    player = music_player.MusicPlayer()
+    player.show()
+    player.add_tracks([track])
+    player.play_selected(player.playlist_view.model().index(0, 0))
+    measure(app, 0.5, paints)  # Let startup work settle
+
+    results = {"playing": measure(app, seconds, paints)}
+    player.showMinimized()
+    results["minimized"] = measure(app, seconds, paints)
+    player.showNormal()
+    player.play_pause()
+    results["paused"] = measure(app, seconds, paints)
+    player.engine.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="time spent in each state")
+    parser.add_argument("--budget-percent", type=float, default=5.0,
+                        help="allowed CPU use while playing, in percent of one core")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ["MUSIC_PLAYER_DATA_DIR"] = data_dir
+        results = run(data_dir, args.seconds)
+
+    print(f"{'state':<12} {'cpu':>7} {'paints/s':>9}")
+    for state, (cpu, paints) in results.items():
+        print(f"{state:<12} {cpu:6.1f}% {paints:9.1f}")
+    if results["playing"][0] > args.budget_percent:
+        print(f"over budget ({args.budget_percent:.1f}% while playing)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Playlist memory benchmark: a large library loaded as path lists vs the track table.
+
+Saves a library of --tracks tracks to a PlaylistStore as a "Library"
+playlist holding everything plus --playlists smaller playlists, each a
+random --share of the library, then loads every playlist back twice:
+
+- paths: the layout before the track table, a list of path strings plus a
+  path -> row dict per playlist (each playlist holding its own strings, as
+  rows read from SQLite do)
+- table: Playlist, track id arrays over one shared TrackTable
+
+and reports the Python heap each layout holds (measured with tracemalloc)
+and how long loading took (timed separately, as tracing slows allocation).
+The script exits non-zero when the table layout is not at least
+--min-ratio times smaller.
+
+The default 10x gate holds at the default 200k tracks (10.3x) and down to
+about 100k (10.1x). Smaller libraries save less, as each interned folder is
+shared by fewer tracks: 50k tracks measure 8.8x, so lower --min-ratio along
+with --tracks.
+
+    python benchmarks/bench_memory.py [--tracks 200000] [--playlists 40]
+                                      [--share 0.1] [--min-ratio 10]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+class PathListPlaylist:
+    """The old Playlist storage: path strings in a list, indexed by a dict"""
+
+    def __init__(self, paths):
+        self._paths = []
+        self._rows = {}
+        for path in paths:
+            if path not in self._rows:
+                self._rows[path] = len(self._paths)
+                self._paths.append(path)
+
+
+def measure(load):
+    """(bytes still allocated, seconds) for building whatever load returns"""
+    start = time.perf_counter()
+    load()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=200000, help="tracks in the library")
+    parser.add_argument("--playlists", type=int, default=40,
+                        help="playlists besides the whole library")
+    parser.add_argument("--share", type=float, default=0.1,
+                        help="fraction of the library in each of those playlists")
+    parser.add_argument("--min-ratio", type=float, default=10.0,
+                        help="required memory ratio of path lists over the table")
+    args = parser.parse_args()
+
+    from fixtures import synthetic_paths
+    from playlist import Playlist
+    from playlist_store import PlaylistStore
+    from track_table import TrackTable
+
+    paths = synthetic_paths(args.tracks, root=os.path.join(os.sep, "home", "user", "Music"))
+    rng = random.Random(0)
+    playlists = {"Library": paths}
+    for i in range(args.playlists):
+        playlists[f"Playlist {i}"] = rng.sample(paths, int(len(paths) * args.share))
+    entries = sum(len(playlist) for playlist in playlists.values())
+    del paths
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = PlaylistStore(os.path.join(folder, "library.db"))
+        store.replace_all(playlists)
+        del playlists
+
+        def rows(name):
+            return (row[0] for row in store.conn.execute(
+                "SELECT path FROM entries WHERE playlist_id = ? ORDER BY seq", (store._id(name),)))
+
+        def load_path_lists():
+            return [PathListPlaylist(rows(name)) for name in store.names()]
+
+        def load_table():
+            table = TrackTable()  # Fresh each time, so it is part of the measurement
+            return [Playlist(rows(name), table) for name in store.names()]
+
+        results = {"paths": measure(load_path_lists), "table": measure(load_table)}
+        store.close()
+
+    print(f"{args.tracks} tracks, {entries} playlist entries in {args.playlists + 1} playlists")
+    print(f"{'layout':<8} {'MB':>8} {'bytes/entry':>12} {'load s':>8}")
+    for name, (size, seconds) in results.items():
+        print(f"{name:<8} {size / 1e6:8.1f} {size / entries:12.1f} {seconds:8.2f}")
+
+    ratio = results["paths"][0] / results["table"][0]
+    print(f"memory ratio: {ratio:.1f}x")
+    if ratio < args.min_ratio:
+        print(f"below the required {args.min_ratio:.1f}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Cold-start benchmark: time from launching the player to its first paint.
+
+Each run starts a fresh interpreter that imports music_player, builds the
+window, shows it and reports when the first paint event is delivered. The
+median over all runs is compared against a budget and the script exits
+non-zero when it is over, so it can guard against import-time regressions.
+
+    python benchmarks/bench_startup.py [--runs N] [--budget-ms MS]
+
+Runs under QT_QPA_PLATFORM=offscreen unless the variable is already set.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {repo!r})
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+import music_player
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print(time.time(), flush=True)
+            app.quit()
+        return False
+
+app = QApplication(sys.argv)
+watcher = FirstPaint()
+app.installEventFilter(watcher)
+player = music_player.MusicPlayer()
+player.show()
+app.exec_()
+"""
+
+
+def run_once(env):
+    start = time.time()
+    result = subprocess.run([sys.executable, "-c", CHILD.format(repo=REPO)], env=env,
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode or not result.stdout.strip():
+        raise SystemExit(f"player failed to start:\n{result.stderr}")
+    return (float(result.stdout.split()[-1]) - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Fresh user data so an existing library doesn't skew the numbers
+        env["MUSIC_PLAYER_DATA_DIR"] = data_dir
+        run_once(env)  # Warm the OS file cache
+        times = [run_once(env) for _ in range(args.runs)]
+
+    median = statistics.median(times)
+    print(f"launch to first paint: median {median:.0f} ms, "
+          f"min {min(times):.0f} ms, max {max(times):.0f} ms ({args.runs} runs)")
+    if median > args.budget_ms:
+        print(f"over budget ({args.budget_ms:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
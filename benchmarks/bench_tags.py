@@ -0,0 +1,116 @@
+"""Tag reading benchmark: a full library scan's worth of tags, old way vs new.
+
+Generates a mixed library (MP3 with ID3v2 and a front cover, Ogg Vorbis and
+FLAC with Vorbis comments and an embedded picture, WAV with RIFF INFO) and
+reads the list-view fields of every file twice:
+
+- mutagen: what read_metadata did before tag_reader, mutagen.File plus
+  the front cover's bytes
+- tag_reader: read_tags, headers and text frames only
+
+Both passes run over a warm page cache, so the numbers are parse cost rather
+than disk speed. Each reader's pass runs --repeat times, alternating with the
+other's so both see the same machine load, and the fastest pass counts. The
+report also counts how many titles each pass found (mutagen only looked up
+ID3 keys). The script exits non-zero when tag_reader is less than
+--min-speedup times faster.
+
+    python benchmarks/bench_tags.py [--count 10000] [--repeat 3] [--min-speedup 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+FORMATS = (".mp3", ".mp3", ".ogg", ".flac")
+
+
+def mutagen_read(file_path):
+    """Title and cover the way read_metadata used to get them"""
+    import mutagen
+
+    info = {"title": None, "cover": None}
+    audio = mutagen.File(file_path)
+    tags = getattr(audio, "tags", None)
+    if tags is not None and hasattr(tags, "get"):
+        value = tags.get("TIT2")
+        if value is not None:
+            info["title"] = str(value[0])
+    if tags is not None and hasattr(tags, "getall"):
+        for tag in tags.getall("APIC"):
+            if tag.type == 3:
+                info["cover"] = tag.data
+                break
+    info["duration"] = float(audio.info.length)
+    return info
+
+
+def timed_pass(read, paths):
+    """(seconds, titles found, seconds per extension) for reading every path"""
+    by_extension = defaultdict(float)
+    titles = 0
+    start = time.perf_counter()
+    for path in paths:
+        file_start = time.perf_counter()
+        if read(path)["title"]:
+            titles += 1
+        by_extension[os.path.splitext(path)[1]] += time.perf_counter() - file_start
+    return time.perf_counter() - start, titles, by_extension
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000, help="files in the library")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="passes per reader; the fastest one counts")
+    parser.add_argument("--min-speedup", type=float, default=5.0,
+                        help="required throughput ratio of tag_reader over mutagen")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtGui import QGuiApplication
+    from fixtures import make_library
+    from tag_reader import read_tags
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)  # For the cover JPEGs
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        paths = make_library(folder, args.count, formats=FORMATS, seconds=2)
+        print(f"generated {len(paths)} files in {time.perf_counter() - start:.1f}s")
+        for path in paths:  # Warm the page cache for both passes
+            with open(path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+
+        readers = {"mutagen": mutagen_read, "tag_reader": read_tags}
+        results = {}
+        for _ in range(args.repeat):
+            for name, read in readers.items():
+                result = timed_pass(read, paths)
+                if name not in results or result[0] < results[name][0]:
+                    results[name] = result
+    del app
+
+    extensions = sorted({os.path.splitext(path)[1] for path in paths})
+    counts = {ext: sum(path.endswith(ext) for path in paths) for ext in extensions}
+    print(f"{'reader':<12} {'files/s':>9} {'titles':>7} "
+          + " ".join(f"{ext + ' us':>9}" for ext in extensions))
+    for name, (seconds, titles, by_extension) in results.items():
+        per_file = " ".join(f"{1e6 * by_extension[ext] / counts[ext]:9.0f}" for ext in extensions)
+        print(f"{name:<12} {len(paths) / seconds:9.0f} {titles:7d} {per_file}")
+
+    speedup = results["mutagen"][0] / results["tag_reader"][0]
+    print(f"speedup: {speedup:.1f}x")
+    if speedup < args.min_speedup:
+        print(f"below the required {args.min_speedup:.1f}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Synthetic audio and tag fixtures for the benchmarks, generated on the fly.
+
+Nothing here is checked in: MP3s are runs of silent MPEG-1 Layer III frames
+with ID3v2 text frames and a JPEG front cover, WAVs are silent PCM with a
+RIFF INFO list. Ogg Vorbis and FLAC files only have real headers and tags
+(their audio is filler), which is all the tag readers look at. Covers are
+shared per album like in a real library.
+"""
+import base64
+import os
+import random
+import struct
+import wave
+
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import APIC, ID3, TALB, TIT2, TPE1
+from mutagen.ogg import OggPage
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, Qt
+from PyQt5.QtGui import QImage
+
+# One 128 kbps / 44.1 kHz frame of silence; 38 frames is about a second
+MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+MP3_FRAMES_PER_SECOND = 38
+
+
+def cover_jpeg(seed, size=600):
+    """A size x size JPEG of smoothed noise, roughly as large as real cover art"""
+    rng = random.Random(seed)
+    noise = bytes(rng.getrandbits(8) for _ in range(40 * 40 * 3))
+    image = QImage(noise, 40, 40, 40 * 3, QImage.Format_RGB888)
+    image = image.scaled(size, size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    payload = QByteArray()
+    buffer = QBuffer(payload)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "JPG", 85)
+    buffer.close()
+    return bytes(payload)
+
+
+def write_mp3(path, title, artist, album, cover=None, seconds=10):
+    with open(path, "wb") as f:
+        f.write(MP3_FRAME * (MP3_FRAMES_PER_SECOND * seconds))
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=title))
+    tags.add(TPE1(encoding=3, text=artist))
+    tags.add(TALB(encoding=3, text=album))
+    if cover:
+        tags.add(APIC(encoding=3, mime="image/jpeg", type=3, desc="", data=cover))
+    tags.save(path)
+
+
+def write_wav(path, seconds=1, rate=44100, title=None, artist=None, album=None):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(bytes(4 * rate * seconds))
+    fields = [(b"INAM", title), (b"IART", artist), (b"IPRD", album)]
+    info = b"".join(_riff_chunk(key, value.encode("utf-8") + b"\0")
+                    for key, value in fields if value)
+    if info:
+        with open(path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            f.write(_riff_chunk(b"LIST", b"INFO" + info))
+            size = f.tell() - 8
+            f.seek(4)
+            f.write(struct.pack("<I", size))
+
+
+def _riff_chunk(chunk_id, data):
+    return chunk_id + struct.pack("<I", len(data)) + data + b"\0" * (len(data) & 1)
+
+
+def _picture(cover):
+    picture = Picture()
+    picture.type = 3
+    picture.mime = "image/jpeg"
+    picture.data = cover
+    return picture
+
+
+def _vorbis_comments(title, artist, album, cover):
+    vendor = b"fixtures"
+    comments = [f"TITLE={title}".encode("utf-8"), f"ARTIST={artist}".encode("utf-8"),
+                f"ALBUM={album}".encode("utf-8")]
+    if cover:
+        comments.append(b"METADATA_BLOCK_PICTURE=" + base64.b64encode(_picture(cover).write()))
+    return (struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", len(comments))
+            + b"".join(struct.pack("<I", len(c)) + c for c in comments))
+
+
+def write_ogg(path, title, artist, album, cover=None, seconds=10, rate=44100):
+    """Ogg Vorbis headers and tags followed by pages of filler 'audio' packets"""
+    ident = (b"\x01vorbis" + struct.pack("<IBIiii", 0, 2, rate, 0, 128000, 0)
+             + b"\xb8\x01")
+    comment = b"\x03vorbis" + _vorbis_comments(title, artist, album, cover) + b"\x01"
+    setup = b"\x05vorbis" + bytes(64)
+    # Headers: the identification packet alone, then comment and setup packets
+    pages = OggPage.from_packets([ident], 0) + OggPage.from_packets([comment, setup], 1)
+    pages[0].first = True
+    for second in range(1, seconds + 1):
+        page = OggPage()
+        page.sequence = len(pages)
+        page.packets = [bytes(200)] * 20
+        page.position = second * rate
+        pages.append(page)
+    pages[-1].last = True
+    with open(path, "wb") as f:
+        for page in pages:
+            page.serial = 0x5EED
+            f.write(page.write())
+
+
+def write_flac(path, title, artist, album, cover=None, seconds=10, rate=44100):
+    """FLAC STREAMINFO with Vorbis comments and a PICTURE block, filler frames after"""
+    samples = rate * seconds
+    streaminfo = (struct.pack(">HH", 4096, 4096) + bytes(6)
+                  + ((rate << 44) | (1 << 41) | (15 << 36) | samples).to_bytes(8, "big")
+                  + bytes(16))
+    with open(path, "wb") as f:
+        f.write(b"fLaC" + bytes([0x80]) + len(streaminfo).to_bytes(3, "big") + streaminfo)
+        f.write(bytes(4096))
+    audio = FLAC(path)
+    audio["title"] = title
+    audio["artist"] = artist
+    audio["album"] = album
+    if cover:
+        audio.add_picture(_picture(cover))
+    audio.save()
+
+
+FORMAT_WRITERS = {".mp3": write_mp3, ".ogg": write_ogg, ".flac": write_flac}
+
+
+def make_library(folder, count, albums=20, wav_every=10, formats=(".mp3",), seconds=10):
+    """Write count tagged tracks under folder and return their paths.
+
+    Every wav_every-th track is a WAV; the rest cycle through formats.
+    """
+    covers = {}
+    paths = []
+    for i in range(count):
+        album = i % albums
+        album_dir = os.path.join(folder, f"Artist {album % 7}", f"Album {album}")
+        os.makedirs(album_dir, exist_ok=True)
+        if wav_every and i % wav_every == wav_every - 1:
+            path = os.path.join(album_dir, f"{i:05d} Take {i}.wav")
+            write_wav(path, min(seconds, 1), title=f"Take {i}", artist=f"Artist {album % 7}",
+                      album=f"Album {album}")
+        else:
+            if album not in covers:
+                covers[album] = cover_jpeg(album)
+            extension = formats[i % len(formats)]
+            path = os.path.join(album_dir, f"{i:05d} Track {i}{extension}")
+            FORMAT_WRITERS[extension](path, f"Track {i}", f"Artist {album % 7}",
+                                      f"Album {album}", covers[album], seconds)
+        paths.append(path)
+    return paths
+
+
+def synthetic_paths(count, root="/music"):
+    """Plausible library paths that don't need to exist on disk"""
+    return [os.path.join(root, f"Artist {i % 400}", f"Album {i % 3000}",
+                         f"{i:06d} Track {i}.mp3")
+            for i in range(count)]
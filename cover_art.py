@@ -0,0 +1,202 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import (Qt, QBuffer, QByteArray, QIODevice, QObject, QRunnable,
+                          QThreadPool, pyqtSignal)
+from PyQt5.QtGui import QImage
+
+from advanced_styles import extract_colors_from_art
+from tag_reader import read_cover
+from tracing import traced
+
+THUMBNAIL_SIZE = 200
+
+
+def cover_key(data):
+    """Content hash used to share decoded covers between tracks"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@traced("decode_cover")
+def decode_cover(data, size=THUMBNAIL_SIZE):
+    """Decode image bytes into a QImage no larger than size x size"""
+    image = QImage()
+    if not data or not image.loadFromData(data):
+        return None
+    if image.width() > size or image.height() > size:
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+def encode_thumbnail(image):
+    """Encode a decoded cover as PNG bytes for the metadata cache"""
+    payload = QByteArray()
+    buffer = QBuffer(payload)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return bytes(payload)
+
+
+class CoverCache:
+    """Thread-safe LRU of decoded covers bounded by total image bytes.
+
+    Each cover's accent color is kept alongside it and evicted with it.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._accents = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, count=True):
+        """Return the cached image for key, or None; count=False skips hit stats"""
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            if count:
+                self.hits += 1
+            return image
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._images
+
+    def accent(self, key):
+        """Accent color ("#rrggbb") of the cached cover for key, or None"""
+        with self._lock:
+            return self._accents.get(key)
+
+    def put(self, key, image, accent=None):
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                if accent is not None:
+                    self._accents[key] = accent
+                return
+            self._images[key] = image
+            if accent is not None:
+                self._accents[key] = accent
+            self.total_bytes += image.sizeInBytes()
+            while self.total_bytes > self.max_bytes and len(self._images) > 1:
+                evicted_key, evicted = self._images.popitem(last=False)
+                self._accents.pop(evicted_key, None)
+                self.total_bytes -= evicted.sizeInBytes()
+
+
+class _CoverSignals(QObject):
+    # path, cover key, decoded image, accent color, new thumbnail bytes (or None)
+    loaded = pyqtSignal(str, str, QImage, str, object)
+    missing = pyqtSignal(str, bool)  # path, True if the file has no cover at all
+
+
+class _CoverJob(QRunnable):
+    def __init__(self, path, key, thumbnail, cache, signals):
+        super().__init__()
+        self.path = path
+        self.key = key
+        self.thumbnail = thumbnail
+        self.cache = cache
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.thumbnail:
+                key = self.key or cover_key(self.thumbnail)
+                image = self.cache.get(key, count=False) or decode_cover(self.thumbnail)
+                new_thumbnail = None
+            else:
+                data = read_cover(self.path)
+                if not data:
+                    self.signals.missing.emit(self.path, True)
+                    return
+                key = cover_key(data)
+                image = self.cache.get(key, count=False) or decode_cover(data)
+                new_thumbnail = encode_thumbnail(image) if image is not None else None
+
+            if image is None:
+                self.signals.missing.emit(self.path, False)
+            else:
+                # Work out the accent here too, so track changes never wait on it
+                accent = self.cache.accent(key) or extract_colors_from_art(image)
+                self.signals.loaded.emit(self.path, key, image, accent, new_thumbnail)
+        except Exception as e:
+            print(f"Error loading cover art: {str(e)}")
+            self.signals.missing.emit(self.path, False)
+
+
+class CoverLoader(QObject):
+    """Decodes and scales album art on a QThreadPool.
+
+    Results land in a shared CoverCache keyed by a hash of the image bytes,
+    so tracks of one album decode their common cover once. ``cover_ready``
+    fires on the GUI thread with the path the cover was requested for and
+    the cover's accent color (see extract_colors_from_art). Newly generated
+    thumbnails come through ``thumbnail_ready`` so the caller can persist
+    them in the metadata cache.
+    """
+
+    cover_ready = pyqtSignal(str, QImage, str)
+    cover_missing = pyqtSignal(str)
+    # path, PNG thumbnail and cover key; empty when the file has no cover
+    thumbnail_ready = pyqtSignal(str, bytes, str)
+
+    def __init__(self, cache=None, max_threads=2, parent=None):
+        super().__init__(parent)
+        self.cache = cache or CoverCache()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._in_flight = set()
+        self._signals = _CoverSignals()
+        self._signals.loaded.connect(self._on_loaded)
+        self._signals.missing.connect(self._on_missing)
+
+    def request(self, path, info, priority=1):
+        """Load the cover for path given its metadata cache entry.
+
+        Returns the decoded QImage right away when it is already cached, or
+        None after queueing a decode (cover_ready/cover_missing follow).
+        """
+        if info.get("cover_checked") and not info.get("cover"):
+            self.cover_missing.emit(path)
+            return None
+
+        key = info.get("cover_hash")
+        if key:
+            image = self.cache.get(key)
+            if image is not None:
+                return image
+
+        if path not in self._in_flight:
+            self._in_flight.add(path)
+            job = _CoverJob(path, key, info.get("cover"), self.cache, self._signals)
+            self.pool.start(job, priority)
+        return None
+
+    def prefetch(self, items):
+        """Warm the cache for upcoming (path, info) pairs at low priority"""
+        for path, info in items:
+            if info is not None:
+                self.request(path, info, priority=0)
+
+    def _on_loaded(self, path, key, image, accent, thumbnail):
+        self._in_flight.discard(path)
+        self.cache.put(key, image, accent)
+        if thumbnail is not None:
+            self.thumbnail_ready.emit(path, thumbnail, key)
+        self.cover_ready.emit(path, image, accent)
+
+    def _on_missing(self, path, no_cover):
+        self._in_flight.discard(path)
+        if no_cover:
+            self.thumbnail_ready.emit(path, b"", "")
+        self.cover_missing.emit(path)
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from library_scanner import read_batch
+from metadata_cache import MetadataCache
+from tag_reader import HEADER_BYTES, sniff_audio
+
+# Containers the mixer can play, by their magic bytes ("id3" is MP3 behind an ID3v2 tag)
+PLAYABLE = {"id3", "mp3", "ogg", "wav"}
+PARSE_CHUNK = 50  # Files per tag parsing task, so every worker process gets a share of a batch
+BATCHES_AHEAD = 4  # Batches probed and parsing while the oldest one is still being parsed
+
+
+def expand_paths(paths):
+    """Yield files from dropped paths in order, walking dropped folders (sorted, files first)"""
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, subfolders, files in os.walk(path):
+                subfolders.sort()
+                for name in sorted(files):
+                    yield os.path.join(folder, name)
+        else:
+            yield path
+
+
+def probe(path):
+    """(path, size, mtime_ns) if path is a playable audio file by its content, else None"""
+    try:
+        with open(path, "rb") as f:
+            if sniff_audio(f.read(HEADER_BYTES)) not in PLAYABLE:
+                return None
+            stat = os.fstat(f.fileno())
+    except OSError:
+        return None
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+class DropImporter(QObject):
+    """Turns a drop of files and folders into batches of tracks off the GUI thread.
+
+    Folders are expanded recursively, every file is checked by its magic
+    bytes rather than its extension, and repeats within the drop are
+    dropped. Files are probed on a small thread pool and tags parsed on a
+    process pool (keeping the parsing off the GUI thread's GIL), in chunks
+    spread over every worker with a few batches in flight at once; tags
+    still fresh in the metadata cache are not parsed again. Results come
+    through ``batch_ready`` in drop order as ``(path, size, mtime_ns,
+    info)`` records like LibraryScanner's, ``info`` being None when the
+    cached tags are current.
+    """
+
+    batch_ready = pyqtSignal(list)
+    progress = pyqtSignal(int, int)  # files accepted, files rejected
+    finished = pyqtSignal(bool)  # True if the import was cancelled
+
+    def __init__(self, paths, db_path=None, batch_size=500, workers=8, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.workers = workers
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="DropImporter", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        cache = MetadataCache(self.db_path)
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        parsers = None
+        accepted = 0
+        rejected = 0
+        seen = set()
+        in_flight = deque()  # (records, tag parsing futures) per batch, in drop order
+        exhausted = False
+        try:
+            files = expand_paths(self.paths)
+            while not self._cancel.is_set():
+                # Deliver finished batches, oldest first
+                while in_flight and all(future.done() for future in in_flight[0][1]):
+                    accepted += self._deliver(*in_flight.popleft())
+                    self.progress.emit(accepted, rejected)
+
+                if not exhausted and len(in_flight) < BATCHES_AHEAD:
+                    batch = _take(files, self.batch_size)
+                    if not batch:
+                        exhausted = True
+                        continue
+                    batch = [path for path in dict.fromkeys(batch) if path not in seen]
+                    seen.update(batch)
+                    records = [record for record in pool.map(probe, batch) if record is not None]
+                    rejected += len(batch) - len(records)
+
+                    stale = [record for record in records if not cache.is_fresh(*record)]
+                    if stale and parsers is None:
+                        # Spawned, not forked: this is a thread of a process running Qt
+                        parsers = ProcessPoolExecutor(
+                            mp_context=multiprocessing.get_context("spawn"))
+                    parses = [parsers.submit(read_batch, stale[start:start + PARSE_CHUNK])
+                              for start in range(0, len(stale), PARSE_CHUNK)]
+                    in_flight.append((records, parses))
+                elif in_flight:
+                    wait(in_flight[0][1], timeout=0.1)  # Short, so cancelling stays quick
+                else:
+                    break
+        except Exception as e:
+            print(f"Error importing dropped files: {str(e)}")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if parsers is not None:
+                parsers.shutdown(wait=False, cancel_futures=True)
+            cache.close()
+            self.finished.emit(self._cancel.is_set())
+
+    def _deliver(self, records, parses):
+        """Emit a batch with its parsed tags; return how many tracks it held"""
+        tags = {path: info for future in parses for path, _, _, info in future.result()}
+        if not records or self._cancel.is_set():
+            return 0
+        self.batch_ready.emit([record + (tags.get(record[0]),) for record in records])
+        return len(records)
+
+
+def _take(iterator, count):
+    """Up to count items from iterator"""
+    items = []
+    for item in iterator:
+        items.append(item)
+        if len(items) == count:
+            break
+    return items
@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor,
+                                wait)
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from metadata_cache import MetadataCache, read_metadata
+
+SUPPORTED_EXTENSIONS = ('.mp3', '.wav', '.ogg')
+
+
+def list_directory(folder):
+    """Return ([(path, size, mtime_ns), ...], [subfolder, ...]) for one directory"""
+    files = []
+    subfolders = []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subfolders.append(entry.path)
+                    elif entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        stat = entry.stat()
+                        files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"Error scanning {folder}: {str(e)}")
+    return files, subfolders
+
+
+def read_batch(files):
+    """Read text tags for a batch of (path, size, mtime_ns) in a worker process"""
+    records = []
+    for path, size, mtime_ns in files:
+        # Text tags only: covers are loaded lazily when a track is shown
+        records.append((path, size, mtime_ns, read_metadata(path)))
+    return records
+
+
+class LibraryScanner(QObject):
+    """Recursively import folders without blocking the Qt event loop.
+
+    Directories are listed with os.scandir on a thread pool and tags are
+    parsed on a process pool. Results are delivered in batches through
+    ``batch_ready`` as a list of ``(path, size, mtime_ns, info)`` records,
+    where ``info`` is None for files whose cached metadata is still fresh.
+    Signals are emitted from the scan thread, so connected slots run queued
+    on the receiver's thread.
+    """
+
+    batch_ready = pyqtSignal(list)
+    progress = pyqtSignal(int, int)  # files processed, files discovered
+    finished = pyqtSignal(bool)  # True if the scan was cancelled
+
+    def __init__(self, roots, db_path=None, batch_size=200, walkers=8, parent=None):
+        super().__init__(parent)
+        self.roots = list(roots)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.walkers = walkers
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="LibraryScanner", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        cache = MetadataCache(self.db_path)
+        discovered = 0
+        processed = 0
+        pending = []  # files waiting to be grouped into a parse batch
+
+        walkers = ThreadPoolExecutor(max_workers=self.walkers)
+        # Spawned, not forked: this is a thread of a process running Qt
+        parsers = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        try:
+            listings = {walkers.submit(list_directory, root) for root in self.roots}
+            parses = set()
+
+            while (listings or parses or pending) and not self._cancel.is_set():
+                # Flush partial batches once the directory walk is over
+                if not listings and pending:
+                    parses.add(parsers.submit(read_batch, pending))
+                    pending = []
+                    continue
+
+                done, _ = wait(listings | parses, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in listings:
+                        listings.discard(future)
+                        files, subfolders = future.result()
+                        for folder in subfolders:
+                            listings.add(walkers.submit(list_directory, folder))
+                        discovered += len(files)
+
+                        fresh = []
+                        for record in sorted(files):
+                            if cache.is_fresh(*record):
+                                fresh.append(record + (None,))
+                            else:
+                                pending.append(record)
+                        if fresh:
+                            processed += len(fresh)
+                            self.batch_ready.emit(fresh)
+
+                        while len(pending) >= self.batch_size:
+                            parses.add(parsers.submit(read_batch, pending[:self.batch_size]))
+                            pending = pending[self.batch_size:]
+                    else:
+                        parses.discard(future)
+                        records = future.result()
+                        processed += len(records)
+                        self.batch_ready.emit(records)
+
+                    self.progress.emit(processed, discovered)
+        except Exception as e:
+            print(f"Error scanning library: {str(e)}")
+        finally:
+            cancelled = self._cancel.is_set()
+            walkers.shutdown(wait=False, cancel_futures=True)
+            parsers.shutdown(wait=not cancelled, cancel_futures=True)
+            cache.close()
+            self.finished.emit(cancelled)
@@ -0,0 +1,314 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+from library_scanner import SUPPORTED_EXTENSIONS
+from metadata_cache import MetadataCache, read_metadata
+
+SETTLE_MS = 300  # Wait this long after the last change so a copy or unzip lands as one delta
+POLL_INTERVAL_MS = 5000  # How often folders without a native watch are checked
+
+
+def scan_directory(folder):
+    """Audio files and subfolder names directly in folder.
+
+    Returns ``({name: (size, mtime_ns, inode)}, {subfolder name, ...})``.
+    Raises OSError if folder can't be listed.
+    """
+    files = {}
+    subfolders = set()
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.add(entry.name)
+                elif entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            except OSError:
+                continue
+    return files, subfolders
+
+
+class LibraryWatcher(QObject):
+    """Keeps imported folders in sync with the disk, reporting only what changed.
+
+    Every folder under the watched roots is listed once into an index of
+    ``{folder: (mtime_ns, files, subfolders)}``. Folders are watched with
+    QFileSystemWatcher (inotify on Linux); any the platform won't watch,
+    for instance past the inotify limit, are polled instead by comparing
+    their modification time with the index. Either way only a changed
+    folder is listed again, and the difference with its index entry is
+    reported through ``changes``:
+
+    - added: ``(path, size, mtime_ns, info)`` records for new audio files,
+      including everything in new subfolders, with their tags already
+      parsed (``info`` is None where the metadata cache is still fresh)
+    - removed: paths of files that are gone
+    - renamed: ``(old, new)`` pairs for files that were renamed or moved
+      between watched folders, matched by inode, size and mtime
+
+    The index is saved in the metadata database as it changes. Watching a
+    root that was indexed before (at startup) compares the disk with that
+    saved index, so changes made while the player was closed are reported
+    too; folders whose modification time has not moved are not listed.
+
+    Listing and tag parsing run on a single worker thread that owns the
+    index, so the GUI thread never touches the disk; signals arrive queued
+    on the receiver's thread.
+    """
+
+    changes = pyqtSignal(list, list, list)  # added records, removed paths, [(old, new)]
+    _indexed = pyqtSignal(list, list)  # folders added to the index, folders dropped
+
+    def __init__(self, db_path=None, poll_only=False, parent=None):
+        super().__init__(parent)
+        self.roots = []
+        self.db_path = db_path
+        self._cache = None  # Worker thread only: MetadataCache for tags and the saved index
+        self._index = {}  # Worker thread only: folder -> (mtime_ns, files, subfolders)
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="LibraryWatcher")
+        self._watcher = None
+        if not poll_only:
+            self._watcher = QFileSystemWatcher(self)
+            self._watcher.directoryChanged.connect(self._directory_changed)
+        self._polled = set()  # Folders without a native watch
+        self._dirty = set()  # Folders reported changed since the last rescan
+
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(SETTLE_MS)
+        self._settle_timer.timeout.connect(self._rescan_dirty)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+        self._indexed.connect(self._on_indexed)
+
+    def watch(self, root):
+        """Start watching root and everything below it; False if already covered"""
+        root = os.path.abspath(root)
+        if any(root == watched or root.startswith(watched + os.sep) for watched in self.roots):
+            return False
+        # Roots inside the new one are now part of it
+        self.roots = [watched for watched in self.roots
+                      if not watched.startswith(root + os.sep)] + [root]
+        self._submit(self._index_root, root)
+        return True
+
+    def clear(self):
+        """Stop watching every root"""
+        self.roots = []
+        self._dirty = set()
+        self._settle_timer.stop()
+        self._submit(self._clear_index)
+
+    def shutdown(self):
+        self._settle_timer.stop()
+        self._poll_timer.stop()
+        self._worker.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        self._worker.submit(fn, *args).add_done_callback(_report_error)
+
+    # --- GUI thread ---------------------------------------------------------
+
+    def _directory_changed(self, folder):
+        self._dirty.add(folder)
+        self._settle_timer.start()
+
+    def _rescan_dirty(self):
+        folders, self._dirty = self._dirty, set()
+        self._submit(self._rescan, folders)
+
+    def _poll(self):
+        self._submit(self._poll_folders, list(self._polled))
+
+    def _on_indexed(self, added, dropped):
+        dropped_set = set(dropped)
+        if self._watcher is not None:
+            watched = set(self._watcher.directories())
+            stale = [folder for folder in dropped if folder in watched]
+            if stale:
+                self._watcher.removePaths(stale)
+            failed = self._watcher.addPaths(added) if added else []
+        else:
+            failed = added
+        self._polled = (self._polled - dropped_set) | set(failed)
+        if self._polled and not self._poll_timer.isActive():
+            self._poll_timer.start()
+        elif not self._polled:
+            self._poll_timer.stop()
+
+    # --- Worker thread --------------------------------------------------------
+
+    def _store(self):
+        # SQLite connections belong to the thread that opens them
+        if self._cache is None:
+            self._cache = MetadataCache(self.db_path)
+        return self._cache
+
+    def _index_tree(self, folder, files_found, folders_found):
+        """Add folder and its subfolders to the index, collecting their file paths"""
+        pending = [folder]
+        while pending:
+            folder = pending.pop()
+            if folder in self._index:
+                continue
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+                files, subfolders = scan_directory(folder)
+            except OSError:
+                continue
+            self._index[folder] = (mtime_ns, files, subfolders)
+            folders_found.append(folder)
+            files_found.update((os.path.join(folder, name), stat) for name, stat in files.items())
+            pending.extend(os.path.join(folder, name) for name in subfolders)
+
+    def _drop_tree(self, folder, files_lost, folders_lost):
+        """Remove folder and its subfolders from the index, collecting their file paths"""
+        pending = [folder]
+        while pending:
+            folder = pending.pop()
+            entry = self._index.pop(folder, None)
+            if entry is None:
+                continue
+            folders_lost.append(folder)
+            files_lost.update((os.path.join(folder, name), stat) for name, stat in entry[1].items())
+            pending.extend(os.path.join(folder, name) for name in entry[2])
+
+    def _index_root(self, root):
+        """Index root, reporting how it differs from the index saved last time"""
+        saved = {folder: entry for folder, entry in self._store().load_folders(root).items()
+                 if folder not in self._index}
+        if not saved:
+            # Never indexed: the files there were just imported by the folder scan
+            folders = []
+            self._index_tree(root, {}, folders)
+            self._store().save_folders({folder: self._index[folder] for folder in folders})
+            self._indexed.emit(folders, [])
+            return
+
+        added = {}
+        removed = {}
+        folders = []
+        pending = [root]
+        while pending:
+            folder = pending.pop()
+            if folder in self._index:
+                continue
+            entry = saved.pop(folder, None)
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+                if entry is not None and entry[0] == mtime_ns:
+                    files, subfolders = entry[1], entry[2]  # Nothing added, removed or renamed
+                else:
+                    files, subfolders = scan_directory(folder)
+            except OSError:
+                if entry is not None:
+                    saved[folder] = entry  # Gone: its files are reported removed below
+                continue
+            old_files = entry[1] if entry is not None else {}
+            for name in old_files.keys() - files.keys():
+                removed[os.path.join(folder, name)] = old_files[name]
+            for name in files.keys() - old_files.keys():
+                added[os.path.join(folder, name)] = files[name]
+            self._index[folder] = (mtime_ns, files, subfolders)
+            folders.append(folder)
+            pending.extend(os.path.join(folder, name) for name in subfolders)
+        for folder, (_, files, _) in saved.items():
+            removed.update((os.path.join(folder, name), stat) for name, stat in files.items())
+
+        self._store().drop_folders(saved)
+        self._store().save_folders({folder: self._index[folder] for folder in folders})
+        self._indexed.emit(folders, [])
+        self._report(added, removed)
+
+    def _clear_index(self):
+        folders = list(self._index)
+        self._index.clear()
+        self._store().drop_folders(folders)
+        self._indexed.emit([], folders)
+
+    def _poll_folders(self, folders):
+        changed = []
+        for folder in folders:
+            entry = self._index.get(folder)
+            if entry is None:
+                continue
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != entry[0]:
+                changed.append(folder)
+        if changed:
+            self._rescan(changed)
+
+    def _rescan(self, folders):
+        """List changed folders again and report the difference with the index"""
+        added = {}  # path -> (size, mtime_ns, inode)
+        removed = {}
+        new_folders = []
+        lost_folders = []
+        listed = []
+        for folder in sorted(folders):
+            entry = self._index.get(folder)
+            if entry is None:
+                continue  # Dropped along with a parent folder
+            _, old_files, old_subfolders = entry
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+                files, subfolders = scan_directory(folder)
+            except OSError:
+                self._drop_tree(folder, removed, lost_folders)
+                continue
+            self._index[folder] = (mtime_ns, files, subfolders)
+            listed.append(folder)
+
+            for name in old_files.keys() - files.keys():
+                removed[os.path.join(folder, name)] = old_files[name]
+            for name in files.keys() - old_files.keys():
+                added[os.path.join(folder, name)] = files[name]
+            for name in subfolders - old_subfolders:
+                self._index_tree(os.path.join(folder, name), added, new_folders)
+            for name in old_subfolders - subfolders:
+                self._drop_tree(os.path.join(folder, name), removed, lost_folders)
+
+        self._store().drop_folders(lost_folders)
+        self._store().save_folders({folder: self._index[folder]
+                                    for folder in listed + new_folders if folder in self._index})
+        if new_folders or lost_folders:
+            self._indexed.emit(new_folders, lost_folders)
+        self._report(added, removed)
+
+    def _report(self, added, removed):
+        """Pair up renames among {path: (size, mtime_ns, inode)} changes and emit them"""
+        # A rename or move shows up as a removal plus an addition of the same file
+        added_by_identity = {(inode, size, mtime_ns): path
+                             for path, (size, mtime_ns, inode) in added.items()}
+        renamed = []
+        for old_path, (size, mtime_ns, inode) in list(removed.items()):
+            new_path = added_by_identity.pop((inode, size, mtime_ns), None)
+            if new_path is not None:
+                renamed.append((old_path, new_path))
+                del removed[old_path]
+                del added[new_path]
+
+        if added or removed or renamed:
+            self.changes.emit(self._read_tags(added), sorted(removed), sorted(renamed))
+
+    def _read_tags(self, added):
+        """(path, size, mtime_ns, info) records for added files, parsed unless cached"""
+        cache = self._store()
+        records = []
+        for path in sorted(added):
+            size, mtime_ns, _ = added[path]
+            info = None if cache.is_fresh(path, size, mtime_ns) else read_metadata(path)
+            records.append((path, size, mtime_ns, info))
+        return records
+
+
+def _report_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error watching library: {str(future.exception())}")
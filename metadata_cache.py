@@ -0,0 +1,212 @@
+import json
+import os
+import sqlite3
+
+from app_paths import user_data_dir
+from tag_reader import read_tags
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    duration REAL NOT NULL DEFAULT 0,
+    cover BLOB,
+    cover_checked INTEGER NOT NULL DEFAULT 1,
+    cover_hash TEXT,
+    replaygain REAL
+)
+"""
+
+# Listings of watched folders, so changes made while the player was closed
+# are found at the next start
+FOLDER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    listing TEXT NOT NULL
+)
+"""
+
+# Columns added after the first release of the schema: name -> declaration
+MIGRATIONS = {
+    "cover_checked": "INTEGER NOT NULL DEFAULT 1",
+    "cover_hash": "TEXT",
+    "replaygain": "REAL",
+}
+
+# Columns filled from the tags: rows cached before they existed are re-parsed
+REPARSE_ON_ADD = {"replaygain"}
+
+# Bumped when read_metadata learns to read tags it used to miss; rows written
+# by an older reader that found no title are parsed again
+TAG_READER_VERSION = 1
+
+FIELDS = ("title", "artist", "album", "duration", "cover", "cover_checked", "cover_hash",
+          "replaygain")
+
+
+def read_metadata(file_path):
+    """Parse title, artist, album, duration and ReplayGain from a file.
+
+    Covers are not read here (``cover`` is always None); the cover loader
+    fetches them with tag_reader.read_cover when a track is shown.
+    """
+    return read_tags(file_path)
+
+
+class MetadataCache:
+    """SQLite-backed track metadata keyed by (path, size, mtime).
+
+    Entries are revalidated lazily: a lookup stats the file and only re-parses
+    the tags when the size or modification time no longer match the stored row.
+
+    Cover art is stored as a small thumbnail plus a hash of the original
+    image bytes. The thumbnail is produced off the GUI thread by the cover
+    loader and written back with set_cover(); until then ``cover_checked``
+    is false.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(user_data_dir(), "metadata.db")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.execute(FOLDER_SCHEMA)
+        self._migrate()
+        self.conn.commit()
+        self.hits = 0  # get() calls answered from the cache
+        self.misses = 0  # get() calls that had to parse the file
+
+    def _migrate(self):
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tracks)")}
+        for name, declaration in MIGRATIONS.items():
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE tracks ADD COLUMN {name} {declaration}")
+                if name in REPARSE_ON_ADD:
+                    self.conn.execute("UPDATE tracks SET mtime_ns = -1")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < TAG_READER_VERSION:
+            self.conn.execute("UPDATE tracks SET mtime_ns = -1 WHERE title IS NULL")
+            self.conn.execute(f"PRAGMA user_version = {TAG_READER_VERSION}")
+
+    def get(self, file_path):
+        """Return cached metadata for file_path, re-reading tags if stale.
+
+        Returns None when the file does not exist.
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, title, artist, album, duration, cover, cover_checked, "
+            "cover_hash, replaygain FROM tracks WHERE path = ?", (file_path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            self.hits += 1
+            info = dict(zip(FIELDS, row[2:]))
+            info["cover_checked"] = bool(info["cover_checked"])
+            return info
+
+        self.misses += 1
+        info = read_metadata(file_path)
+        info.update(cover_checked=False, cover_hash=None)
+        self.put(file_path, stat.st_size, stat.st_mtime_ns, info, cover_checked=False)
+        return info
+
+    def set_cover(self, file_path, thumbnail, cover_hash):
+        """Store the cover thumbnail produced for file_path"""
+        self.conn.execute(
+            "UPDATE tracks SET cover = ?, cover_hash = ?, cover_checked = 1 WHERE path = ?",
+            (thumbnail, cover_hash, file_path))
+        self.conn.commit()
+
+    def cached_tags(self, file_paths):
+        """Return {path: (title, artist, album)} for already cached paths.
+
+        Unlike get() this does not stat the files, so it is cheap enough to
+        run over whole playlists, e.g. to build the search index.
+        """
+        tags = {}
+        file_paths = list(file_paths)
+        for start in range(0, len(file_paths), 500):
+            chunk = file_paths[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(
+                    f"SELECT path, title, artist, album FROM tracks WHERE path IN ({placeholders})",
+                    chunk):
+                tags[row[0]] = row[1:]
+        return tags
+
+    def is_fresh(self, file_path, size, mtime_ns):
+        """Return True if a row for file_path matches the given size and mtime"""
+        row = self.conn.execute(
+            "SELECT 1 FROM tracks WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (file_path, size, mtime_ns)).fetchone()
+        return row is not None
+
+    def put(self, file_path, size, mtime_ns, info, cover_checked=True):
+        """Store metadata for file_path as of the given size and mtime"""
+        self.put_many([(file_path, size, mtime_ns, info)], cover_checked)
+
+    def put_many(self, records, cover_checked=True):
+        """Store (path, size, mtime_ns, info) records in a single transaction"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO tracks "
+            "(path, size, mtime_ns, title, artist, album, duration, cover, cover_checked, "
+            "cover_hash, replaygain) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(path, size, mtime_ns, info["title"], info["artist"], info["album"],
+              info["duration"], info.get("cover"), int(cover_checked), info.get("cover_hash"),
+              info.get("replaygain"))
+             for path, size, mtime_ns, info in records])
+        self.conn.commit()
+
+    def invalidate(self, file_path):
+        """Drop the cached entry for file_path"""
+        self.invalidate_many([file_path])
+
+    def invalidate_many(self, file_paths):
+        """Drop the cached entries for file_paths in a single transaction"""
+        self.conn.executemany("DELETE FROM tracks WHERE path = ?",
+                              [(file_path,) for file_path in file_paths])
+        self.conn.commit()
+
+    def rename(self, old_path, new_path):
+        """Keep the entry (tags and cover) of a file that was renamed or moved"""
+        self.conn.execute("DELETE FROM tracks WHERE path = ?", (new_path,))
+        self.conn.execute("UPDATE tracks SET path = ? WHERE path = ?", (new_path, old_path))
+        self.conn.commit()
+
+    def load_folders(self, root):
+        """Return the saved {folder: (mtime_ns, files, subfolders)} of root and below"""
+        below = root.rstrip(os.sep) + os.sep
+        folders = {}
+        for folder, mtime_ns, listing in self.conn.execute(
+                "SELECT folder, mtime_ns, listing FROM folders "
+                "WHERE folder = ? OR (folder >= ? AND folder < ?)",
+                (root, below, below[:-1] + chr(ord(os.sep) + 1))):
+            files, subfolders = json.loads(listing)
+            folders[folder] = (mtime_ns, {name: tuple(stat) for name, stat in files.items()},
+                               set(subfolders))
+        return folders
+
+    def save_folders(self, folders):
+        """Store {folder: (mtime_ns, files, subfolders)} listings in a single transaction"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO folders (folder, mtime_ns, listing) VALUES (?, ?, ?)",
+            [(folder, mtime_ns, json.dumps([files, sorted(subfolders)]))
+             for folder, (mtime_ns, files, subfolders) in folders.items()])
+        self.conn.commit()
+
+    def drop_folders(self, folders):
+        self.conn.executemany("DELETE FROM folders WHERE folder = ?",
+                              [(folder,) for folder in folders])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
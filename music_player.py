@@ -1,20 +1,32 @@
 import sys
 import os
 import json
+from collections import deque
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QPushButton, QListWidget, QLabel, 
+                            QHBoxLayout, QListView, QLabel, 
                             QSlider, QStyle, QFileDialog, QMessageBox, QLineEdit,
-                            QGraphicsDropShadowEffect, QInputDialog, QComboBox)
-from PyQt5.QtCore import Qt, QUrl, QTimer, QSize, QPropertyAnimation, QEasingCurve, QRect
-from PyQt5.QtGui import QIcon, QPixmap, QDragEnterEvent, QDropEvent, QFont
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
-import mutagen
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3
-import pygame
-from styles import DARK_THEME, LIGHT_THEME
-from advanced_styles import (ADVANCED_STYLES, AnimatedButton, create_shadow_effect,
-                           extract_colors_from_art)
+                            QInputDialog, QComboBox,
+                            QActionGroup, QMenu, QAbstractItemView)
+from PyQt5.QtCore import Qt, QEvent, QTimer, QSize, QPropertyAnimation, QEasingCurve
+from PyQt5.QtGui import QPixmap, QDragEnterEvent, QDropEvent
+from advanced_styles import AnimatedButton, create_shadow_effect
+from metadata_cache import MetadataCache
+from drop_import import DropImporter
+from library_scanner import LibraryScanner
+from library_watcher import LibraryWatcher
+from playlist import Playlist
+from playlist_model import PlaylistModel, PlaylistFilterModel
+from playlist_store import PlaylistStore
+from search_index import SearchIndex
+from cover_art import CoverLoader
+from player_engine import PlayerEngine
+from theme_engine import ThemeEngine
+from waveform import LoudnessAnalyzer, WaveformLoader, WaveformSlider
+from replaygain import track_gain
+from tracing import PerfOverlay, traced, tracer
+from track_table import tracks
+
+DROP_CHUNK = 200  # Dropped tracks inserted per event loop turn
 
 class MusicPlayer(QMainWindow):
     def __init__(self):
@@ -22,31 +34,95 @@ class MusicPlayer(QMainWindow):
         self.setWindowTitle("Professional Music Player")
         self.setMinimumSize(800, 600)
         
-        # Initialize pygame mixer
-        pygame.mixer.init()
+        # Persistent tag/cover cache so track changes don't re-parse files
+        self.metadata_cache = MetadataCache()
+        
+        # Playback state lives in the engine; this window only displays it.
+        # The audio device is opened on first play, after the window is up.
+        self.engine = PlayerEngine(lookup=self.metadata_cache.get, gain_lookup=self.track_gain)
+        self.engine.on_track_started = self.on_track_started
+        self.engine.on_state_changed = self.on_playback_state_changed
+        self.engine.on_track_failed = self.on_track_failed
+        self.engine.on_track_missing = self.on_track_missing
+        self.engine.on_reschedule = self.schedule_boundary
+        self.engine.on_dequeued = self.on_dequeued
         
-        # Player state
-        self.current_playlist = []
-        self.current_index = 0
-        self.is_playing = False
-        self.is_repeat = False
-        self.is_shuffle = False
+        # View state
+        self.current_playlist = Playlist()
         self.dark_mode = True
-        self.playlists = {"Default": []}  # Dictionary to store playlists with a default playlist
+        self.playlists = {}  # Playlist name -> Playlist, or None until first opened
         self.current_playlist_name = "Default"
         self.is_sliding = False  # Flag to track if user is sliding the progress bar
         self.slider_position = 0  # Store the last slider position
-        self.start_time = 0  # Store the time when the song started playing
+        
+        self.scanner = None  # Background folder import, if one is running
+        self.scan_playlist_name = None
+        self.drop_importer = None  # Background import of a drop, if one is running
+        self.drop_target = None  # [playlist name, row] the next dropped tracks go to
+        self.drop_queue = deque()  # Dropped track records waiting to be inserted
+        self.drop_counts = (0, 0)  # Tracks accepted and files skipped so far
+        self.drop_timer = QTimer(self)
+        self.drop_timer.setInterval(0)
+        self.drop_timer.timeout.connect(self.insert_dropped)
+        
+        # Album art decoding and LRU cache
+        self.cover_loader = CoverLoader(parent=self)
+        self.cover_loader.cover_ready.connect(self.on_cover_ready)
+        self.cover_loader.cover_missing.connect(self.on_cover_missing)
+        self.cover_loader.thumbnail_ready.connect(self.on_cover_thumbnail)
+        
+        # Waveforms and loudness, analyzed once per track in worker processes
+        self.waveform_loader = WaveformLoader(parent=self)
+        self.waveform_loader.waveform_ready.connect(self.on_waveform_ready)
+        self.loudness_analyzer = LoudnessAnalyzer(self.waveform_loader.cache, parent=self)
+        self.loudness_analyzer.progress.connect(self.on_loudness_progress)
+        self.loudness_analyzer.finished.connect(self.on_loudness_finished)
+        
+        # Search index over file names and tags, built in idle chunks
+        self.search_index = SearchIndex()
+        self.search_query = ""
+        self.index_timer = QTimer(self)
+        self.index_timer.setInterval(0)
+        self.index_timer.timeout.connect(self.index_idle)
+        
+        # Playlists persist in SQLite; only the active one is read at startup
+        self.playlist_store = PlaylistStore()
+        self.playlist_store.create("Default")
+        self.playlists = dict.fromkeys(self.playlist_store.names())
+        active = self.playlist_store.get_setting("active_playlist", "Default")
+        self.current_playlist_name = active if active in self.playlists else "Default"
+        self.current_playlist = self.get_playlist(self.current_playlist_name)
+        self.engine.set_normalize(self.playlist_store.get_setting("normalize", "1") == "1")
+        self.engine.queue.enqueue(self.playlist_store.load_queue())
+        
+        # Imported folders are watched; changes on disk arrive as deltas
+        self.watched_folders = json.loads(self.playlist_store.get_setting("watched_folders", "{}"))
+        self.library_watcher = LibraryWatcher(self.metadata_cache.db_path, parent=self)
+        self.library_watcher.changes.connect(self.on_library_changes)
+        for folder in self.watched_folders:
+            self.library_watcher.watch(folder)
         
         # Create UI
         self.init_ui()
+        self.perf_overlay = PerfOverlay(self, [("covers", self.cover_loader.cache), 
+                                               ("tags", self.metadata_cache)])
         
-        # Setup timer for progress updates
-        self.timer = QTimer()
-        self.timer.setInterval(100)  # Update more frequently for smoother progress
+        # Progress labels refresh once per displayed second while visible
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.update_progress)
         
+        # Fires when the audio engine expects the track to end or switch
+        self.boundary_timer = QTimer(self)
+        self.boundary_timer.setSingleShot(True)
+        self.boundary_timer.setTimerType(Qt.PreciseTimer)
+        self.boundary_timer.timeout.connect(self.check_track_boundary)
+        
+        self.set_current_playlist(self.current_playlist_name)
+        
         # Apply initial theme
+        self.themes = ThemeEngine(self)
         self.set_theme("dark")
         
     def init_ui(self):
@@ -80,20 +156,36 @@ class MusicPlayer(QMainWindow):
         
         layout.addLayout(playlist_section)
         
-        # Search bar
+        # Search bar; queries run once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(
+            lambda: self.search_playlist(self.search_bar.text()))
+        
         self.search_bar = QLineEdit()
         self.search_bar.setObjectName("searchBar")
         self.search_bar.setPlaceholderText("Search in playlist...")
-        self.search_bar.textChanged.connect(self.search_playlist)
+        self.search_bar.textChanged.connect(self.search_timer.start)
         layout.addWidget(self.search_bar)
         
         # Playlist
-        self.playlist_widget = QListWidget()
-        self.playlist_widget.setAcceptDrops(True)
-        self.playlist_widget.dragEnterEvent = self.dragEnterEvent
-        self.playlist_widget.dropEvent = self.dropEvent
-        self.playlist_widget.itemDoubleClicked.connect(self.play_selected)
-        layout.addWidget(self.playlist_widget)
+        self.playlist_model = PlaylistModel(self.current_playlist, self, dead=self.engine.dead)
+        self.playlist_filter = PlaylistFilterModel(self)
+        self.playlist_filter.setSourceModel(self.playlist_model)
+        self.playlist_view = QListView()
+        self.playlist_view.setObjectName("playlistView")
+        self.playlist_view.setModel(self.playlist_filter)
+        self.playlist_view.setUniformItemSizes(True)
+        self.playlist_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.playlist_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.playlist_view.customContextMenuRequested.connect(self.show_playlist_menu)
+        self.playlist_view.setAcceptDrops(True)
+        self.playlist_view.dragEnterEvent = self.dragEnterEvent
+        self.playlist_view.dragMoveEvent = self.dragMoveEvent
+        self.playlist_view.dropEvent = self.dropEvent
+        self.playlist_view.doubleClicked.connect(self.play_selected)
+        layout.addWidget(self.playlist_view)
         
         # Update playlist selector
         self.update_playlist_selector()
@@ -117,10 +209,13 @@ class MusicPlayer(QMainWindow):
         self.song_info.setAlignment(Qt.AlignCenter)
         player_layout.addWidget(self.song_info)
         
-        # Progress bar
-        self.progress_slider = QSlider(Qt.Horizontal)
+        # Progress bar, showing the track's waveform once it is analyzed
+        self.progress_slider = WaveformSlider(Qt.Horizontal)
         self.progress_slider.setRange(0, 0)
-        self.progress_slider.sliderMoved.connect(self.set_position)
+        # Dragging only updates the time label; the seek happens on release
+        self.progress_slider.sliderPressed.connect(self.slider_pressed)
+        self.progress_slider.sliderMoved.connect(self.slider_value_changed)
+        self.progress_slider.sliderReleased.connect(self.slider_released)
         player_layout.addWidget(self.progress_slider)
         
         # Time labels
@@ -192,7 +287,7 @@ class MusicPlayer(QMainWindow):
         self.create_menu_bar()
         
         # Set initial volume
-        pygame.mixer.music.set_volume(0.5)
+        self.engine.set_volume(0.5)
         
     def create_menu_bar(self):
         menubar = self.menuBar()
@@ -206,12 +301,18 @@ class MusicPlayer(QMainWindow):
         open_folder_action = file_menu.addAction("Open Folder")
         open_folder_action.triggered.connect(self.open_folder)
         
+        cancel_scan_action = file_menu.addAction("Cancel Folder Scan")
+        cancel_scan_action.triggered.connect(self.cancel_scan)
+        
+        unwatch_action = file_menu.addAction("Stop Watching Folders")
+        unwatch_action.triggered.connect(self.unwatch_folders)
+        
         file_menu.addSeparator()
         
-        save_playlist_action = file_menu.addAction("Save Playlist")
+        save_playlist_action = file_menu.addAction("Export Playlists...")
         save_playlist_action.triggered.connect(self.save_playlist)
         
-        load_playlist_action = file_menu.addAction("Load Playlist")
+        load_playlist_action = file_menu.addAction("Import Playlists...")
         load_playlist_action.triggered.connect(self.load_playlist)
         
         # Playlist menu
@@ -232,21 +333,83 @@ class MusicPlayer(QMainWindow):
         dark_theme_action = theme_menu.addAction("Dark Theme")
         dark_theme_action.triggered.connect(lambda: self.set_theme("dark"))
         
+        # Playback menu
+        playback_menu = menubar.addMenu("Playback")
+        crossfade_menu = playback_menu.addMenu("Crossfade")
+        crossfade_group = QActionGroup(self)
+        for label, crossfade_ms in (("Off (gapless)", 0), ("2 seconds", 2000), 
+                                    ("5 seconds", 5000), ("10 seconds", 10000)):
+            action = crossfade_menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(crossfade_ms == self.engine.audio.crossfade_ms)
+            action.triggered.connect(lambda checked, ms=crossfade_ms: self.set_crossfade(ms))
+            crossfade_group.addAction(action)
+        
+        normalize_action = playback_menu.addAction("Normalize Loudness")
+        normalize_action.setCheckable(True)
+        normalize_action.setChecked(self.engine.normalize)
+        normalize_action.toggled.connect(self.set_normalize)
+        
+        playback_menu.addSeparator()
+        
+        clear_queue_action = playback_menu.addAction("Clear Queue")
+        clear_queue_action.triggered.connect(self.clear_queue)
+        
+        # Tools menu
+        tools_menu = menubar.addMenu("Tools")
+        
+        self.overlay_action = tools_menu.addAction("Performance Overlay")
+        self.overlay_action.setCheckable(True)
+        self.overlay_action.setShortcut("F12")
+        self.overlay_action.toggled.connect(self.toggle_perf_overlay)
+        
+        export_trace_action = tools_menu.addAction("Export Trace...")
+        export_trace_action.triggered.connect(self.export_trace)
+        
+        tools_menu.addSeparator()
+        
+        analyze_action = tools_menu.addAction("Analyze Library Loudness")
+        analyze_action.triggered.connect(self.analyze_loudness)
+        
+        stop_analysis_action = tools_menu.addAction("Stop Loudness Analysis")
+        stop_analysis_action.triggered.connect(self.loudness_analyzer.stop)
+        
     def update_playlist_selector(self):
         """Update the playlist selector combobox with current playlists"""
+        # Repopulating would otherwise switch to (and load) the first entry
+        self.playlist_selector.blockSignals(True)
         self.playlist_selector.clear()
         self.playlist_selector.addItems(self.playlists.keys())
         self.playlist_selector.setCurrentText(self.current_playlist_name)
+        self.playlist_selector.blockSignals(False)
+        
+    def get_playlist(self, name):
+        """Return the named Playlist, reading it from the store on first use"""
+        if name not in self.playlists:
+            return None
+        playlist = self.playlists[name]
+        if playlist is None:
+            playlist = self.playlist_store.load(name)
+            self.playlists[name] = playlist
+            self.index_tracks(playlist.to_list(), playlist.track_ids())
+        return playlist
         
     def switch_playlist(self, playlist_name):
         """Switch to a different playlist"""
         if playlist_name in self.playlists:
-            self.current_playlist_name = playlist_name
-            self.current_playlist = self.playlists[playlist_name]
-            self.playlist_widget.clear()
-            for file_path in self.current_playlist:
-                self.playlist_widget.addItem(os.path.basename(file_path))
-            self.setWindowTitle(f"Professional Music Player - {playlist_name}")
+            self.set_current_playlist(playlist_name)
+            
+    @traced()
+    def set_current_playlist(self, name):
+        """Make the named playlist current and show it, keeping the search filter"""
+        self.current_playlist_name = name
+        self.current_playlist = self.get_playlist(name)
+        self.engine.set_playlist(self.current_playlist)
+        self.playlist_store.set_setting("active_playlist", name)
+        self.playlist_model.set_playlist(self.current_playlist)
+        self.search_playlist(self.search_bar.text())
+        self.index_timer.start()
+        self.setWindowTitle(f"Professional Music Player - {name}")
             
     def create_playlist(self):
         name, ok = QInputDialog.getText(self, "Create Playlist", "Enter playlist name:")
@@ -255,12 +418,10 @@ class MusicPlayer(QMainWindow):
                 QMessageBox.warning(self, "Error", "A playlist with this name already exists!")
                 return
                 
-            self.playlists[name] = []
-            self.current_playlist_name = name
-            self.current_playlist = self.playlists[name]
-            self.playlist_widget.clear()
+            self.playlist_store.create(name)
+            self.playlists[name] = Playlist()
+            self.set_current_playlist(name)
             self.update_playlist_selector()
-            self.setWindowTitle(f"Professional Music Player - {name}")
             
     def delete_playlist(self):
         if len(self.playlists) <= 1:
@@ -275,15 +436,11 @@ class MusicPlayer(QMainWindow):
                 QMessageBox.warning(self, "Warning", "Cannot delete the Default playlist!")
                 return
                 
+            self.playlist_store.delete(name)
             del self.playlists[name]
             if self.current_playlist_name == name:
-                self.current_playlist_name = "Default"
-                self.current_playlist = self.playlists["Default"]
-                self.playlist_widget.clear()
-                for file_path in self.current_playlist:
-                    self.playlist_widget.addItem(os.path.basename(file_path))
+                self.set_current_playlist("Default")
             self.update_playlist_selector()
-            self.setWindowTitle(f"Professional Music Player - {self.current_playlist_name}")
             
     def open_file(self):
         file_name, _ = QFileDialog.getOpenFileName(self, "Open Music File", "", 
@@ -294,77 +451,236 @@ class MusicPlayer(QMainWindow):
     def open_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Music Folder")
         if folder:
-            for file in os.listdir(folder):
-                if file.endswith(('.mp3', '.wav', '.ogg')):
-                    self.add_to_playlist(os.path.join(folder, file))
-                    
-    def add_to_playlist(self, file_path):
-        if file_path not in self.current_playlist:
-            self.current_playlist.append(file_path)
-            self.playlist_widget.addItem(os.path.basename(file_path))
+            self.start_scan([folder])
             
-    def play_selected(self, item):
-        try:
-            self.current_index = self.playlist_widget.row(item)
-            self.play_current()
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Could not play selected song: {str(e)}")
+    def start_scan(self, roots):
+        """Import folders recursively on background workers"""
+        self.cancel_scan()
+        self.scan_playlist_name = self.current_playlist_name
+        self.scanner = LibraryScanner(roots, self.metadata_cache.db_path, parent=self)
+        self.scanner.batch_ready.connect(self.on_scan_batch)
+        self.scanner.progress.connect(self.on_scan_progress)
+        self.scanner.finished.connect(self.on_scan_finished)
+        self.statusBar().showMessage("Scanning library...")
+        self.scanner.start()
+        for root in roots:
+            self.watch_folder(root, self.scan_playlist_name)
+        
+    def cancel_scan(self):
+        if self.scanner is not None and self.scanner.is_running():
+            self.scanner.cancel()
             
-    def play_current(self):
-        if not self.current_playlist:
+    def on_scan_batch(self, records):
+        """Store freshly parsed tags and append the batch to the scanned playlist"""
+        if self.sender() is not self.scanner:
+            return  # Late batch from a cancelled scan
+        parsed = [record for record in records if record[3] is not None]
+        if parsed:
+            self.metadata_cache.put_many(parsed, cover_checked=False)
+        self.add_tracks([record[0] for record in records], self.scan_playlist_name)
+        self.store_durations(parsed)
+        
+    def store_durations(self, records):
+        """Keep the lengths from freshly parsed scan records in the track table"""
+        for path, _, _, info in records:
+            tracks.set_duration(path, info["duration"])
+        
+    def on_scan_progress(self, processed, discovered):
+        self.statusBar().showMessage(f"Scanning library... {processed}/{discovered} files")
+        
+    def on_scan_finished(self, cancelled):
+        if self.sender() is not self.scanner:
             return
+        message = "Folder scan cancelled" if cancelled else "Folder scan complete"
+        self.statusBar().showMessage(message, 3000)
+        self.scanner = None
+        
+    def watch_folder(self, folder, playlist_name):
+        """Keep folder's tracks in sync from now on; new files go to playlist_name"""
+        folder = os.path.abspath(folder)
+        self.library_watcher.watch(folder)
+        self.watched_folders[folder] = playlist_name
+        self.playlist_store.set_setting("watched_folders", json.dumps(self.watched_folders))
+        
+    def unwatch_folders(self):
+        self.library_watcher.clear()
+        self.watched_folders = {}
+        self.playlist_store.set_setting("watched_folders", "{}")
+        self.statusBar().showMessage("No longer watching folders", 3000)
+        
+    def playlist_for_file(self, file_path):
+        """Playlist that the innermost watched folder holding file_path feeds"""
+        folder = max((folder for folder in self.watched_folders 
+                      if file_path.startswith(folder + os.sep)), key=len, default=None)
+        return self.watched_folders.get(folder)
+        
+    @traced()
+    def on_library_changes(self, added, removed, renamed):
+        """Apply a watcher delta to the metadata cache and the loaded playlists.
+        
+        added holds (path, size, mtime_ns, info) records, parsed by the watcher.
+        """
+        dead = self.engine.dead
+        parsed = [record for record in added if record[3] is not None]
+        if parsed:
+            self.metadata_cache.put_many(parsed, cover_checked=False)
+        added = [record[0] for record in added]
+        
+        # Renamed and moved files keep their rows, tags and cover
+        for old_path, new_path in renamed:
+            self.metadata_cache.rename(old_path, new_path)
+            for playlist in self.playlists.values():
+                if playlist is self.current_playlist:
+                    self.playlist_model.rename_path(old_path, new_path)
+                elif playlist is not None:
+                    playlist.rename(old_path, new_path)
+            self.engine.track_renamed(old_path, new_path)
+            dead.discard(old_path)
+        if renamed:
+            self.playlist_store.rename_paths(renamed)
+            self.index_tracks(new_path for _, new_path in renamed)
             
-        try:
-            current_file = self.current_playlist[self.current_index]
-            if not os.path.exists(current_file):
-                QMessageBox.warning(self, "Error", f"File not found: {os.path.basename(current_file)}")
-                self.remove_current_song()
-                return
-                
-            # Stop current playback if any
-            pygame.mixer.music.stop()
+        # Deleted files stay in place, marked dead; playback skips them
+        if removed:
+            self.metadata_cache.invalidate_many(removed)
+        dead.update(removed)
+        
+        # New files join the playlist their folder was imported into
+        dead.difference_update(added)
+        targets = {}
+        for file_path in added:
+            name = self.playlist_for_file(file_path)
+            if name is not None:
+                targets.setdefault(name, []).append(file_path)
+        for name, file_paths in targets.items():
+            self.add_tracks(file_paths, name)
+        self.store_durations(parsed)
             
-            # Load and play the new file
-            pygame.mixer.music.load(current_file)
-            pygame.mixer.music.play()
+        self.playlist_model.refresh_paths(removed + added)
+        if removed and self.engine.is_playing:
+            self.engine.preload_next()  # The preloaded track may be gone
+        counts = [f"{len(paths)} {label}" for paths, label in 
+                  ((added, "added"), (removed, "removed"), (renamed, "renamed")) if paths]
+        self.statusBar().showMessage("Library updated: " + ", ".join(counts), 5000)
+        
+    def add_to_playlist(self, file_path):
+        self.add_tracks([file_path])
+        
+    @traced()
+    def add_tracks(self, file_paths, playlist_name=None, row=None):
+        """Add files to a playlist (the current one by default), skipping duplicates.
+        
+        Files are appended unless row is given, in which case they are
+        inserted before it. Returns the paths actually added.
+        """
+        playlist_name = playlist_name or self.current_playlist_name
+        playlist = self.get_playlist(playlist_name)
+        if playlist is None:
+            return []
+        if row is None or row >= len(playlist):
+            row = len(playlist)
             
-            # Update player state
-            self.is_playing = True
-            self.play_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
-            self.timer.start()
+        # Index first so the search filter can check the new rows
+        file_paths = list(file_paths)
+        self.index_tracks(file_paths)
+        if playlist is self.current_playlist:
+            added = self.playlist_model.insert_paths(row, file_paths)
+            if added:
+                self.engine.tracks_added(row, len(added))
+        else:
+            added = playlist.insert(row, file_paths)
+        if added:
+            if row == len(playlist) - len(added):
+                self.playlist_store.append(playlist_name, added)
+            else:
+                self.playlist_store.insert(playlist_name, row, added)
+        return added
             
-            # Reset progress
-            self.slider_position = 0
-            self.progress_slider.setValue(0)
-            self.current_time.setText("00:00")
+    def play_selected(self, index):
+        try:
+            self.engine.select(self.playlist_filter.mapToSource(index).row())
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not play selected song: {str(e)}")
             
-            # Update song info and album art
-            self.update_song_info()
+    def show_playlist_menu(self, pos):
+        """Context menu for queueing the selected tracks"""
+        rows = sorted(self.playlist_filter.mapToSource(index).row() 
+                      for index in self.playlist_view.selectedIndexes())
+        if not rows:
+            return
+        file_paths = [self.current_playlist[row] for row in rows]
+        menu = QMenu(self)
+        play_next_action = menu.addAction("Play Next")
+        play_next_action.triggered.connect(lambda: self.queue_tracks(file_paths, up_next=True))
+        enqueue_action = menu.addAction("Add to Queue")
+        enqueue_action.triggered.connect(lambda: self.queue_tracks(file_paths))
+        if self.engine.queue:
+            menu.addSeparator()
+            clear_action = menu.addAction(f"Clear Queue ({len(self.engine.queue)})")
+            clear_action.triggered.connect(self.clear_queue)
+        menu.exec_(self.playlist_view.viewport().mapToGlobal(pos))
+        
+    def queue_tracks(self, file_paths, up_next=False):
+        """Queue files to play after the current track, ahead of the queue if up_next"""
+        if up_next:
+            self.engine.play_next(file_paths)
+            self.playlist_store.enqueue_next(file_paths)
+        else:
+            self.engine.enqueue(file_paths)
+            self.playlist_store.enqueue(file_paths)
+        self.statusBar().showMessage(f"{len(self.engine.queue)} tracks queued", 3000)
+        
+    def clear_queue(self):
+        self.engine.clear_queue()
+        self.playlist_store.clear_queue()
+        self.statusBar().showMessage("Queue cleared", 3000)
+        
+    def on_dequeued(self, file_path):
+        self.playlist_store.dequeue()
+        
+    def on_track_started(self, file_path, info):
+        """Reset progress and show the track the engine just started"""
+        self.slider_position = 0
+        self.progress_slider.setValue(0)
+        self.current_time.setText("00:00")
+        
+        # Update song info and album art
+        self.update_song_info(file_path, info)
+        self.start_timers()
+        
+    def on_playback_state_changed(self, is_playing):
+        if is_playing:
+            self.play_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
+            self.play_btn.startPulse()
+            self.start_timers()
+        else:
+            self.play_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+            self.play_btn.stopPulse()
+            self.stop_timers()
             
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Could not play file: {str(e)}")
+    def on_track_failed(self, file_path, message):
+        QMessageBox.warning(self, "Error", message)
+        if self.current_file() == file_path:
             self.remove_current_song()
             
+    def on_track_missing(self, file_path):
+        self.playlist_model.refresh_paths([file_path])
+        self.statusBar().showMessage(f"File not found: {os.path.basename(file_path)}", 5000)
+            
     def remove_current_song(self):
         """Remove the current song from the playlist"""
         if not self.current_playlist:
             return
             
         try:
-            # Remove from playlist widget
-            self.playlist_widget.takeItem(self.current_index)
+            # Remove from the playlist, its view and the store
+            row = self.engine.index
+            removed_file = self.current_playlist[row]
+            self.playlist_model.remove_row(row)
+            self.playlist_store.remove(self.current_playlist_name, removed_file)
+            self.engine.track_removed(row)
             
-            # Remove from current playlist
-            del self.current_playlist[self.current_index]
-            
-            # Update current index
-            if self.current_playlist:
-                self.current_index = min(self.current_index, len(self.current_playlist) - 1)
-            else:
-                self.current_index = 0
-                self.is_playing = False
-                self.play_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
-                self.timer.stop()
+            if not self.current_playlist:
                 self.song_info.setText("No song playing")
                 self.album_art.clear()
                 
@@ -373,223 +689,169 @@ class MusicPlayer(QMainWindow):
             
     def play_pause(self):
         """Toggle between play and pause states"""
-        if not self.current_playlist:
+        if self.current_file() is None and not self.engine.queue:
             return
             
         try:
-            if self.is_playing:
-                pygame.mixer.music.pause()
-                self.is_playing = False
-                self.play_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
-                self.play_btn.stopPulse()
-                self.timer.stop()
-            else:
-                pygame.mixer.music.unpause()
-                self.is_playing = True
-                self.play_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
-                self.play_btn.startPulse()
-                self.start_time = pygame.time.get_ticks() - (self.slider_position * 1000)  # Update start time
-                self.timer.start()
+            self.engine.toggle()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error during play/pause: {str(e)}")
-            self.is_playing = False
-            self.play_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
-            self.play_btn.stopPulse()
-            self.timer.stop()
+            self.engine.is_playing = False
+            self.on_playback_state_changed(False)
             
     def play_next(self):
-        if not self.current_playlist:
-            return
-            
-        if self.is_shuffle:
-            import random
-            self.current_index = random.randint(0, len(self.current_playlist) - 1)
-        else:
-            self.current_index = (self.current_index + 1) % len(self.current_playlist)
-            
-        self.play_current()
+        self.engine.next()
         
     def play_previous(self):
-        if not self.current_playlist:
-            return
-            
-        if self.is_shuffle:
-            import random
-            self.current_index = random.randint(0, len(self.current_playlist) - 1)
-        else:
-            self.current_index = (self.current_index - 1) % len(self.current_playlist)
-            
-        self.play_current()
+        self.engine.previous()
         
     def toggle_repeat(self):
         """Toggle repeat mode"""
-        self.is_repeat = not self.is_repeat
-        self.repeat_btn.setChecked(self.is_repeat)
-        
-        # Update button appearance
-        if self.is_repeat:
-            self.repeat_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #4CAF50;
-                    border-radius: 15px;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #45a049;
-                }
-            """)
-            # Change icon to show repeat is active
-            self.repeat_btn.setIcon(self.style().standardIcon(QStyle.SP_ArrowRight))
-        else:
-            self.repeat_btn.setStyleSheet("")
-            # Reset icon
-            self.repeat_btn.setIcon(self.style().standardIcon(QStyle.SP_ArrowRight))
+        self.engine.set_repeat(not self.engine.repeat)
+        self.repeat_btn.setChecked(self.engine.repeat)
+        
+        # Highlighted through the "active" style property
+        self.themes.set_state(self.repeat_btn, "active", self.engine.repeat)
             
     def toggle_shuffle(self):
         """Toggle shuffle mode"""
-        self.is_shuffle = not self.is_shuffle
-        self.shuffle_btn.setChecked(self.is_shuffle)
-        
-        # Update button appearance
-        if self.is_shuffle:
-            self.shuffle_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #4CAF50;
-                    border-radius: 15px;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #45a049;
-                }
-            """)
-            # Change icon to show shuffle is active
-            self.shuffle_btn.setIcon(self.style().standardIcon(QStyle.SP_BrowserReload))
-        else:
-            self.shuffle_btn.setStyleSheet("")
-            # Reset icon
-            self.shuffle_btn.setIcon(self.style().standardIcon(QStyle.SP_BrowserReload))
+        self.engine.set_shuffle(not self.engine.shuffle)
+        self.shuffle_btn.setChecked(self.engine.shuffle)
+        
+        # Highlighted through the "active" style property
+        self.themes.set_state(self.shuffle_btn, "active", self.engine.shuffle)
             
+    def set_crossfade(self, crossfade_ms):
+        """Set the transition length; 0 switches tracks gaplessly"""
+        self.engine.set_crossfade(crossfade_ms)
+        
+    def set_normalize(self, normalize):
+        """Turn ReplayGain loudness normalization on or off"""
+        self.engine.set_normalize(normalize)
+        self.playlist_store.set_setting("normalize", "1" if normalize else "0")
+        
+    def track_gain(self, file_path):
+        """ReplayGain in dB for file_path: its tags, else its measured loudness"""
+        info = self.metadata_cache.get(file_path)
+        tag_gain = info.get("replaygain") if info is not None else None
+        record = self.waveform_loader.cache.load(file_path) if tag_gain is None else None
+        return track_gain(tag_gain, record)
+        
+    def analyze_loudness(self):
+        """Measure every track in every playlist in the background"""
+        if self.loudness_analyzer.is_running():
+            return
+        self.statusBar().showMessage("Analyzing loudness...")
+        self.loudness_analyzer.start(self.playlist_store.all_paths())
+        
+    def on_loudness_progress(self, done, total):
+        self.statusBar().showMessage(f"Analyzing loudness... {done}/{total} tracks")
+        
+    def on_loudness_finished(self, analyzed, tagged, failed, stopped):
+        message = "Loudness analysis stopped" if stopped else "Loudness analysis complete"
+        details = f"{analyzed} analyzed, {tagged} already tagged"
+        if failed:
+            details += f", {failed} failed"
+        self.statusBar().showMessage(f"{message}: {details}", 5000)
+        
     def set_volume(self, value):
         try:
             volume = value / 100.0
-            pygame.mixer.music.set_volume(volume)
+            self.engine.set_volume(volume)
         except Exception as e:
             print(f"Error setting volume: {str(e)}")
             
+    @traced()
     def update_progress(self):
-        if not self.is_playing or not self.current_playlist or self.is_sliding:
+        if not self.engine.is_playing or self.current_file() is None or self.is_sliding:
             return
             
         try:
-            # Get current position from pygame mixer
-            current_pos = pygame.mixer.music.get_pos() / 1000.0
-            
-            # If we're sliding, use the slider position
-            if self.is_sliding:
-                current_pos = self.slider_position
-            else:
-                # Add the slider position to get the actual position
-                current_pos += self.slider_position
-                
             # Ensure current position is within valid range
-            if 0 <= current_pos <= self.progress_slider.maximum():
-                self.progress_slider.setValue(int(current_pos))
-                self.current_time.setText(self.format_time(current_pos))
-                
-                # Check if song has ended
-                if current_pos >= self.progress_slider.maximum():
-                    if self.is_repeat:
-                        # Restart the current song
-                        self.play_current()
-                    else:
-                        # Play next song
-                        self.play_next()
+            position = self.engine.position()
+            current_pos = min(position, self.progress_slider.maximum())
+            self.progress_slider.setValue(int(current_pos))
+            self.current_time.setText(self.format_time(current_pos))
+            
+            # Wake up again just after the displayed second changes
+            self.timer.start(1000 - int(position * 1000) % 1000 + 5)
                     
         except Exception as e:
             print(f"Error updating progress: {str(e)}")
             self.timer.stop()
             
+    @traced()
+    def check_track_boundary(self):
+        """Let the engine handle the end of a track once it is due"""
+        try:
+            self.engine.tick()
+        except Exception as e:
+            print(f"Error checking track end: {str(e)}")
+            
+    def schedule_boundary(self):
+        """Arm the end-of-track timer for when the engine next needs attention"""
+        delay = self.engine.time_until_tick()
+        if delay is None:
+            self.boundary_timer.stop()
+        else:
+            self.boundary_timer.start(int(delay * 1000))
+        
+    def progress_visible(self):
+        return self.isVisible() and not self.isMinimized()
+        
+    def start_timers(self):
+        self.schedule_boundary()
+        if self.progress_visible() and not self.is_sliding:
+            self.update_progress()
+            
+    def stop_timers(self):
+        self.timer.stop()
+        self.boundary_timer.stop()
+            
     def set_position(self, position):
         """Set the playback position"""
-        if self.is_playing and self.current_playlist:
-            try:
-                # Stop current playback
-                pygame.mixer.music.stop()
-                
-                # Load and play from new position
-                pygame.mixer.music.load(self.current_playlist[self.current_index])
-                pygame.mixer.music.play(start=position)
+        try:
+            # Seek within the already open stream
+            if not self.engine.seek(position):
+                return
                 
-                # Update timing variables
-                self.slider_position = position
-                self.progress_slider.setValue(position)
-                self.current_time.setText(self.format_time(position))
+            # Update timing variables
+            self.slider_position = position
+            self.progress_slider.setValue(position)
+            self.current_time.setText(self.format_time(position))
+            if self.engine.is_playing:
+                self.start_timers()
                 
-            except Exception as e:
-                print(f"Error setting position: {str(e)}")
+        except Exception as e:
+            print(f"Error setting position: {str(e)}")
                 
     def format_time(self, seconds):
         minutes = int(seconds // 60)
         seconds = int(seconds % 60)
         return f"{minutes:02d}:{seconds:02d}"
         
-    def update_song_info(self):
-        if not self.current_playlist:
-            return
-            
+    @traced()
+    def update_song_info(self, current_file, info):
         try:
-            current_file = self.current_playlist[self.current_index]
-            if not os.path.exists(current_file):
-                self.remove_current_song()
-                return
-                
-            # Set default values
-            title = "Unknown Title"
-            artist = "Unknown Artist"
-            duration = 0
+            if info is None:
+                info = {"title": os.path.basename(current_file), "artist": None, 
+                        "album": None, "duration": 0, "cover": None, "cover_checked": True}
+            else:
+                self.search_index.add(current_file, info["title"], info["artist"], info["album"])
+                tracks.set_duration(current_file, info["duration"])
+            title = info["title"] or "Unknown Title"
+            artist = info["artist"] or "Unknown Artist"
+            duration = info["duration"] or 0
             
-            try:
-                audio = mutagen.File(current_file)
-                if audio is not None:
-                    # Try to get metadata
-                    if hasattr(audio, 'tags'):
-                        if hasattr(audio.tags, 'get'):
-                            # Try to get title
-                            try:
-                                title = audio.tags.get('TIT2', ['Unknown Title'])[0]
-                            except:
-                                title = "Unknown Title"
-                                
-                            # Try to get artist
-                            try:
-                                artist = audio.tags.get('TPE1', ['Unknown Artist'])[0]
-                            except:
-                                artist = "Unknown Artist"
-                                
-                        # Try to get album art
-                        if hasattr(audio.tags, 'getall'):
-                            try:
-                                for tag in audio.tags.getall('APIC'):
-                                    if tag.type == 3:  # Front cover
-                                        pixmap = QPixmap()
-                                        pixmap.loadFromData(tag.data)
-                                        self.album_art.setPixmap(pixmap.scaled(200, 200, Qt.KeepAspectRatio))
-                                        break
-                            except:
-                                self.album_art.clear()
-                                
-                    # Try to get duration
-                    try:
-                        duration = audio.info.length
-                    except:
-                        duration = 0
-                        
-            except Exception as e:
-                print(f"Error reading metadata: {str(e)}")
-                # If metadata reading fails, use filename as title
-                title = os.path.basename(current_file)
-                artist = "Unknown Artist"
-                duration = 0
+            # Album art is decoded off the GUI thread unless already cached
+            image = self.cover_loader.request(current_file, info)
+            if image is not None:
+                self.album_art.setPixmap(QPixmap.fromImage(image))
+                self.update_dynamic_theme(self.cover_loader.cache.accent(info["cover_hash"]))
+            else:
+                self.album_art.clear()
+            self.progress_slider.set_waveform(self.waveform_loader.request(current_file))
+            QTimer.singleShot(250, self.prefetch_upcoming)
                 
             # Update UI with available information
             self.song_info.setText(f"{title} - {artist}")
@@ -599,69 +861,228 @@ class MusicPlayer(QMainWindow):
             # Reset progress
             self.progress_slider.setValue(0)
             self.current_time.setText("00:00")
-            self.start_time = pygame.time.get_ticks()
             
         except Exception as e:
             print(f"Error updating song info: {str(e)}")
             self.song_info.setText("Error reading song info")
             self.album_art.clear()
+            self.progress_slider.set_waveform(None)
             self.progress_slider.setRange(0, 0)
             self.total_time.setText("00:00")
             self.current_time.setText("00:00")
             
+    @traced()
+    def on_cover_ready(self, file_path, image, accent):
+        if self.current_file() == file_path:
+            self.album_art.setPixmap(QPixmap.fromImage(image))
+            self.update_dynamic_theme(accent)
+            
+    def on_cover_missing(self, file_path):
+        if self.current_file() == file_path:
+            self.album_art.clear()
+            self.update_dynamic_theme(None)
+            
+    def on_cover_thumbnail(self, file_path, thumbnail, cover_hash):
+        self.metadata_cache.set_cover(file_path, thumbnail or None, cover_hash or None)
+        
+    def current_file(self):
+        return self.engine.current_path()
+        
+    def on_waveform_ready(self, file_path):
+        if self.current_file() == file_path:
+            self.progress_slider.set_waveform(self.waveform_loader.request(file_path))
+            
+    def prefetch_upcoming(self):
+        upcoming = self.engine.upcoming()
+        self.cover_loader.prefetch(
+            (file_path, self.metadata_cache.get(file_path)) 
+            for file_path in upcoming)
+        self.waveform_loader.prefetch(upcoming)
+            
     def save_playlist(self):
         if not self.playlists:
             QMessageBox.warning(self, "Warning", "No playlists to save!")
             return
             
-        file_name, _ = QFileDialog.getSaveFileName(self, "Save Playlists", "", 
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export Playlists", "", 
                                                  "Playlist Files (*.json)")
         if file_name:
-            with open(file_name, 'w') as f:
-                json.dump(self.playlists, f)
+            try:
+                self.export_playlists(file_name)
+            except Exception as e:
+                QMessageBox.warning(self, "Error", f"Could not export playlists: {str(e)}")
                 
     def load_playlist(self):
-        file_name, _ = QFileDialog.getOpenFileName(self, "Load Playlists", "", 
+        file_name, _ = QFileDialog.getOpenFileName(self, "Import Playlists", "", 
                                                  "Playlist Files (*.json)")
         if file_name:
             try:
-                with open(file_name, 'r') as f:
-                    loaded_playlists = json.load(f)
-                    if "Default" not in loaded_playlists:
-                        loaded_playlists["Default"] = []
-                    self.playlists = loaded_playlists
-                    self.current_playlist_name = "Default"
-                    self.current_playlist = self.playlists["Default"]
-                    self.playlist_widget.clear()
-                    for file_path in self.current_playlist:
-                        self.playlist_widget.addItem(os.path.basename(file_path))
-                    self.update_playlist_selector()
-                    self.setWindowTitle(f"Professional Music Player - {self.current_playlist_name}")
+                self.import_playlists(file_name)
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Could not load playlists: {str(e)}")
                 
+    def import_playlists(self, file_name):
+        """Replace all playlists with those in a JSON export"""
+        loaded_playlists = self.playlist_store.import_json(file_name)
+        self.playlists = {name: Playlist(paths) 
+                          for name, paths in loaded_playlists.items()}
+        for playlist in self.playlists.values():
+            self.index_tracks(playlist.to_list(), playlist.track_ids())
+        self.set_current_playlist("Default")
+        self.update_playlist_selector()
+        
+    def export_playlists(self, file_name):
+        """Write every playlist to a JSON export"""
+        names = list(self.playlists)
+        paths = tracks.path_lists([self.get_playlist(name).track_ids() for name in names])
+        self.playlist_store.export_json(file_name, dict(zip(names, paths)))
+        
+    @traced()
     def search_playlist(self, text):
-        for i in range(self.playlist_widget.count()):
-            item = self.playlist_widget.item(i)
-            item.setHidden(text.lower() not in item.text().lower())
+        """Filter the playlist view down to tracks matching text"""
+        query = text.strip().lower()
+        if not query:
+            self.search_query = ""
+            self.playlist_filter.set_filter(None)
+            return
+            
+        # Typing more characters only narrows the previous results
+        within = None
+        if (self.search_query and self.search_query in query 
+                and self.playlist_filter.is_filtering()):
+            within = self.playlist_filter.filter_rows()
+            
+        rows = self.search_index.search(self.current_playlist, query, within)
+        self.search_query = query
+        self.playlist_filter.set_filter(rows, self.search_accepts)
+        
+    def search_accepts(self, row):
+        """Check a newly added row against the active search"""
+        return self.search_query in self.search_index.track_text(self.current_playlist.track(row))
+        
+    def index_tracks(self, file_paths, track_ids=None):
+        """Add tracks to the search index with whatever tags are already cached"""
+        file_paths = list(file_paths)
+        self.search_index.add_many(file_paths, self.metadata_cache.cached_tags(file_paths),
+                                   track_ids)
+        if self.search_index.pending_count():
+            self.index_timer.start()
+            
+    def index_idle(self):
+        """Build search postings in small chunks while the UI is idle"""
+        if self.search_index.index_pending(200) == 0:
+            self.index_timer.stop()
+            # Then have the current playlist ready for the first keystroke
+            self.search_index.prepare(self.current_playlist)
             
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
             
+    def dragMoveEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+            
     def dropEvent(self, event: QDropEvent):
-        for url in event.mimeData().urls():
-            file_path = url.toLocalFile()
-            if file_path.endswith(('.mp3', '.wav', '.ogg')):
-                self.add_to_playlist(file_path)
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if paths:
+            event.acceptProposedAction()
+            self.import_dropped(paths, self.drop_row(event.pos()))
+            
+    def drop_row(self, pos):
+        """Playlist row that a drop at pos (window coordinates) inserts before"""
+        viewport = self.playlist_view.viewport()
+        point = viewport.mapFrom(self, pos)
+        index = self.playlist_view.indexAt(point)
+        if not viewport.rect().contains(point) or not index.isValid():
+            return len(self.current_playlist)
+        row = self.playlist_filter.mapToSource(index).row()
+        # The lower half of a row drops after it
+        if point.y() > self.playlist_view.visualRect(index).center().y():
+            row += 1
+        return row
+        
+    def import_dropped(self, paths, row):
+        """Add dropped files and folders to the current playlist at row, in the background"""
+        self.cancel_drop_import()
+        self.drop_target = [self.current_playlist_name, row]
+        self.drop_counts = (0, 0)
+        self.drop_importer = DropImporter(paths, self.metadata_cache.db_path, parent=self)
+        self.drop_importer.batch_ready.connect(self.on_drop_batch)
+        self.drop_importer.progress.connect(self.on_drop_progress)
+        self.drop_importer.finished.connect(self.on_drop_finished)
+        self.statusBar().showMessage("Importing dropped files...")
+        self.drop_importer.start()
+        
+    def cancel_drop_import(self):
+        if self.drop_importer is not None and self.drop_importer.is_running():
+            self.drop_importer.cancel()
+        self.drop_queue.clear()
+        self.drop_timer.stop()
+            
+    def on_drop_batch(self, records):
+        if self.sender() is not self.drop_importer:
+            return  # Late batch from a cancelled import
+        self.drop_queue.extend(records)
+        self.drop_timer.start()
+        
+    def insert_dropped(self):
+        """Insert the next chunk of dropped tracks as one row range, between repaints"""
+        records = [self.drop_queue.popleft() 
+                   for _ in range(min(DROP_CHUNK, len(self.drop_queue)))]
+        parsed = [record for record in records if record[3] is not None]
+        if parsed:
+            self.metadata_cache.put_many(parsed, cover_checked=False)
+        name, row = self.drop_target
+        added = self.add_tracks([record[0] for record in records], name, row)
+        self.store_durations(parsed)
+        self.drop_target[1] = row + len(added)
+        if not self.drop_queue:
+            self.drop_timer.stop()
+            if self.drop_importer is None:
+                self.show_drop_result("Import complete")
+        
+    def on_drop_progress(self, accepted, rejected):
+        self.drop_counts = (accepted, rejected)
+        skipped = f", {rejected} skipped" if rejected else ""
+        self.statusBar().showMessage(f"Importing dropped files... {accepted} tracks{skipped}")
+        
+    def on_drop_finished(self, cancelled):
+        if self.sender() is not self.drop_importer:
+            return
+        self.drop_importer = None
+        if cancelled:
+            self.show_drop_result("Import cancelled")
+        elif not self.drop_queue:
+            self.show_drop_result("Import complete")
+            
+    def show_drop_result(self, message):
+        accepted, rejected = self.drop_counts
+        skipped = f", {rejected} files skipped (not audio)" if rejected else ""
+        self.statusBar().showMessage(f"{message}: {accepted} tracks{skipped}", 5000)
+                
+    def toggle_perf_overlay(self, checked):
+        """Show frame time, event-loop lag and cache hit rates; records a trace while on"""
+        self.perf_overlay.set_active(checked)
+        
+    def export_trace(self):
+        if not tracer.events:
+            QMessageBox.information(self, "Export Trace", 
+                                    "Nothing recorded yet. Turn on Tools > Performance Overlay "
+                                    "(or set MUSIC_PLAYER_TRACE=1) and use the player first.")
+            return
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export Trace", "trace.json", 
+                                                 "Chrome Trace Files (*.json)")
+        if file_name:
+            try:
+                tracer.export_chrome_trace(file_name)
+            except Exception as e:
+                QMessageBox.warning(self, "Error", f"Could not export trace: {str(e)}")
                 
+    @traced()
     def set_theme(self, theme):
-        if theme == "dark":
-            self.setStyleSheet(DARK_THEME + ADVANCED_STYLES)
-            self.dark_mode = True
-        else:
-            self.setStyleSheet(LIGHT_THEME + ADVANCED_STYLES)
-            self.dark_mode = False
+        self.themes.apply(theme)
+        self.dark_mode = theme == "dark"
             
     def fade_in(self, widget):
         animation = QPropertyAnimation(widget, b"windowOpacity")
@@ -692,30 +1113,44 @@ class MusicPlayer(QMainWindow):
             self.volume_slider.setValue(max(0, self.volume_slider.value() - 5))
             
     def update_dynamic_theme(self, base_color):
-        dynamic_theme = f"""
-            QSlider::sub-page:horizontal {{
-                background: qlineargradient(
-                    x1:0, y1:0, x2:1, y2:0,
-                    stop:0 {base_color}, 
-                    stop:1 {base_color}88
-                );
-            }}
-            QPushButton#playButton {{
-                background: {base_color};
-            }}
-        """
-        self.setStyleSheet(self.styleSheet() + dynamic_theme)
+        """Tint the progress bar and play button with base_color (None restores them)"""
+        self.themes.set_accent((self.progress_slider, self.play_btn), base_color)
+        
+    def changeEvent(self, event):
+        # Nothing to redraw while minimized; playback keeps its own timer
+        if event.type() == QEvent.WindowStateChange:
+            if self.isMinimized():
+                self.timer.stop()
+            elif self.engine.is_playing and not self.is_sliding:
+                self.update_progress()
+        super().changeEvent(event)
+        
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+        
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.engine.is_playing and not self.is_sliding:
+            self.update_progress()
+        
+    def closeEvent(self, event):
+        self.cancel_scan()
+        self.cancel_drop_import()
+        self.library_watcher.shutdown()
+        self.waveform_loader.shutdown()
+        self.loudness_analyzer.stop()
+        super().closeEvent(event)
         
     def slider_pressed(self):
         """Called when user starts sliding the progress bar"""
         self.is_sliding = True
+        self.slider_position = self.progress_slider.value()  # A click without a drag stays put
         self.timer.stop()
         
     def slider_released(self):
         """Called when user releases the progress bar"""
         self.is_sliding = False
-        if self.is_playing:
-            self.timer.start()
         self.set_position(self.slider_position)
         
     def slider_value_changed(self, value):
@@ -725,6 +1160,8 @@ class MusicPlayer(QMainWindow):
             self.current_time.setText(self.format_time(value))
         
 if __name__ == '__main__':
+    # Record spans from startup on, for Tools > Export Trace
+    tracer.enable(os.environ.get("MUSIC_PLAYER_TRACE") == "1")
     app = QApplication(sys.argv)
     player = MusicPlayer()
     player.show()
@@ -0,0 +1,57 @@
+from collections import deque
+from itertools import islice
+
+from track_table import tracks
+
+
+class PlayQueue:
+    """Tracks to play before the playlist carries on, across playlists.
+
+    The queue is a deque of TrackTable ids, so queueing at the end, putting
+    a track up next and taking the head are all O(1) per track, and a long
+    queue costs a machine word per entry. Paths are only rebuilt for the
+    tracks asked about, and tags are looked up by the player when a track
+    actually starts, so restoring thousands of queued tracks parses nothing.
+
+    The same track may be queued more than once.
+    """
+
+    def __init__(self, paths=(), table=None):
+        self.table = tracks if table is None else table
+        self._ids = deque(self.table.add_many(paths))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self.paths())
+
+    def enqueue(self, paths):
+        """Queue paths after everything already queued"""
+        self._ids.extend(self.table.add_many(paths))
+
+    def play_next(self, paths):
+        """Queue paths ahead of everything else, keeping their order"""
+        self._ids.extendleft(reversed(self.table.add_many(paths)))
+
+    def peek(self):
+        """Path of the track that pop() will return, or None if the queue is empty"""
+        return self.table.path(self._ids[0]) if self._ids else None
+
+    def pop(self):
+        """Take the next track off the queue and return its path, or None"""
+        return self.table.path(self._ids.popleft()) if self._ids else None
+
+    def paths(self, count=None):
+        """Paths of the first count queued tracks (all of them by default)"""
+        return self.table.paths(list(islice(self._ids, count)))
+
+    def rename(self, old_path, new_path):
+        """Point queued copies of old_path at new_path after the file moved"""
+        old = self.table.lookup(old_path)
+        if old is not None and old in self._ids:
+            new = self.table.add(new_path)
+            self._ids = deque(new if queued == old else queued for queued in self._ids)
+
+    def clear(self):
+        self._ids.clear()
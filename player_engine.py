@@ -0,0 +1,465 @@
+import os
+import time
+
+from audio_engine import AudioEngine
+from play_queue import PlayQueue
+from playlist import Playlist
+from shuffle import ShuffleOrder
+
+# Extra delay before tick() so the audio engine has definitely moved on
+TICK_SLACK = 0.02
+# How often to check on a track whose duration is unknown
+UNKNOWN_DURATION_POLL = 1.0
+
+
+class PlayerEngine:
+    """Playback state and transport controls, independent of any GUI.
+
+    Owns the playlist being played, the current row, the play queue,
+    repeat/shuffle flags and the AudioEngine. Nothing here imports Qt: whoever drives the engine
+    sets the plain callables below and calls ``tick()`` once
+    ``time_until_tick()`` has elapsed, from a QTimer in the GUI or from
+    ``run()`` in scripts and benchmarks.
+
+    Callbacks (all optional):
+
+    - ``on_track_started(path, info)``: a track began playing; info is the
+      metadata returned by ``lookup`` or None.
+    - ``on_state_changed(is_playing)``: playback started, paused or stopped.
+    - ``on_track_failed(path, message)``: the current track could not be
+      played. The handler is expected to remove it from the playlist and
+      report ``track_removed``; without a handler the engine does so itself.
+    - ``on_track_missing(path)``: the file of a track has disappeared. It
+      stays in the playlist, added to ``dead``, and is skipped by ``next()``.
+    - ``on_reschedule()``: ``time_until_tick()`` may have changed.
+    - ``on_dequeued(path)``: path was taken off the play queue, to play it
+      or because it could not be played.
+
+    Queued tracks play before the playlist moves on, whatever the shuffle
+    setting, and the playlist then continues after the row it was on. While
+    one plays, ``queued_path`` is set and ``index`` keeps that row. Repeat
+    replays whichever track is current, queued or not.
+
+    With ``normalize`` on, each track plays at the user's volume adjusted
+    by its ReplayGain from ``gain_lookup``, set as the track starts. The
+    mixer can't amplify, so a positive gain is capped at full volume.
+    """
+
+    def __init__(self, audio=None, lookup=None, gain_lookup=None):
+        self.audio = audio or AudioEngine()
+        self.lookup = lookup  # path -> metadata dict (with "duration") or None
+        self.gain_lookup = gain_lookup  # path -> ReplayGain in dB or None
+        self.playlist = Playlist()
+        self.index = 0
+        self.queue = PlayQueue()
+        self.queued_path = None  # Queued track playing instead of the current row
+        self.is_playing = False
+        self.repeat = False
+        self.shuffle = False
+        self.shuffle_order = None  # ShuffleOrder while shuffle is on
+        self.preloaded_index = None  # Row pre-opened to play after the current one
+        self.preloaded_queued = False  # True when the head of the queue is pre-opened
+        self.volume = 1.0
+        self.normalize = True
+        self.track_gain = 0.0  # dB of ReplayGain for the current track
+        self.dead = set()  # Paths whose files are missing; kept in place, skipped
+
+        self.on_track_started = None
+        self.on_state_changed = None
+        self.on_track_failed = None
+        self.on_track_missing = None
+        self.on_reschedule = None
+        self.on_dequeued = None
+
+    def set_playlist(self, playlist):
+        self.playlist = playlist
+        if self.shuffle:
+            self.shuffle_order = ShuffleOrder(len(playlist))
+        if self.is_playing:
+            self.preload_next()
+
+    def current_path(self):
+        if self.queued_path is not None:
+            return self.queued_path
+        if 0 <= self.index < len(self.playlist):
+            return self.playlist[self.index]
+        return None
+
+    def position(self):
+        """Seconds played in the current track"""
+        return self.audio.position()
+
+    def play(self, index=None, fade_ms=0):
+        """Play the row at index (the current track by default); return True on success"""
+        if index is None and self.queued_path is not None:
+            return self._play_queued(self.queued_path, fade_ms)
+        if not self.playlist:
+            return False
+        path = self.playlist[self.index if index is None else index]
+        if not os.path.exists(path):
+            # Stay on the current row; the missing one is marked and left in place
+            self._missing(path)
+            return False
+        self.dead.discard(path)
+        if index is not None:
+            self.index = index
+        # The row is current now, even if it fails, so that it is the one removed
+        self.queued_path = None
+        try:
+            self._set_track_gain(path)
+            self.audio.play(path, fade_ms=fade_ms)
+        except Exception as e:
+            self._fail(path, f"Could not play file: {str(e)}")
+            return False
+
+        self._playing(path)
+        return True
+
+    def _play_queued(self, path, fade_ms=0):
+        if not os.path.exists(path):
+            self._missing(path)
+            return False
+        self.dead.discard(path)
+        try:
+            self._set_track_gain(path)
+            self.audio.play(path, fade_ms=fade_ms)
+        except Exception as e:
+            # Not a playlist row, so there is nothing to remove; it is just skipped
+            print(f"Could not play queued file: {str(e)}")
+            return False
+
+        self.queued_path = path
+        self._playing(path)
+        return True
+
+    def _playing(self, path):
+        was_playing, self.is_playing = self.is_playing, True
+        if not was_playing:
+            self._state_changed()
+        self._started(path)
+
+    def select(self, index):
+        """Play a row picked by the user"""
+        if self.shuffle:
+            self.shuffle_order.jump(index)
+        return self.play(index)
+
+    def pause(self):
+        if self.is_playing:
+            self.audio.pause()
+            self.is_playing = False
+            self._state_changed()
+
+    def resume(self):
+        if self.is_playing or (self.current_path() is None and not self.queue):
+            return
+        if self.audio.current is None:
+            # Nothing opened yet (or it was stopped): start the current track
+            if self.current_path() is None:
+                self.next()
+            else:
+                self.play()
+            return
+        self.audio.unpause()
+        self.is_playing = True
+        self._state_changed()
+        self.preload_next()  # What follows may have changed while paused
+
+    def toggle(self):
+        if self.is_playing:
+            self.pause()
+        else:
+            self.resume()
+
+    def stop(self):
+        self.audio.stop()
+        self.preloaded_index = None
+        self.preloaded_queued = False
+        if self.is_playing:
+            self.is_playing = False
+            self._state_changed()
+
+    def next(self):
+        """Advance to the next track, skipping missing ones and dropping ones that fail.
+
+        Queued tracks come first; the playlist carries on once the queue is empty.
+        """
+        while self.queue:
+            path = self.queue.pop()
+            self._dequeued(path)
+            if self._play_queued(path):
+                return
+        if not self.playlist:
+            if self.queued_path is not None:
+                self.stop()  # The last queued track is over and there is no playlist
+            return
+        index = self._advance()
+        for _ in range(len(self.playlist)):
+            size = len(self.playlist)
+            if self.play(index) or not self.playlist:
+                return
+            if len(self.playlist) < size:
+                # The failed row was removed; in order, the track that took its place is next
+                index = self._advance() if self.shuffle else index % len(self.playlist)
+            elif self.playlist[index] in self.dead:
+                index = self._advance() if self.shuffle else (index + 1) % len(self.playlist)
+            else:
+                return
+        # Every track is missing
+        self.stop()
+
+    def previous(self):
+        if not self.playlist:
+            return
+        if self.queued_path is not None:
+            # Back to the row the queue interrupted
+            self.play(self.index)
+        elif self.shuffle:
+            # Back through what actually played; restart the track at the start of history
+            row = self.shuffle_order.back()
+            self.play(self.index if row is None else row)
+        else:
+            self.play((self.index - 1) % len(self.playlist))
+
+    def seek(self, position):
+        """Jump to position (seconds) in the current track; return False if none is open"""
+        if self.audio.current is None or self.current_path() is None:
+            return False
+        self.audio.seek(position)
+        self._reschedule()
+        return True
+
+    def set_repeat(self, repeat):
+        self.repeat = repeat
+        self.preload_next()
+
+    def set_shuffle(self, shuffle):
+        self.shuffle = shuffle
+        self.shuffle_order = None
+        if shuffle:
+            self.shuffle_order = ShuffleOrder(len(self.playlist))
+            if self.playlist and self.audio.current is not None:
+                self.shuffle_order.jump(self.index)
+        self.preload_next()
+
+    def set_crossfade(self, crossfade_ms):
+        """Set the transition length; 0 switches tracks gaplessly"""
+        self.audio.crossfade_ms = crossfade_ms
+        self.preload_next()
+
+    def enqueue(self, paths):
+        """Queue paths to play after the current track and anything queued before"""
+        self.queue.enqueue(paths)
+        self.preload_next()
+
+    def play_next(self, paths):
+        """Queue paths to play right after the current track"""
+        self.queue.play_next(paths)
+        self.preload_next()
+
+    def clear_queue(self):
+        self.queue.clear()
+        self.preload_next()
+
+    def track_renamed(self, old_path, new_path):
+        """Call after a file moved, so queued copies of it still play"""
+        self.queue.rename(old_path, new_path)
+        if self.queued_path == old_path:
+            self.queued_path = new_path
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self._apply_volume()
+
+    def set_normalize(self, normalize):
+        self.normalize = normalize
+        self._apply_volume()
+
+    def _set_track_gain(self, path):
+        gain = self.gain_lookup(path) if self.gain_lookup is not None else None
+        self.track_gain = gain or 0.0
+        self._apply_volume()
+
+    def _apply_volume(self):
+        gain = self.track_gain if self.normalize else 0.0
+        self.audio.set_volume(min(1.0, self.volume * 10 ** (gain / 20)))
+
+    def next_index(self):
+        """Row that next() would move to"""
+        if self.shuffle:
+            return self.shuffle_order.peek()
+        return (self.index + 1) % len(self.playlist)
+
+    def _advance(self):
+        if self.shuffle:
+            return self.shuffle_order.advance()
+        return (self.index + 1) % len(self.playlist)
+
+    def upcoming(self, count=3):
+        """Paths likely to play next, used to warm caches ahead of time"""
+        queued = self.queue.paths(count)
+        count -= len(queued)
+        if not count or not self.playlist:
+            return queued
+        if self.shuffle:
+            # Only the next pick is decided in advance
+            return queued + [self.playlist[self.shuffle_order.peek()]]
+        size = len(self.playlist)
+        return queued + [self.playlist[(self.index + step) % size]
+                         for step in range(1, min(count, size - 1) + 1)]
+
+    def _following(self):
+        """(path, row) of the track after the current one; row is None if it is queued"""
+        if self.repeat:
+            return self.current_path(), (self.index if self.queued_path is None else None)
+        if self.queue:
+            return self.queue.peek(), None
+        if self.playlist:
+            index = self.next_index()
+            return self.playlist[index], index
+        return None, None
+
+    def preload_next(self):
+        """Pre-open the track that follows when the current one ends"""
+        self.preloaded_index = None
+        self.preloaded_queued = False
+        preloaded = False
+        next_path, index = self._following() if self.is_playing else (None, None)
+        # Missing files are dealt with when they are reached
+        if next_path is not None and next_path not in self.dead:
+            # Tags not cached yet only mean the duration is unknown until it starts
+            info = self._lookup(next_path)
+            try:
+                self.audio.preload(next_path, (info["duration"] or 0.0) if info else 0.0)
+                self.preloaded_index = index
+                self.preloaded_queued = not self.repeat and index is None
+                preloaded = True
+            except Exception as e:
+                print(f"Error preloading next song: {str(e)}")
+        if not preloaded:
+            # Otherwise whatever was preloaded before would still play next
+            self.audio.unqueue()
+
+        # A preloaded track changes when a crossfade has to start
+        self._reschedule()
+
+    def tracks_added(self, row, count):
+        """Call after count tracks were inserted into the playlist at row"""
+        if row <= self.index < len(self.playlist) - count:
+            self.index += count
+        if self.shuffle:
+            self.shuffle_order.rows_inserted(row, count)
+        # Appending can change which track follows the last one
+        elif not self.repeat:
+            self.preload_next()
+
+    def track_removed(self, row):
+        """Call after row was removed from the playlist"""
+        if self.shuffle:
+            self.shuffle_order.row_removed(row)
+        if row < self.index:
+            self.index -= 1
+        if not self.playlist:
+            self.index = 0
+            if self.queued_path is None:
+                self.stop()
+                return
+        else:
+            self.index = min(self.index, len(self.playlist) - 1)
+        if self.is_playing:
+            self.preload_next()
+
+    def time_until_tick(self):
+        """Seconds until tick() has work to do, or None while not playing"""
+        if not self.is_playing:
+            return None
+        remaining = self.audio.time_to_transition()
+        if remaining is None:
+            return UNKNOWN_DURATION_POLL
+        return remaining + TICK_SLACK
+
+    def tick(self):
+        """Handle the end of the current track once time_until_tick() has elapsed.
+
+        Returns the AudioEngine state: "switched", "ended" or None.
+        """
+        if not self.is_playing or self.current_path() is None:
+            return None
+
+        state = self.audio.tick()
+        if state == "switched":
+            # The preloaded track took over without a reload
+            if self.preloaded_queued:
+                self.queued_path = self.queue.pop()
+                self._dequeued(self.queued_path)
+            elif self.preloaded_index is not None or self.queued_path is None:
+                self.queued_path = None
+                try:
+                    self.index = self.playlist.index(self.audio.current)
+                except ValueError:
+                    pass
+                if self.shuffle and self.shuffle_order.peek() == self.index:
+                    self.shuffle_order.advance()
+            # Otherwise a queued track is repeating
+            # The mixer has one volume, so a gapless switch adopts the gain a moment late
+            self._set_track_gain(self.audio.current)
+            self._started(self.audio.current)
+        elif state == "ended":
+            if not self.repeat:
+                self.next()
+            elif not self.play() and self.current_path() in self.dead:
+                self.next()  # The repeated track's file is gone
+        else:
+            self._reschedule()
+        return state
+
+    def run(self, seconds):
+        """Drive playback for up to seconds without an event loop"""
+        deadline = time.monotonic() + seconds
+        while self.is_playing:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(self.time_until_tick(), remaining))
+            if time.monotonic() < deadline:
+                self.tick()
+
+    def _lookup(self, path):
+        return self.lookup(path) if self.lookup is not None else None
+
+    def _started(self, path):
+        info = self._lookup(path)
+        if info is not None:
+            self.audio.duration = info["duration"] or 0
+        if self.on_track_started is not None:
+            self.on_track_started(path, info)
+        self.preload_next()
+
+    def _missing(self, path):
+        self.dead.add(path)
+        if self.on_track_missing is not None:
+            self.on_track_missing(path)
+        else:
+            print(f"File not found: {os.path.basename(path)}")
+
+    def _fail(self, path, message):
+        if self.on_track_failed is not None:
+            self.on_track_failed(path, message)
+            return
+        print(message)
+        row = self.playlist.index(path)
+        del self.playlist[row]
+        self.track_removed(row)
+
+    def _dequeued(self, path):
+        if self.on_dequeued is not None:
+            self.on_dequeued(path)
+
+    def _state_changed(self):
+        if self.on_state_changed is not None:
+            self.on_state_changed(self.is_playing)
+        self._reschedule()
+
+    def _reschedule(self):
+        if self.on_reschedule is not None:
+            self.on_reschedule()
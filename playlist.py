@@ -0,0 +1,208 @@
+from array import array
+
+from track_table import tracks
+
+
+class Playlist:
+    """Ordered, duplicate-free list of tracks, held as ids into a TrackTable.
+
+    Rows are an ``array('I')`` of track ids into the shared table, which
+    stores each path once however many playlists hold it; paths go in and
+    come out as strings.
+
+    Membership tests use a bitmap over track ids and path-to-row lookups a
+    dict from track id to row. Both are only built the first time they are
+    needed, so playlists that are just loaded, shown and saved never pay
+    for them. Removing a row shifts every row after it, so instead of
+    rewriting those index entries eagerly the index is marked stale from
+    the removed row onwards and repaired on the next lookup that needs it.
+    A burst of removals therefore costs a single re-index.
+    """
+
+    def __init__(self, paths=(), table=None):
+        self.table = tracks if table is None else table
+        self._ids = array('I')
+        self._members = None  # Bit per track id, built on first membership test
+        self._rows = None  # track id -> row, built on first lookup
+        self._stale_from = None  # First row whose index entry may be out of date
+        self.extend(paths)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self.table.paths(self._ids))
+
+    def __getitem__(self, row):
+        return self.table.path(self._ids[row])
+
+    def __contains__(self, path):
+        track = self.table.lookup(path)
+        return track is not None and self._has(track)
+
+    def __delitem__(self, row):
+        if row < 0:
+            row += len(self._ids)
+        track = self._ids.pop(row)
+        if self._members is not None:
+            self._set_member(track, False)
+        if self._rows is not None:
+            del self._rows[track]
+            if self._stale_from is None or row < self._stale_from:
+                self._stale_from = row
+
+    def __repr__(self):
+        return f"Playlist({self.to_list()!r})"
+
+    def track(self, row):
+        """Track id in row"""
+        return self._ids[row]
+
+    def track_ids(self):
+        """The playlist's track ids in row order (the live array; don't modify it)"""
+        return self._ids
+
+    def name(self, row):
+        """File name of the track in row"""
+        return self.table.name(self._ids[row])
+
+    def append(self, path):
+        """Append path unless it is already present; return True if it was added"""
+        return bool(self.extend((path,)))
+
+    def extend(self, paths):
+        """Append every new path in order and return the list of paths added"""
+        return self.insert(len(self._ids), paths)
+
+    def insert(self, row, paths):
+        """Insert every new path before row, in order; return the list of paths added"""
+        added, track_ids = self.new_tracks(paths)
+        self.insert_tracks(row, track_ids)
+        return added
+
+    def new_tracks(self, paths):
+        """(paths, track ids) of the paths not in the playlist, first occurrences in order"""
+        paths = list(paths)
+        track_ids = self.table.add_many(paths)
+        if not self._ids and len(set(track_ids)) == len(track_ids):
+            return paths, track_ids  # Loading a playlist: nothing to filter
+
+        members = self._membership()
+        known = len(members) << 3
+        added = []
+        new = array('I')
+        seen = set()
+        for path, track in zip(paths, track_ids):
+            if track < known and members[track >> 3] & (1 << (track & 7)) or track in seen:
+                continue
+            seen.add(track)
+            new.append(track)
+            added.append(path)
+        return added, new
+
+    def insert_tracks(self, row, track_ids):
+        """Insert track ids from new_tracks before row"""
+        if not track_ids:
+            return
+        members = self._members
+        if members is not None:
+            size = (len(self.table) >> 3) + 1
+            if len(members) < size:
+                members.extend(bytes(size - len(members)))
+            for track in track_ids:
+                members[track >> 3] |= 1 << (track & 7)
+
+        row = min(row, len(self._ids))
+        if self._rows is not None:
+            if row == len(self._ids) and self._stale_from is None:
+                self._rows.update(zip(track_ids, range(row, row + len(track_ids))))
+            else:
+                self._rows.update(dict.fromkeys(track_ids, row))  # Placeholders until re-indexed
+                if self._stale_from is None or row < self._stale_from:
+                    self._stale_from = row
+        self._ids[row:row] = track_ids
+
+    def index(self, path):
+        """Return the row of path, raising ValueError if it is not in the playlist"""
+        track = self.table.lookup(path)
+        if track is None or not self._has(track):
+            raise ValueError(f"{path!r} is not in playlist")
+        return self._row_of(track)
+
+    def rows_of(self, paths):
+        """Return the rows of those paths that are in the playlist, in input order"""
+        return self.rows_of_tracks(map(self.table.lookup, paths))
+
+    def rows_of_tracks(self, track_ids):
+        """Return the rows of those track ids that are in the playlist, in input order"""
+        rows = self._index()
+        return [row for row in map(rows.get, track_ids) if row is not None]
+
+    def remove(self, path):
+        del self[self.index(path)]
+
+    def rename(self, old_path, new_path):
+        """Replace old_path with new_path in the same row; return the row, or None.
+
+        Nothing changes if old_path is missing or new_path is already present.
+        """
+        old_track = self.table.lookup(old_path)
+        if old_track is None or not self._has(old_track):
+            return None
+        new_track = self.table.add(new_path)
+        if self._has(new_track):
+            return None
+        row = self._row_of(old_track)
+        del self._rows[old_track]
+        self._rows[new_track] = row
+        self._ids[row] = new_track
+        self._set_member(old_track, False)
+        self._set_member(new_track, True)
+        return row
+
+    def to_list(self):
+        return self.table.paths(self._ids)
+
+    def _membership(self):
+        if self._members is None:
+            members = bytearray((len(self.table) >> 3) + 1)
+            for track in self._ids:
+                members[track >> 3] |= 1 << (track & 7)
+            self._members = members
+        return self._members
+
+    def _has(self, track):
+        members = self._membership()
+        byte = track >> 3
+        return byte < len(members) and bool(members[byte] >> (track & 7) & 1)
+
+    def _set_member(self, track, member):
+        byte = track >> 3
+        members = self._membership()
+        if byte >= len(members):
+            members.extend(bytes(max(byte + 1 - len(members), len(members))))
+        if member:
+            members[byte] |= 1 << (track & 7)
+        else:
+            members[byte] &= ~(1 << (track & 7)) & 0xFF
+
+    def _row_of(self, track):
+        if self._rows is None:
+            return self._index()[track]
+        row = self._rows[track]
+        if self._stale_from is not None and row >= self._stale_from:
+            row = self._index()[track]
+        return row
+
+    def _index(self):
+        """The track id -> row dict, built or repaired as needed"""
+        if self._rows is None:
+            self._rows = {track: row for row, track in enumerate(self._ids)}
+            self._stale_from = None
+        elif self._stale_from is not None:
+            ids = self._ids
+            rows = self._rows
+            for row in range(self._stale_from, len(ids)):
+                rows[ids[row]] = row
+            self._stale_from = None
+        return self._rows
@@ -0,0 +1,226 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex
+from PyQt5.QtGui import QFont, QPalette
+from PyQt5.QtWidgets import QApplication
+
+from playlist import Playlist
+
+PathRole = Qt.UserRole + 1
+
+
+class PlaylistModel(QAbstractListModel):
+    """List model that exposes a Playlist to a QListView.
+
+    Rows are rendered on demand from the playlist's track table, so swapping
+    playlists is a model reset instead of one QListWidgetItem per track. The
+    tooltip adds the track's length once it is known.
+    Paths in ``dead`` (files that have disappeared, shared with the player
+    engine) are drawn struck out and greyed instead of being removed.
+    """
+
+    def __init__(self, playlist=None, parent=None, dead=None):
+        super().__init__(parent)
+        self._playlist = playlist if playlist is not None else Playlist()
+        self.dead = dead if dead is not None else set()
+        self._dead_font = None
+
+    def playlist(self):
+        return self._playlist
+
+    def set_playlist(self, playlist):
+        self.beginResetModel()
+        self._playlist = playlist
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._playlist)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == Qt.DisplayRole:
+            return self._playlist.name(index.row())
+        if role == PathRole:
+            return self._playlist[index.row()]
+        if role == Qt.ToolTipRole:
+            path = self._playlist[index.row()]
+            seconds = self._playlist.table.duration(self._playlist.track(index.row()))
+            if seconds is None:
+                return path
+            return f"{path}\n{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+        if role == Qt.FontRole and self._playlist[index.row()] in self.dead:
+            if self._dead_font is None:
+                self._dead_font = QFont()
+                self._dead_font.setStrikeOut(True)
+            return self._dead_font
+        if role == Qt.ForegroundRole and self._playlist[index.row()] in self.dead:
+            return QApplication.palette().brush(QPalette.Disabled, QPalette.Text)
+        return None
+
+    def append_paths(self, paths):
+        """Append paths not already in the playlist and return the ones added"""
+        return self.insert_paths(len(self._playlist), paths)
+
+    def insert_paths(self, row, paths):
+        """Insert paths not already in the playlist before row; return the ones added"""
+        new_paths, track_ids = self._playlist.new_tracks(paths)
+        if not new_paths:
+            return []
+
+        row = min(row, len(self._playlist))
+        self.beginInsertRows(QModelIndex(), row, row + len(new_paths) - 1)
+        self._playlist.insert_tracks(row, track_ids)
+        self.endInsertRows()
+        return new_paths
+
+    def refresh_paths(self, paths):
+        """Redraw the rows of paths, e.g. after their dead state changed"""
+        for row in self._playlist.rows_of(paths):
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index)
+
+    def rename_path(self, old_path, new_path):
+        row = self._playlist.rename(old_path, new_path)
+        if row is not None:
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index)
+        return row
+
+    def remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._playlist[row]
+        self.endRemoveRows()
+
+
+class PlaylistFilterModel(QAbstractProxyModel):
+    """Filtered view over a PlaylistModel driven by precomputed row lists.
+
+    Unlike QSortFilterProxyModel, which asks filterAcceptsRow about every
+    source row, the filter is a sorted list of matching source rows handed in
+    by the caller (usually from a SearchIndex). Rows appended to the source
+    while a filter is active are checked with the accept callback, so the
+    filtered view follows incremental imports without re-running the query.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = None  # Sorted source rows, or None when not filtering
+        self._accepts = None
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        self._rows = None
+        self._accepts = None
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._source_reset)
+        model.rowsAboutToBeInserted.connect(self._source_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self._source_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self._source_rows_removed)
+        model.dataChanged.connect(self._source_data_changed)
+        self.endResetModel()
+
+    def is_filtering(self):
+        return self._rows is not None
+
+    def filter_rows(self):
+        return self._rows
+
+    def set_filter(self, rows, accepts=None):
+        """Show only the given sorted source rows, or everything if rows is None"""
+        self.beginResetModel()
+        self._rows = rows
+        self._accepts = accepts if rows is not None else None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        if self._rows is None:
+            return self.sourceModel().rowCount()
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < self.rowCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        row = proxy_index.row()
+        if self._rows is not None:
+            row = self._rows[row]
+        return self.sourceModel().index(row, 0)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row()
+        if self._rows is not None:
+            position = bisect_left(self._rows, row)
+            if position == len(self._rows) or self._rows[position] != row:
+                return QModelIndex()
+            row = position
+        return self.createIndex(row, 0)
+
+    def _source_reset(self):
+        self._rows = None
+        self._accepts = None
+        self.endResetModel()
+
+    def _source_rows_about_to_be_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _source_rows_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.endInsertRows()
+            return
+
+        count = last - first + 1
+        shifted = [row + count if row >= first else row for row in self._rows]
+        added = [row for row in range(first, last + 1)
+                 if self._accepts is not None and self._accepts(row)]
+        if not added:
+            self._rows = shifted
+            return
+
+        if not self._rows or first > self._rows[-1]:
+            # Appends extend the filtered rows in place
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
+        else:
+            self.set_filter(sorted(shifted + added), self._accepts)
+
+    def _source_rows_about_to_be_removed(self, parent, first, last):
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+
+    def _source_rows_removed(self, parent, first, last):
+        if self._rows is None:
+            self.endRemoveRows()
+            return
+
+        count = last - first + 1
+        self.set_filter([row - count if row > last else row for row in self._rows
+                         if not first <= row <= last], self._accepts)
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.mapFromSource(self.sourceModel().index(row, 0))
+            if index.isValid():
+                self.dataChanged.emit(index, index, roles)
@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+
+from app_paths import user_data_dir
+from playlist import Playlist
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    seq REAL NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, path)
+);
+CREATE INDEX IF NOT EXISTS entries_order ON entries (playlist_id, seq);
+CREATE TABLE IF NOT EXISTS queue (
+    seq INTEGER PRIMARY KEY,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class PlaylistStore:
+    """Playlists persisted in SQLite (WAL mode), one row per entry.
+
+    Every edit is its own small transaction: adding a track inserts one row
+    and removing one deletes one row, and a crash mid-write leaves the last
+    committed state intact. Playlists are loaded one at a time, so startup
+    only reads the active playlist. Entries are ordered by a REAL ``seq`` so
+    tracks can be inserted between neighbours without renumbering.
+
+    The play queue is kept the same way in its own table, ordered by an
+    integer ``seq`` that grows at the back and shrinks below zero at the
+    front, so queueing, "play next" and playing the head each touch only
+    the rows involved.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(user_data_dir(), "library.db")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def names(self):
+        return [row[0] for row in
+                self.conn.execute("SELECT name FROM playlists ORDER BY position")]
+
+    def _id(self, name):
+        row = self.conn.execute("SELECT id FROM playlists WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row[0]
+
+    def create(self, name):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO playlists (name, position) "
+                "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM playlists))", (name,))
+
+    def delete(self, name):
+        with self.conn:
+            self.conn.execute("DELETE FROM playlists WHERE name = ?", (name,))
+
+    def load(self, name):
+        """Read one playlist from disk as a Playlist"""
+        return Playlist(row[0] for row in self.conn.execute(
+            "SELECT path FROM entries WHERE playlist_id = ? ORDER BY seq", (self._id(name),)))
+
+    def all_paths(self):
+        """Every distinct track path across all playlists"""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT path FROM entries")]
+
+    def append(self, name, paths):
+        """Append paths to the end of a playlist"""
+        playlist_id = self._id(name)
+        with self.conn:
+            last = self.conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM entries WHERE playlist_id = ?",
+                (playlist_id,)).fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO entries (playlist_id, seq, path) VALUES (?, ?, ?)",
+                [(playlist_id, last + offset, path) for offset, path in enumerate(paths, 1)])
+
+    def insert(self, name, row, paths):
+        """Insert paths before the entry at row, appending if row is past the end"""
+        playlist_id = self._id(name)
+        for attempt in range(2):
+            # The seq values around the gap, (before, after), either possibly None
+            neighbours = self.conn.execute(
+                "SELECT seq FROM entries WHERE playlist_id = ? ORDER BY seq LIMIT 2 OFFSET ?",
+                (playlist_id, max(row - 1, 0))).fetchall()
+            seqs = [seq for seq, in neighbours]
+            before, after = (seqs + [None, None])[:2] if row > 0 else (None, (seqs or [None])[0])
+            if after is None:
+                self.append(name, paths)
+                return
+            if before is None:
+                before = after - 1
+            step = (after - before) / (len(paths) + 1)
+            if step > abs(after) * 1e-9 or attempt:
+                break
+            self._renumber(playlist_id)  # Gap too narrow after many inserts at one spot
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO entries (playlist_id, seq, path) VALUES (?, ?, ?)",
+                [(playlist_id, before + step * offset, path)
+                 for offset, path in enumerate(paths, 1)])
+
+    def _renumber(self, playlist_id):
+        paths = self.conn.execute("SELECT path FROM entries WHERE playlist_id = ? ORDER BY seq",
+                                  (playlist_id,)).fetchall()
+        with self.conn:
+            self.conn.executemany("UPDATE entries SET seq = ? WHERE playlist_id = ? AND path = ?",
+                                  [(seq, playlist_id, path) for seq, (path,) in enumerate(paths, 1)])
+
+    def remove(self, name, path):
+        with self.conn:
+            self.conn.execute("DELETE FROM entries WHERE playlist_id = ? AND path = ?",
+                              (self._id(name), path))
+
+    def rename_paths(self, renames):
+        """Point entries at new paths after files moved; [(old, new), ...]
+
+        A playlist that already holds the new path keeps its old entry too.
+        """
+        with self.conn:
+            self.conn.executemany("UPDATE OR IGNORE entries SET path = ? WHERE path = ?",
+                                  [(new, old) for old, new in renames])
+            self.conn.executemany("UPDATE queue SET path = ? WHERE path = ?",
+                                  [(new, old) for old, new in renames])
+
+    def replace_all(self, playlists):
+        """Replace every stored playlist with {name: [path, ...]}"""
+        with self.conn:
+            self.conn.execute("DELETE FROM playlists")
+            for position, (name, paths) in enumerate(playlists.items()):
+                cursor = self.conn.execute(
+                    "INSERT INTO playlists (name, position) VALUES (?, ?)", (name, position))
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO entries (playlist_id, seq, path) VALUES (?, ?, ?)",
+                    [(cursor.lastrowid, seq, path) for seq, path in enumerate(paths, 1)])
+
+    def load_queue(self):
+        """Paths in the play queue, next one first"""
+        return [row[0] for row in self.conn.execute("SELECT path FROM queue ORDER BY seq")]
+
+    def enqueue(self, paths):
+        """Add paths to the back of the play queue"""
+        with self.conn:
+            last = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM queue").fetchone()[0]
+            self.conn.executemany("INSERT INTO queue (seq, path) VALUES (?, ?)",
+                                  [(last + offset, path) for offset, path in enumerate(paths, 1)])
+
+    def enqueue_next(self, paths):
+        """Add paths to the front of the play queue, keeping their order"""
+        paths = list(paths)
+        with self.conn:
+            first = self.conn.execute("SELECT COALESCE(MIN(seq), 1) FROM queue").fetchone()[0]
+            self.conn.executemany("INSERT INTO queue (seq, path) VALUES (?, ?)",
+                                  [(first - len(paths) + offset, path)
+                                   for offset, path in enumerate(paths)])
+
+    def dequeue(self):
+        """Drop the front of the play queue"""
+        with self.conn:
+            self.conn.execute("DELETE FROM queue WHERE seq = (SELECT MIN(seq) FROM queue)")
+
+    def clear_queue(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM queue")
+
+    def get_setting(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_setting(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                              (key, value))
+
+    def import_json(self, file_name):
+        """Load the legacy {name: [paths]} JSON format into the store"""
+        with open(file_name, 'r') as f:
+            playlists = json.load(f)
+        if "Default" not in playlists:
+            playlists["Default"] = []
+        self.replace_all(playlists)
+        return playlists
+
+    def export_json(self, file_name, playlists):
+        """Write {name: iterable of paths} in the legacy JSON format atomically"""
+        temp_name = file_name + ".tmp"
+        with open(temp_name, 'w') as f:
+            # One write: json.dump streams many small chunks, about twice as slow
+            f.write(json.dumps({name: list(paths) for name, paths in playlists.items()}))
+        os.replace(temp_name, file_name)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,87 @@
+import math
+import os
+
+from audio_analysis import AnalysisCache, analyze_file
+
+REFERENCE_LOUDNESS = -18.0  # LUFS that ReplayGain 2.0 gains bring tracks to
+R128_REFERENCE = -23.0  # LUFS that Opus R128_TRACK_GAIN tags are relative to
+MAX_GAIN = 20.0  # dB; larger tag or computed values are treated as bogus
+
+
+def _text(value):
+    """First text value of a tag, whatever container mutagen returned it in"""
+    if hasattr(value, "text"):  # ID3 frame
+        value = value.text
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else ""
+    if isinstance(value, bytes):  # MP4 freeform atom
+        value = value.decode("utf-8", "replace")
+    return str(value)
+
+
+def read_replaygain(tags):
+    """Track gain in dB from mutagen tags, or None if the file has none.
+
+    Understands REPLAYGAIN_TRACK_GAIN in ID3 TXXX frames, Vorbis comments,
+    APEv2 and MP4 freeform atoms, and Opus R128_TRACK_GAIN.
+    """
+    if tags is None or not hasattr(tags, "keys"):
+        return None
+    try:
+        for key in tags.keys():
+            name = key.lower()
+            if name.endswith("replaygain_track_gain"):
+                gain = float(_text(tags[key]).split()[0])
+            elif name == "r128_track_gain":
+                # Q7.8 fixed point, relative to -23 LUFS instead of -18
+                gain = int(_text(tags[key])) / 256.0 + (REFERENCE_LOUDNESS - R128_REFERENCE)
+            else:
+                continue
+            if abs(gain) <= MAX_GAIN:
+                return gain
+    except (ValueError, IndexError, KeyError):
+        pass
+    return None
+
+
+def gain_from_loudness(loudness):
+    """Gain in dB that brings a track measured at loudness (LUFS) to the reference"""
+    if loudness is None or math.isnan(loudness):
+        return None
+    return max(-MAX_GAIN, min(MAX_GAIN, REFERENCE_LOUDNESS - loudness))
+
+
+def track_gain(tag_gain, record):
+    """ReplayGain to apply: the tag if there is one, else from an analysis record"""
+    if tag_gain is not None:
+        return tag_gain
+    if record is None:
+        return None
+    return gain_from_loudness(float(record["loudness"]))
+
+
+def measure_gain(file_path, cache_dir=None):
+    """Gain for file_path in dB (or None for silence) and where it came from.
+
+    Runs in a worker process. ReplayGain tags win; otherwise the track's
+    loudness comes from the analysis cache, analyzing the file if needed,
+    so the result is stored for the seek bar's waveform as well.
+    """
+    from tag_reader import read_tags  # tag_reader uses read_replaygain from here
+
+    tag_gain = read_tags(file_path)["replaygain"]
+    if tag_gain is not None:
+        return tag_gain, "tag"
+
+    cache = AnalysisCache(cache_dir)
+    record = cache.load(file_path)
+    if record is None:
+        analyze_file(file_path, cache_dir)
+        record = cache.load(file_path)
+    return track_gain(None, record), "analysis"
+
+
+def needs_measuring(cache, file_path):
+    """True if file_path exists and has no analysis record yet"""
+    cache_path = cache.path_for(file_path)
+    return cache_path is not None and not os.path.exists(cache_path)
@@ -0,0 +1,163 @@
+import os
+from array import array
+from itertools import compress, repeat
+from operator import contains
+
+from track_table import tracks
+
+GRAM_SIZE = 3
+SCAN_SHARE = 4  # Scan the whole playlist when a query's candidates are a quarter of it or more
+
+
+def trigrams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def search_text(path, title=None, artist=None, album=None):
+    """Lowercased text a track is searched by: file name (sans extension) and tags"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return "\n".join(field for field in (name, title, artist, album) if field).lower()
+
+
+class SearchIndex:
+    """Trigram index over file names, titles, artists and albums.
+
+    Every track gets a lowercased search text, stored under its TrackTable
+    id. Posting lists map each trigram to the track ids containing it.
+    A query looks up its rarest trigram and checks only those documents with
+    a plain substring test, so postings never have to be exact: re-adding a
+    track with new tags just appends to the lists for its new trigrams.
+
+    Adding tracks only records their text; postings for pending documents
+    are built by ``index_pending``, which callers run in idle chunks. Queries
+    issued before that finishes scan the pending documents directly.
+
+    Queries too short for a trigram, or with so many candidates that the
+    postings would not narrow much, scan the playlist instead. Scans go
+    over the texts of the last playlist searched, kept in row order until
+    its rows or the texts change, using chained ``map``/``compress`` calls
+    so that no Python code runs per row.
+    """
+
+    def __init__(self, table=None):
+        self.table = tracks if table is None else table
+        self._texts = []  # track id -> lowercased search text, None if not indexed
+        self._count = 0
+        self._postings = {}  # trigram -> array of track ids
+        self._pending = []  # track ids without postings yet
+        self._row_texts = None  # (track ids, texts in row order) of the last playlist scanned
+
+    def __len__(self):
+        return self._count
+
+    def add(self, path, title=None, artist=None, album=None):
+        """Index a track, or refresh its text if the tags changed"""
+        self.add_many([path], {path: (title, artist, album)})
+
+    def add_many(self, paths, tags, ids=None):
+        """Index tracks with their {path: (title, artist, album)} tags, where known.
+
+        Tracks already indexed keep their text unless tags are given for
+        them. ids are the paths' track ids, if the caller already has them.
+        """
+        texts = self._texts
+        if ids is None:
+            ids = self.table.add_many(paths)
+        if ids and max(ids) >= len(texts):
+            texts.extend([None] * (max(ids) + 1 - len(texts)))
+        for path, doc in zip(paths, ids):
+            if texts[doc] is not None and path not in tags:
+                continue  # Nothing new to index
+            text = search_text(path, *tags.get(path, ()))
+            if texts[doc] == text:
+                continue
+            if texts[doc] is None:
+                self._count += 1
+            texts[doc] = text
+            self._pending.append(doc)
+            self._row_texts = None
+
+    def track_text(self, doc):
+        """Search text of a track id"""
+        text = self._texts[doc] if doc < len(self._texts) else None
+        if text is None:
+            return search_text(self.table.path(doc))
+        return text
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def index_pending(self, limit=None):
+        """Build postings for up to limit pending documents; return how many remain"""
+        if limit is None or limit >= len(self._pending):
+            batch, self._pending = self._pending, []
+        else:
+            batch, self._pending = self._pending[:limit], self._pending[limit:]
+
+        postings = self._postings
+        texts = self._texts
+        for doc in batch:
+            for gram in trigrams(texts[doc]):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = array('I', (doc,))
+                elif posting[-1] != doc:
+                    posting.append(doc)
+        return len(self._pending)
+
+    def search(self, playlist, query, within=None):
+        """Return the sorted rows of playlist whose text contains query.
+
+        When within is given (rows matching a shorter query that this one
+        extends) only those rows are re-checked.
+        """
+        query = query.lower()
+        if within is not None:
+            return self._scan(playlist, query, within)
+        if len(query) < GRAM_SIZE:
+            return self._scan(playlist, query)
+
+        postings = []
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if posting is None:
+                postings = None
+                break
+            postings.append(posting)
+
+        shortest = min(postings, key=len) if postings else ()
+        if (len(shortest) + len(self._pending)) * SCAN_SHARE >= len(playlist):
+            return self._scan(playlist, query)
+        texts = self._texts
+        candidates = set(self._pending)
+        candidates.update(shortest)
+        rows = playlist.rows_of_tracks(doc for doc in candidates if query in texts[doc])
+        rows.sort()
+        return rows
+
+    def _scan(self, playlist, query, rows=None):
+        """Rows of playlist (all of them, or those in rows) whose text contains query"""
+        texts = self._texts_by_row(playlist)
+        if rows is None or len(rows) * SCAN_SHARE >= len(texts):
+            # Rows only ever come from a query this one extends, so scanning them all is the same
+            rows = range(len(texts))
+            selected = texts
+        else:
+            selected = map(texts.__getitem__, rows)
+        return list(compress(rows, map(contains, selected, repeat(query))))
+
+    def prepare(self, playlist):
+        """Line up playlist's texts for scanning ahead of a search, e.g. while idle"""
+        self._texts_by_row(playlist)
+
+    def _texts_by_row(self, playlist):
+        ids = playlist.track_ids()
+        if self._row_texts is None or self._row_texts[0] != ids:
+            try:
+                texts = list(map(self._texts.__getitem__, ids))
+            except IndexError:
+                texts = [None]
+            if None in texts:
+                texts = list(map(self.track_text, ids))  # Tracks the index has no text for
+            self._row_texts = (array('I', ids), texts)
+        return self._row_texts[1]
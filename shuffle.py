@@ -0,0 +1,133 @@
+import random
+from array import array
+from collections import deque
+
+HISTORY_SIZE = 1000  # How far back "previous" can go in shuffle mode
+
+
+class ShuffleOrder:
+    """Play order for shuffle mode over the rows of a playlist.
+
+    The order is a Fisher–Yates shuffle done one step at a time: ``_order``
+    holds every row, the first ``_drawn`` entries are the ones already
+    played this cycle, and each new track is picked uniformly from the rest
+    and swapped into place. Every row therefore plays once before any row
+    repeats, and picking the next one is O(1). Once all rows have played a
+    new cycle starts, never opening with the track that just ended.
+
+    Previous/next walk a bounded history of rows actually played, so going
+    back returns to the last track rather than a random one, and going
+    forward again replays the tracks stepped back over.
+
+    Rows are playlist positions, so the owner must report insertions and
+    removals (``rows_inserted`` / ``row_removed``) to keep them aligned.
+    """
+
+    def __init__(self, size, rng=None):
+        self.rng = rng or random.Random()
+        self._order = array('I', range(size))
+        self._drawn = 0
+        self._staged = False  # True when _order[_drawn] is already chosen as next
+        self._wrapped = 0  # Size of the finished cycle if staging started a new one
+        self.history = deque(maxlen=HISTORY_SIZE)  # Rows played, most recent last
+        self._forward = []  # Rows stepped back over, next one last
+
+    def __len__(self):
+        return len(self._order)
+
+    def jump(self, row):
+        """Record row as played out of order, e.g. picked by the user.
+
+        It counts as played for the current cycle, and "next" continues
+        with a fresh pick from there.
+        """
+        if self._order.index(row) >= self._drawn:
+            self._place(row, self._drawn)
+            self._drawn += 1
+            self._staged = False
+            self._wrapped = 0
+        self._forward.clear()
+        self.history.append(row)
+
+    def peek(self):
+        """Row that advance() will return, or None for an empty playlist"""
+        if self._forward:
+            return self._forward[-1]
+        if not self._order:
+            return None
+        if not self._staged:
+            self._stage()
+        return self._order[self._drawn]
+
+    def advance(self):
+        """Move to the next row in shuffle order and return it"""
+        row = self.peek()
+        if row is None:
+            return None
+        if self._forward:
+            self._forward.pop()
+        else:
+            self._drawn += 1
+            self._staged = False
+            self._wrapped = 0
+        self.history.append(row)
+        return row
+
+    def back(self):
+        """Step back to the previously played row, or None if there is none"""
+        if len(self.history) < 2:
+            return None
+        self._forward.append(self.history.pop())
+        return self.history[-1]
+
+    def rows_inserted(self, row, count):
+        """Shift for count rows inserted at row; the new rows join the undrawn pool"""
+        if self._wrapped:
+            # The next pick opened a new cycle, but these rows haven't played in this one
+            self._drawn = self._wrapped
+            self._staged = False
+            self._wrapped = 0
+        if row < len(self._order):
+            self._order = array('I', (r + count if r >= row else r for r in self._order))
+            self._shift(lambda r: r + count if r >= row else r)
+        self._order.extend(range(row, row + count))
+
+    def row_removed(self, row):
+        """Forget row and shift the rows after it down by one"""
+        self._wrapped = 0
+        position = self._order.index(row)
+        if position < self._drawn:
+            self._drawn -= 1
+            self._staged = False
+        elif position == self._drawn:
+            self._staged = False
+        del self._order[position]
+        self._order = array('I', (r - 1 if r > row else r for r in self._order))
+        self.history = deque((r for r in self.history if r != row), maxlen=HISTORY_SIZE)
+        self._forward = [r for r in self._forward if r != row]
+        self._shift(lambda r: r - 1 if r > row else r)
+
+    def _shift(self, move):
+        self.history = deque(map(move, self.history), maxlen=HISTORY_SIZE)
+        self._forward = [move(r) for r in self._forward]
+
+    def _stage(self):
+        """Pick the next row of the cycle and swap it into position _drawn"""
+        size = len(self._order)
+        end = size
+        if self._drawn >= size:
+            # Cycle complete; start another without repeating the last track
+            self._wrapped = size
+            self._drawn = 0
+            if size > 1 and self.history:
+                self._place(self.history[-1], size - 1)
+                end = size - 1
+        pick = self.rng.randrange(self._drawn, end)
+        order = self._order
+        order[self._drawn], order[pick] = order[pick], order[self._drawn]
+        self._staged = True
+
+    def _place(self, row, position):
+        order = self._order
+        current = order.index(row)
+        order[current], order[position] = order[position], order[current]
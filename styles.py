@@ -83,7 +83,7 @@ QSlider#volumeSlider::sub-page:horizontal {
 }
 
 /* Playlist */
-QListWidget {
+QListView#playlistView {
     background-color: #2a2a3a;
     border: 1px solid #3a3a4a;
     border-radius: 8px;
@@ -91,12 +91,12 @@ QListWidget {
     font-size: 13px;
 }
 
-QListWidget::item {
+QListView#playlistView::item {
     padding: 8px;
     border-bottom: 1px solid #3a3a4a;
 }
 
-QListWidget::item:selected {
+QListView#playlistView::item:selected {
     background-color: #4a4a6a;
     color: white;
 }
@@ -241,7 +241,7 @@ QSlider#volumeSlider::sub-page:horizontal {
 }
 
 /* Playlist */
-QListWidget {
+QListView#playlistView {
     background-color: #ffffff;
     border: 1px solid #d0d0d0;
     border-radius: 8px;
@@ -249,12 +249,12 @@ QListWidget {
     font-size: 13px;
 }
 
-QListWidget::item {
+QListView#playlistView::item {
     padding: 8px;
     border-bottom: 1px solid #e0e0e5;
 }
 
-QListWidget::item:selected {
+QListView#playlistView::item:selected {
     background-color: #e0e0e5;
     color: #333333;
 }
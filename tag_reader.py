@@ -0,0 +1,743 @@
+"""Tag reading with per-format fast paths.
+
+``read_tags`` returns title, artist, album, duration and ReplayGain for
+MP3 (ID3v2.2-2.4, ID3v1), Ogg Vorbis/Opus, FLAC and WAV (RIFF INFO and id3
+chunks) by walking the container's headers directly. Only text frames are
+read: pictures and other large frames are skipped with a seek, and
+``read_cover`` loads a picture later the same way, walking the frame or
+block headers and reading only the picture itself.
+
+Anything the fast paths don't understand (other formats, unsynchronised or
+compressed ID3 tags, corrupt headers) goes through mutagen instead.
+"""
+import base64
+import os
+import struct
+
+from replaygain import read_replaygain
+
+HEADER_BYTES = 12  # Enough to tell the supported containers apart
+
+# ID3v2 frame ids (v2.3/2.4, v2.2) for the fields read_tags returns
+ID3_TEXT_FRAMES = {b"TIT2": "title", b"TT2": "title", b"TPE1": "artist", b"TP1": "artist",
+                   b"TALB": "album", b"TAL": "album"}
+ID3_USER_FRAMES = (b"TXXX", b"TXX")
+ID3_PICTURE_FRAMES = (b"APIC", b"PIC")
+VORBIS_FIELDS = {"title": "title", "artist": "artist", "album": "album"}
+RIFF_INFO_FIELDS = {b"INAM": "title", b"IART": "artist", b"IPRD": "album"}
+
+# MPEG audio: bitrates in kbps by (MPEG-1?, layer), sample rates by version
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_BITRATES[(False, 3)] = _BITRATES[(False, 2)]
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MPEG_SYNC_SEARCH = 64 * 1024  # How far past the tag to look for the first frame
+MPEG_FIRST_READ = 4096  # Usually enough for the first frame and its Xing/VBRI header
+MPEG_HEADER_ROOM = 192  # Bytes after a frame header that the Xing/VBRI lookup needs
+
+
+class TagError(Exception):
+    """The fast path can't handle this file; use mutagen instead"""
+
+
+def _empty_info():
+    return {"title": None, "artist": None, "album": None, "duration": 0, "cover": None,
+            "replaygain": None}
+
+
+def sniff_audio(header):
+    """Container type from a file's first bytes: "id3", "mp3", "ogg", "flac", "wav" or None"""
+    if header.startswith(b"ID3"):
+        return "id3"
+    if header.startswith(b"OggS"):
+        return "ogg"
+    if header.startswith(b"fLaC"):
+        return "flac"
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "wav"
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        return "mp3"
+    return None
+
+
+def read_tags(file_path):
+    """Text tags and duration of file_path (cover is always None here)"""
+    try:
+        with open(file_path, "rb") as f:
+            kind = sniff_audio(f.read(HEADER_BYTES))
+            if kind is not None:
+                f.seek(0)
+                size = os.fstat(f.fileno()).st_size
+                return _READERS[kind](f, size)
+    except (TagError, OSError, struct.error, ValueError, IndexError, KeyError):
+        pass
+    return _read_with_mutagen(file_path)
+
+
+def read_cover(file_path):
+    """Front cover image bytes of file_path (any picture if none is marked front), or None"""
+    try:
+        with open(file_path, "rb") as f:
+            kind = sniff_audio(f.read(HEADER_BYTES))
+            if kind is not None:
+                f.seek(0)
+                return _COVER_READERS[kind](f, os.fstat(f.fileno()).st_size)
+    except (TagError, OSError, struct.error, ValueError, IndexError, KeyError):
+        pass
+    return _cover_with_mutagen(file_path)
+
+
+# --- ID3v2 -------------------------------------------------------------------
+
+def _syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_text(encoding, data):
+    """Decode an ID3 text payload; multiple values are NUL separated, keep them all"""
+    if encoding == 0:
+        text = data.decode("latin-1")
+    elif encoding == 1:
+        text = data.decode("utf-16")
+    elif encoding == 2:
+        text = data.decode("utf-16-be")
+    else:
+        text = data.decode("utf-8", "replace")
+    return text.split("\0")
+
+
+def _split_terminated(encoding, data):
+    """Split data at the first encoding-appropriate NUL: (before, after)"""
+    if encoding in (1, 2):
+        for i in range(0, len(data) - 1, 2):
+            if data[i] == 0 and data[i + 1] == 0:
+                return data[:i], data[i + 2:]
+        return data, b""
+    end = data.find(b"\0")
+    if end < 0:
+        return data, b""
+    return data[:end], data[end + 1:]
+
+
+def _id3_frames(f, start):
+    """Yield (frame id, body offset, body size) for the ID3v2 tag at start.
+
+    Returns the offset just past the tag as the generator's value. Frames
+    that are compressed, encrypted or unsynchronised are passed over.
+    """
+    f.seek(start)
+    header = f.read(10)
+    if len(header) < 10 or not header.startswith(b"ID3"):
+        raise TagError("no ID3v2 header")
+    version, flags = header[3], header[5]
+    end = start + 10 + _syncsafe(header[6:10])
+    if flags & 0x10:
+        end += 10  # Footer
+    if version not in (2, 3, 4) or (flags & 0x80 and version < 4):
+        raise TagError("unsupported ID3v2 tag")
+
+    position = start + 10
+    if flags & 0x40 and version > 2:
+        size = f.read(4)
+        position += _syncsafe(size) if version == 4 else 4 + struct.unpack(">I", size)[0]
+
+    id_size, header_size = (3, 6) if version == 2 else (4, 10)
+    while position + header_size <= end:
+        f.seek(position)
+        frame = f.read(header_size)
+        frame_id = frame[:id_size]
+        if not frame_id.strip(b"\0") or frame_id[0] == 0:
+            break  # Padding
+        if version == 2:
+            size = int.from_bytes(frame[3:6], "big")
+        elif version == 4:
+            size = _syncsafe(frame[4:8])
+        else:
+            size = struct.unpack(">I", frame[4:8])[0]
+        body = position + header_size
+        position = body + size
+        if position > end:
+            break
+
+        if version == 3 and frame[9] & 0xC0:  # Compressed or encrypted
+            continue
+        if version == 4:
+            format_flags = frame[9]
+            if format_flags & 0x0E:  # Compressed, encrypted or unsynchronised
+                continue
+            if format_flags & 0x40:  # Grouping identity byte
+                body += 1
+                size -= 1
+            if format_flags & 0x01:  # Data length indicator
+                body += 4
+                size -= 4
+        yield frame_id, body, size
+    return end
+
+
+def _read_id3_text(f, start, info):
+    """Fill info from the ID3v2 tag at start; returns the offset just past the tag"""
+    user = {}
+    frames = _id3_frames(f, start)
+    while True:
+        try:
+            frame_id, body, size = next(frames)
+        except StopIteration as stop:
+            end = stop.value
+            break
+        if frame_id in ID3_TEXT_FRAMES or frame_id in ID3_USER_FRAMES:
+            f.seek(body)
+            data = f.read(size)
+            if not data:
+                continue
+            if frame_id in ID3_USER_FRAMES:
+                description, value = _split_terminated(data[0], data[1:])
+                description = _decode_text(data[0], description)[0]
+                user[f"TXXX:{description}"] = _decode_text(data[0], value)
+            else:
+                field = ID3_TEXT_FRAMES[frame_id]
+                value = _decode_text(data[0], data[1:])[0].strip()
+                if value and info[field] is None:
+                    info[field] = value
+    info["replaygain"] = read_replaygain(user)
+    return end
+
+
+def _id3_picture(f, frame_id, body, size):
+    """(picture type, image bytes) from an APIC/PIC frame body"""
+    f.seek(body)
+    data = f.read(size)
+    encoding = data[0]
+    if frame_id == b"PIC":
+        picture_type, rest = data[4], data[5:]
+    else:
+        mime_end = data.index(b"\0", 1)
+        picture_type, rest = data[mime_end + 1], data[mime_end + 2:]
+    _, image = _split_terminated(encoding, rest)
+    return picture_type, image
+
+
+def _id3_cover(f, start):
+    """Front cover from the ID3v2 tag at start (first picture if none is front)"""
+    fallback = None
+    for frame_id, body, size in _id3_frames(f, start):
+        if frame_id in ID3_PICTURE_FRAMES:
+            picture_type, image = _id3_picture(f, frame_id, body, size)
+            if picture_type == 3:
+                return image
+            if fallback is None:
+                fallback = image
+    return fallback
+
+
+def _read_id3v1(f, size, info):
+    """Fill missing fields from an ID3v1 tag; returns its size (0 if there is none)"""
+    if size < 128:
+        return 0
+    f.seek(size - 128)
+    tag = f.read(128)
+    if not tag.startswith(b"TAG"):
+        return 0
+    for field, raw in (("title", tag[3:33]), ("artist", tag[33:63]), ("album", tag[63:93])):
+        value = raw.split(b"\0", 1)[0].decode("latin-1").strip()
+        if value and info[field] is None:
+            info[field] = value
+    return 128
+
+
+# --- MPEG audio ----------------------------------------------------------------
+
+def _find_mpeg_frame(data):
+    """Offset of the first plausible MPEG audio frame header in data, or -1"""
+    position = 0
+    while True:
+        position = data.find(b"\xff", position)
+        if position < 0 or position + 4 > len(data):
+            return -1
+        header = data[position:position + 4]
+        if (header[1] & 0xE0 == 0xE0 and (header[1] >> 3) & 3 != 1 and (header[1] >> 1) & 3
+                and 0 < header[2] >> 4 < 15 and (header[2] >> 2) & 3 != 3):
+            return position
+        position += 1
+
+
+def _mpeg_duration(f, offset, size):
+    """Duration of the MPEG audio stream starting near offset, in seconds"""
+    f.seek(offset)
+    data = f.read(MPEG_FIRST_READ)
+    position = _find_mpeg_frame(data[:-MPEG_HEADER_ROOM])
+    if position < 0:
+        # Junk between the tag and the audio; look further (rare)
+        data += f.read(MPEG_SYNC_SEARCH - len(data))
+        position = _find_mpeg_frame(data)
+        if position < 0:
+            raise TagError("no MPEG frame")
+
+    header = data[position:position + 4]
+    version = (header[1] >> 3) & 3
+    layer = 4 - ((header[1] >> 1) & 3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    mpeg1 = version == 3
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    mono = header[3] >> 6 == 3
+    samples_per_frame = 384 if layer == 1 else 1152 if (layer == 2 or mpeg1) else 576
+
+    # VBR files say how many frames they have in a Xing/Info or VBRI header
+    if layer == 3:
+        side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        xing = position + 4 + side_info
+        if data[xing:xing + 4] in (b"Xing", b"Info"):
+            flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+            if flags & 1:
+                frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+                return frames * samples_per_frame / sample_rate
+        vbri = position + 36
+        if data[vbri:vbri + 4] == b"VBRI":
+            frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+            return frames * samples_per_frame / sample_rate
+
+    return 8 * (size - offset - position) / bitrate
+
+
+def _read_mp3(f, size):
+    info = _empty_info()
+    audio_start = 0
+    if sniff_audio(f.read(HEADER_BYTES)) == "id3":
+        audio_start = _read_id3_text(f, 0, info)
+    id3v1 = _read_id3v1(f, size, info)
+    info["duration"] = _mpeg_duration(f, audio_start, size - id3v1)
+    return info
+
+
+def _mp3_cover(f, size):
+    if sniff_audio(f.read(HEADER_BYTES)) != "id3":
+        return None
+    return _id3_cover(f, 0)
+
+
+# --- Vorbis comments (Ogg and FLAC) -----------------------------------------
+
+# Capture pattern, stream serial number and segment count of an Ogg page header
+OGG_PAGE_HEADER = struct.Struct("<4s10xI8xB")
+OGG_READ_AHEAD = 4096  # Page bytes read at a time while parsing a comment header
+
+
+class _OggReader:
+    """Reads the first logical stream's page bodies as one byte stream.
+
+    Reads go through a small read-ahead buffer within the current page, so
+    the many short fields of a comment header don't cost a file read each.
+    ``skip`` seeks over whole pages it doesn't need, so a large embedded
+    picture in the comment header is never read, and only once something
+    after it is read: a picture last in the header costs nothing at all.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.serial = None
+        self._left = 0  # Body bytes of the current page not read from the file yet
+        self._buffer = b""  # Body bytes read ahead from the current page
+        self._position = 0  # Read position in _buffer
+        self._skipped = 0  # Bytes to skip before the next read
+
+    def _next_page(self):
+        header = self.f.read(OGG_PAGE_HEADER.size)
+        if len(header) < OGG_PAGE_HEADER.size:
+            raise TagError("truncated Ogg stream")
+        magic, serial, segments = OGG_PAGE_HEADER.unpack(header)
+        if magic != b"OggS":
+            raise TagError("bad Ogg page")
+        body = sum(self.f.read(segments))
+        if self.serial is None:
+            self.serial = serial
+        if serial != self.serial:
+            self.f.seek(body, 1)  # Page of another multiplexed stream
+            return
+        self._left = body
+
+    def read(self, count):
+        if self._skipped:
+            self._skip_now()
+        chunks = []
+        while count:
+            available = len(self._buffer) - self._position
+            if not available:
+                if not self._left:
+                    self._next_page()
+                    continue
+                self._buffer = self.f.read(min(self._left, max(count, OGG_READ_AHEAD)))
+                if not self._buffer:
+                    raise TagError("truncated Ogg stream")
+                self._left -= len(self._buffer)
+                self._position = 0
+                continue
+            step = min(count, available)
+            chunks.append(self._buffer[self._position:self._position + step])
+            self._position += step
+            count -= step
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    def skip(self, count):
+        self._skipped += count
+
+    def _skip_now(self):
+        count, self._skipped = self._skipped, 0
+        step = min(count, len(self._buffer) - self._position)
+        self._position += step
+        count -= step
+        while count:
+            if not self._left:
+                self._next_page()
+                continue
+            step = min(count, self._left)
+            self.f.seek(step, 1)
+            self._left -= step
+            count -= step
+
+    def finish_page(self):
+        self.skip(len(self._buffer) - self._position + self._left)
+
+
+class _BufferReader:
+    """The read/skip interface of _OggReader over a file region (FLAC blocks)"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def read(self, count):
+        data = self.f.read(count)
+        if len(data) < count:
+            raise TagError("truncated block")
+        return data
+
+    def skip(self, count):
+        self.f.seek(count, 1)
+
+
+PICTURE_FIELDS = ("metadata_block_picture",)
+
+
+def _read_vorbis_comments(reader, info, want_picture=False):
+    """Parse a Vorbis comment block from reader; returns the first picture if asked.
+
+    Text fields fill info; picture comments are skipped unless want_picture.
+    """
+    vendor_length = struct.unpack("<I", reader.read(4))[0]
+    reader.skip(vendor_length)
+    count = struct.unpack("<I", reader.read(4))[0]
+    fields = {}
+    fallback = None
+    for _ in range(count):
+        length = struct.unpack("<I", reader.read(4))[0]
+        # Field names are short; read enough to see the name before the value
+        head = reader.read(min(length, 32))
+        name, _, value = head.partition(b"=")
+        name = name.decode("ascii", "replace").lower()
+        if name in PICTURE_FIELDS:
+            if not want_picture:
+                reader.skip(length - len(head))
+                continue
+            picture = base64.b64decode(value + reader.read(length - len(head)))
+            picture_type, image = _flac_picture(picture)
+            if picture_type == 3:
+                return image
+            if fallback is None:
+                fallback = image
+            continue
+        value += reader.read(length - len(head))
+        if want_picture:
+            continue
+        fields.setdefault(name, []).append(value.decode("utf-8", "replace"))
+
+    for name, field in VORBIS_FIELDS.items():
+        if fields.get(name):
+            info[field] = fields[name][0].strip() or None
+    info["replaygain"] = read_replaygain(fields)
+    return fallback
+
+
+def _flac_picture(data):
+    """(picture type, image bytes) from a FLAC PICTURE block body"""
+    picture_type, mime_length = struct.unpack(">II", data[:8])
+    position = 8 + mime_length
+    description_length = struct.unpack(">I", data[position:position + 4])[0]
+    position += 4 + description_length + 16
+    image_length = struct.unpack(">I", data[position:position + 4])[0]
+    return picture_type, data[position + 4:position + 4 + image_length]
+
+
+def _ogg_headers(f):
+    """Position a reader at the comment header; returns (reader, codec, rate, pre-skip)"""
+    reader = _OggReader(f)
+    ident = reader.read(19)
+    if ident.startswith(b"\x01vorbis"):
+        codec, rate, pre_skip = "vorbis", struct.unpack("<I", ident[12:16])[0], 0
+        reader.read(30 - 19)
+    elif ident.startswith(b"OpusHead"):
+        codec, rate, pre_skip = "opus", 48000, struct.unpack("<H", ident[10:12])[0]
+    else:
+        raise TagError("unsupported Ogg codec")
+    reader.finish_page()  # The identification header has a page to itself
+
+    magic = reader.read(7 if codec == "vorbis" else 8)
+    if magic not in (b"\x03vorbis", b"OpusTags"):
+        raise TagError("missing comment header")
+    return reader, codec, rate, pre_skip
+
+
+def _ogg_last_granule(f, size, serial):
+    """Granule position of the stream's last page"""
+    for window in (8 * 1024, 64 * 1024, 1024 * 1024):
+        start = max(size - window, 0)
+        f.seek(start)
+        data = f.read(size - start)
+        position = len(data)
+        while True:
+            position = data.rfind(b"OggS", 0, position)
+            if position < 0:
+                break
+            granule, page_serial = struct.unpack("<qI", data[position + 6:position + 18])
+            if page_serial == serial and granule >= 0:
+                return granule
+        if start == 0:
+            break
+    raise TagError("no final Ogg page")
+
+
+def _read_ogg(f, size):
+    info = _empty_info()
+    reader, codec, rate, pre_skip = _ogg_headers(f)
+    _read_vorbis_comments(reader, info)
+    if rate:  # Zero in a damaged header: leave the duration unknown
+        info["duration"] = max(_ogg_last_granule(f, size, reader.serial) - pre_skip, 0) / rate
+    return info
+
+
+def _ogg_cover(f, size):
+    reader = _ogg_headers(f)[0]
+    return _read_vorbis_comments(reader, _empty_info(), want_picture=True)
+
+
+def _flac_blocks(f):
+    """Yield (block type, body offset, body size) for a FLAC file's metadata blocks"""
+    start = 0
+    if sniff_audio(f.read(HEADER_BYTES)) == "id3":
+        start = _id3_end(f)
+    f.seek(start)
+    if f.read(4) != b"fLaC":
+        raise TagError("not a FLAC stream")
+    position = start + 4
+    while True:
+        f.seek(position)
+        header = f.read(4)
+        if len(header) < 4:
+            raise TagError("truncated FLAC metadata")
+        block_type, length = header[0] & 0x7F, int.from_bytes(header[1:4], "big")
+        yield block_type, position + 4, length
+        position += 4 + length
+        if header[0] & 0x80:
+            return
+
+
+def _id3_end(f):
+    f.seek(0)
+    header = f.read(10)
+    return 10 + _syncsafe(header[6:10]) + (10 if header[5] & 0x10 else 0)
+
+
+def _read_flac(f, size):
+    info = _empty_info()
+    for block_type, body, length in _flac_blocks(f):
+        if block_type == 0:  # STREAMINFO
+            f.seek(body + 10)
+            packed = int.from_bytes(f.read(8), "big")
+            rate = packed >> 44
+            samples = packed & 0xFFFFFFFFF
+            if rate:
+                info["duration"] = samples / rate
+        elif block_type == 4:  # VORBIS_COMMENT
+            f.seek(body)
+            _read_vorbis_comments(_BufferReader(f), info)
+    return info
+
+
+def _flac_cover(f, size):
+    fallback = None
+    for block_type, body, length in list(_flac_blocks(f)):
+        if block_type == 6:  # PICTURE
+            f.seek(body)
+            picture_type, image = _flac_picture(f.read(length))
+            if picture_type == 3:
+                return image
+            if fallback is None:
+                fallback = image
+    return fallback
+
+
+# --- RIFF WAVE -----------------------------------------------------------------
+
+def _riff_chunks(f, size):
+    """Yield (chunk id, body offset, body size) for the top-level chunks of a WAV file"""
+    position = 12
+    while position + 8 <= size:
+        f.seek(position)
+        chunk_id, length = struct.unpack("<4sI", f.read(8))
+        yield chunk_id, position + 8, length
+        position += 8 + length + (length & 1)
+
+
+def _decode_info(raw):
+    raw = raw.split(b"\0", 1)[0]
+    try:
+        return raw.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return raw.decode("latin-1").strip()
+
+
+def _read_wav(f, size):
+    info = _empty_info()
+    byte_rate = 0
+    data_size = 0
+    id3_start = None
+    for chunk_id, body, length in _riff_chunks(f, size):
+        if chunk_id == b"fmt ":
+            f.seek(body + 8)
+            byte_rate = struct.unpack("<I", f.read(4))[0]
+        elif chunk_id == b"data":
+            data_size = min(length, size - body)
+        elif chunk_id == b"LIST":
+            f.seek(body)
+            data = f.read(length)
+            if data[:4] != b"INFO":
+                continue
+            position = 4
+            while position + 8 <= len(data):
+                sub_id, sub_length = struct.unpack("<4sI", data[position:position + 8])
+                field = RIFF_INFO_FIELDS.get(sub_id)
+                if field is not None:
+                    value = _decode_info(data[position + 8:position + 8 + sub_length])
+                    if value and info[field] is None:
+                        info[field] = value
+                position += 8 + sub_length + (sub_length & 1)
+        elif chunk_id in (b"id3 ", b"ID3 "):
+            id3_start = body
+    if id3_start is not None:
+        # ID3 text takes precedence, like it does for players that write both
+        id3_info = _empty_info()
+        _read_id3_text(f, id3_start, id3_info)
+        for field, value in id3_info.items():
+            if value is not None:
+                info[field] = value
+    if byte_rate:
+        info["duration"] = data_size / byte_rate
+    return info
+
+
+def _wav_cover(f, size):
+    for chunk_id, body, length in _riff_chunks(f, size):
+        if chunk_id in (b"id3 ", b"ID3 "):
+            return _id3_cover(f, body)
+    return None
+
+
+def _read_id3_file(f, size):
+    # ID3v2 at the start of the file: MP3 unless the audio turns out to be FLAC
+    end = _id3_end(f)
+    f.seek(end)
+    if f.read(4) == b"fLaC":
+        f.seek(0)
+        return _read_flac(f, size)
+    f.seek(0)
+    return _read_mp3(f, size)
+
+
+def _id3_file_cover(f, size):
+    end = _id3_end(f)
+    f.seek(end)
+    if f.read(4) == b"fLaC":
+        f.seek(0)
+        cover = _flac_cover(f, size)
+        if cover is not None:
+            return cover
+    return _id3_cover(f, 0)
+
+
+_READERS = {"id3": _read_id3_file, "mp3": _read_mp3, "ogg": _read_ogg, "flac": _read_flac,
+            "wav": _read_wav}
+_COVER_READERS = {"id3": _id3_file_cover, "mp3": _mp3_cover, "ogg": _ogg_cover,
+                  "flac": _flac_cover, "wav": _wav_cover}
+
+
+# --- mutagen fallback ------------------------------------------------------------
+
+# Tag keys for title/artist/album across mutagen's tag types
+MUTAGEN_KEYS = {
+    "title": ("TIT2", "title", "\xa9nam", "Title"),
+    "artist": ("TPE1", "artist", "\xa9ART", "Artist"),
+    "album": ("TALB", "album", "\xa9alb", "Album"),
+}
+
+
+def _read_with_mutagen(file_path):
+    import mutagen  # Deferred: only needed for formats without a fast path
+
+    info = _empty_info()
+    try:
+        audio = mutagen.File(file_path)
+    except Exception as e:
+        print(f"Error reading metadata: {str(e)}")
+        # If metadata reading fails, use filename as title
+        info["title"] = os.path.basename(file_path)
+        return info
+    if audio is None:
+        return info
+
+    tags = getattr(audio, "tags", None)
+    if tags is not None and hasattr(tags, "get"):
+        for field, keys in MUTAGEN_KEYS.items():
+            for key in keys:
+                try:
+                    value = tags.get(key)
+                except Exception:
+                    value = None
+                if value:
+                    info[field] = str(value[0] if isinstance(value, list) else value.text[0]
+                                      if hasattr(value, "text") else value)
+                    break
+    info["replaygain"] = read_replaygain(tags)
+
+    try:
+        info["duration"] = float(audio.info.length)
+    except Exception:
+        info["duration"] = 0
+    return info
+
+
+def _cover_with_mutagen(file_path):
+    import mutagen
+
+    try:
+        audio = mutagen.File(file_path)
+    except Exception:
+        return None
+    if audio is None:
+        return None
+    pictures = list(getattr(audio, "pictures", None) or [])
+    tags = getattr(audio, "tags", None)
+    if tags is not None and hasattr(tags, "getall"):
+        pictures += tags.getall("APIC")
+    for picture in pictures:
+        if picture.type == 3:
+            return picture.data
+    if pictures:
+        return pictures[0].data
+    if tags is not None and hasattr(tags, "get") and tags.get("covr"):
+        return bytes(tags["covr"][0])
+    return None
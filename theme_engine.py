@@ -0,0 +1,88 @@
+from PyQt5.QtGui import QColor
+
+from styles import DARK_THEME, LIGHT_THEME
+from advanced_styles import ADVANCED_STYLES
+
+# Widget states expressed as dynamic-property rules, so toggling one only
+# re-polishes that widget instead of giving it a style sheet of its own
+STATE_STYLES = """
+/* Active toggle buttons (repeat, shuffle) */
+QPushButton#controlButton[active="true"] {
+    background-color: #4CAF50;
+    border-radius: 15px;
+    padding: 5px;
+}
+
+QPushButton#controlButton[active="true"]:hover {
+    background-color: #45a049;
+}
+"""
+
+# Accent color taken from the album art, set as the tinted widgets' own sheet
+# (selection-background-color is the palette's Highlight, for custom painting)
+ACCENT_STYLES = """
+QSlider {
+    selection-background-color: %(color)s;
+}
+
+QSlider::sub-page:horizontal {
+    background: %(color)s;
+}
+
+QPushButton#playButton {
+    background: %(color)s;
+}
+"""
+
+THEMES = {"dark": DARK_THEME, "light": LIGHT_THEME}
+
+
+class ThemeEngine:
+    """Applies the app's style sheets without re-parsing them needlessly.
+
+    Each theme's full sheet is assembled once. Switching themes sets it on
+    the window only when the theme actually changes. Per-widget states
+    (toggle buttons) are dynamic properties matched by STATE_STYLES, so
+    changing them re-polishes just the widgets involved. The album-art
+    accent is a small sheet of the tinted widgets' own, which also sets
+    their palettes' Highlight role; ``palette(highlight)`` in a sheet would
+    read the application palette, and changing that re-polishes every
+    widget in the window.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.theme = None
+        self.sheets = {name: sheet + ADVANCED_STYLES + STATE_STYLES
+                       for name, sheet in THEMES.items()}
+
+    def apply(self, theme):
+        """Switch to the named theme; returns False if it was already active"""
+        if theme == self.theme:
+            return False
+        self.window.setStyleSheet(self.sheets[theme])
+        self.theme = theme
+        return True
+
+    def set_state(self, widget, name, value):
+        """Set a dynamic style property and re-polish the widget if it changed"""
+        if widget.property(name) == value:
+            return
+        widget.setProperty(name, value)
+        self.repolish(widget)
+
+    def repolish(self, widget):
+        style = widget.style()
+        style.unpolish(widget)
+        style.polish(widget)
+        widget.update()
+
+    def set_accent(self, widgets, color):
+        """Tint widgets with color (anything QColor accepts), or None to reset"""
+        color = QColor(color) if color is not None else None
+        if color is not None and not color.isValid():
+            return
+        sheet = ACCENT_STYLES % {"color": color.name()} if color is not None else ""
+        for widget in widgets:
+            if widget.styleSheet() != sheet:
+                widget.setStyleSheet(sheet)  # Re-polishes just this widget
@@ -0,0 +1,247 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from PyQt5.QtCore import Qt, QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QLabel
+
+MAX_EVENTS = 200000  # Oldest spans are dropped beyond this
+
+
+class Tracer:
+    """Collects timed spans for Chrome's trace viewer (chrome://tracing, Perfetto).
+
+    Disabled by default; ``span`` and ``traced`` then cost one attribute
+    check. Besides the raw events, per-name totals and maxima are kept so
+    the overlay can name the slowest hot path without scanning the buffer.
+    Spans may be recorded from any thread.
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.stats = {}  # name -> [count, total seconds, max seconds]
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.stats.clear()
+
+    def add_span(self, name, start, duration):
+        """Record a finished span; start is a perf_counter() value, both in seconds"""
+        event = {"name": name, "ph": "X", "ts": (start - self._origin) * 1e6,
+                 "dur": duration * 1e6, "tid": threading.get_ident()}
+        with self._lock:
+            self.events.append(event)
+            stat = self.stats.get(name)
+            if stat is None:
+                self.stats[name] = [1, duration, duration]
+            else:
+                stat[0] += 1
+                stat[1] += duration
+                if duration > stat[2]:
+                    stat[2] = duration
+
+    def add_counter(self, name, **values):
+        event = {"name": name, "ph": "C", "ts": (time.perf_counter() - self._origin) * 1e6,
+                 "args": values, "tid": 0}
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter() - start)
+
+    def traced(self, name=None):
+        """Decorator recording every call of the function as a span"""
+        def decorate(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.add_span(label, start, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def slowest(self, count=3):
+        """[(name, max seconds)] for the spans with the longest single call"""
+        with self._lock:
+            ranked = sorted(self.stats.items(), key=lambda item: item[1][2], reverse=True)
+        return [(name, stat[2]) for name, stat in ranked[:count]]
+
+    def export_chrome_trace(self, file_name):
+        """Write the recorded events as Chrome trace JSON"""
+        pid = os.getpid()
+        with self._lock:
+            events = [dict(event, pid=pid) for event in self.events]
+        with open(file_name, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+
+class LagMonitor(QObject):
+    """Measures event-loop latency with a watchdog timer.
+
+    A timer due every ``interval_ms`` that fires late means the GUI thread
+    was busy for that long; the lateness is the lag a user would feel.
+    """
+
+    def __init__(self, interval_ms=50, parent=None):
+        super().__init__(parent)
+        self.interval_ms = interval_ms
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self._expected = 0.0
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._on_timeout)
+
+    def start(self):
+        self.max_ms = 0.0
+        self._expected = time.perf_counter() + self.interval_ms / 1000.0
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def reset_max(self):
+        self.max_ms = 0.0
+
+    def _on_timeout(self):
+        now = time.perf_counter()
+        self.last_ms = max((now - self._expected) * 1000.0, 0.0)
+        self.max_ms = max(self.max_ms, self.last_ms)
+        self._expected = now + self.interval_ms / 1000.0
+        tracer.add_counter("event loop lag", ms=self.last_ms)
+
+
+class FrameTimer(QObject):
+    """Times how long a window takes to repaint.
+
+    Installed as an event filter on a top-level window, it delivers the
+    window's UpdateRequest itself (the backing store repaints every dirty
+    widget synchronously while handling it) and records the duration.
+    """
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def start(self):
+        self.max_ms = 0.0
+        self.window.installEventFilter(self)
+
+    def stop(self):
+        self.window.removeEventFilter(self)
+
+    def reset_max(self):
+        self.max_ms = 0.0
+
+    def eventFilter(self, obj, event):
+        if obj is self.window and event.type() == QEvent.UpdateRequest:
+            start = time.perf_counter()
+            obj.event(event)
+            duration = time.perf_counter() - start
+            self.last_ms = duration * 1000.0
+            self.max_ms = max(self.max_ms, self.last_ms)
+            tracer.add_span("repaint", start, duration)
+            return True
+        return False
+
+
+def hit_rate(hits, misses):
+    total = hits + misses
+    if not total:
+        return "  -"
+    return f"{100 * hits // total:3d}% ({hits}/{total})"
+
+
+class PerfOverlay(QLabel):
+    """Translucent readout of frame time, event-loop lag and cache hit rates.
+
+    Showing the overlay turns on the tracer, lag monitor and frame timer;
+    hiding it turns them off again (the tracer only if it was off before)
+    so they cost nothing when not wanted.
+    ``caches`` is a list of (label, object with hits/misses) pairs.
+    """
+
+    def __init__(self, window, caches=()):
+        super().__init__(window)
+        self.setObjectName("perfOverlay")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.PlainText)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setStyleSheet("QLabel#perfOverlay { background: rgba(0, 0, 0, 170); color: #9effa0; "
+                           "font-family: monospace; font-size: 11px; padding: 6px; "
+                           "border-radius: 4px; }")
+        self.caches = list(caches)
+        self.lag = LagMonitor(parent=self)
+        self.frames = FrameTimer(window)
+        self._refresh = QTimer(self)
+        self._refresh.setInterval(500)
+        self._refresh.timeout.connect(self.refresh)
+        self._refreshes = 0
+        self._was_tracing = False
+        self.hide()
+
+    def set_active(self, active):
+        if active:
+            self._was_tracing = tracer.enabled
+            tracer.enable()
+            self.lag.start()
+            self.frames.start()
+            self._refresh.start()
+            self.refresh()
+            self.show()
+            self.raise_()
+        else:
+            self.hide()
+            self._refresh.stop()
+            self.lag.stop()
+            self.frames.stop()
+            tracer.enable(self._was_tracing)
+
+    def refresh(self):
+        lines = [f"frame  {self.frames.last_ms:6.1f} ms  max {self.frames.max_ms:6.1f}",
+                 f"lag    {self.lag.last_ms:6.1f} ms  max {self.lag.max_ms:6.1f}"]
+        for label, cache in self.caches:
+            lines.append(f"{label:<6} {hit_rate(cache.hits, cache.misses)}")
+        for name, seconds in tracer.slowest():
+            lines.append(f"{seconds * 1000:6.1f} ms  {name.rsplit('.', 1)[-1]}")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(self.parentWidget().width() - self.width() - 10, 30)
+        # Maxima cover the last few seconds rather than the whole session
+        self._refreshes += 1
+        if self._refreshes % 10 == 0:
+            self.lag.reset_max()
+            self.frames.reset_max()
@@ -0,0 +1,165 @@
+import math
+import os
+from array import array
+
+NAME_ENCODING = ("utf-8", "surrogateescape")  # Round-trips any file name os.fsencode would
+MIN_SLOTS = 1024
+SEP = os.sep
+ALTSEP = os.altsep
+ASCII_BATCH = 256  # paths() decodes every name at once for 1+ tracks per this many name bytes
+
+
+def split_path(path):
+    """(folder, name) such that folder + name == path, cut after the last separator"""
+    cut = path.rfind(SEP) + 1
+    if ALTSEP:
+        cut = max(cut, path.rfind(ALTSEP) + 1)
+    return path[:cut], path[cut:]
+
+
+class TrackTable:
+    """Every track path the player knows, stored once under a dense integer id.
+
+    Paths are split into folder and file name. Folders are interned, so an
+    album's tracks share one string, and names are packed back to back as
+    UTF-8 in a single bytearray with their end offsets in an ``array``. A
+    track costs its name's bytes plus a few array slots, instead of a full
+    path string in every playlist that holds it.
+
+    Ids are never reused or removed (a renamed file gets a new one), so
+    per-track data can live in columns indexed by id, like ``durations``.
+
+    Path lookups go through an open-addressing hash table whose slots are
+    an ``array`` of ids, matched by each path's 64-bit hash (kept in a
+    column so growing the table never rebuilds paths). Paths themselves are
+    not compared: two different paths would have to share a 64-bit hash,
+    about a one in 10^8 chance even for a million tracks.
+
+    Not thread-safe; the GUI thread owns the shared ``tracks`` table.
+    """
+
+    def __init__(self):
+        self._folders = []  # folder id -> folder, with its trailing separator
+        self._folder_ids = {}  # folder -> folder id
+        self._folder_of = array('I')  # track id -> folder id
+        self._names = bytearray()  # UTF-8 file names, back to back
+        self._name_ends = array('I')  # track id -> end of its name in _names
+        self._hashes = array('q')  # track id -> hash of its path
+        self.durations = array('f')  # track id -> seconds, NaN until known
+        self._slots = array('i', [-1]) * MIN_SLOTS  # hash table of track ids, -1 for empty
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, path):
+        """Return the id of path, adding it to the table if it is new"""
+        track = self.lookup(path)
+        return track if track is not None else self.add_many((path,))[0]
+
+    def add_many(self, paths):
+        """Return an array of the ids of paths, adding the new ones to the table"""
+        ids = array('I')
+        hashes = self._hashes
+        slots = self._slots
+        mask = len(slots) - 1
+        for path in paths:
+            key = hash(path)
+            slot = key & mask
+            while True:
+                track = slots[slot]
+                if track < 0 or hashes[track] == key:
+                    break
+                slot = (slot + 1) & mask
+            if track < 0:
+                track = self._append(path, key)
+                slots[slot] = track
+                if 3 * len(hashes) > 2 * len(slots):
+                    self._grow()
+                    slots = self._slots
+                    mask = len(slots) - 1
+            ids.append(track)
+        return ids
+
+    def lookup(self, path):
+        """Return the id of path, or None if the table has never seen it"""
+        key = hash(path)
+        hashes = self._hashes
+        slots = self._slots
+        mask = len(slots) - 1
+        slot = key & mask
+        while True:
+            track = slots[slot]
+            if track < 0:
+                return None
+            if hashes[track] == key:
+                return track
+            slot = (slot + 1) & mask
+
+    def path(self, track):
+        ends = self._name_ends
+        name = self._names[ends[track - 1] if track else 0:ends[track]]
+        return self._folders[self._folder_of[track]] + name.decode(*NAME_ENCODING)
+
+    def paths(self, tracks):
+        """List of the paths of track ids"""
+        return self.path_lists((tracks,))[0]
+
+    def path_lists(self, track_lists):
+        """Lists of the paths of several sequences of track ids, decoding names once"""
+        folders = self._folders
+        folder_of = self._folder_of
+        ends = self._name_ends
+        names = self._names
+        if sum(map(len, track_lists)) * ASCII_BATCH > len(names) and names.isascii():
+            # Byte offsets are character offsets, so decode every name at once
+            names = names.decode("ascii")
+            return [[folders[folder_of[track]] + names[ends[track - 1] if track else 0:ends[track]]
+                     for track in tracks]
+                    for tracks in track_lists]
+        return [[folders[folder_of[track]]
+                 + names[ends[track - 1] if track else 0:ends[track]].decode(*NAME_ENCODING)
+                 for track in tracks]
+                for tracks in track_lists]
+
+    def name(self, track):
+        """File name of a track, without splitting its path"""
+        ends = self._name_ends
+        return self._names[ends[track - 1] if track else 0:ends[track]].decode(*NAME_ENCODING)
+
+    def set_duration(self, path, seconds):
+        track = self.lookup(path)
+        if track is not None and seconds:
+            self.durations[track] = seconds
+
+    def duration(self, track):
+        """Length of a track in seconds, or None if not known yet"""
+        seconds = self.durations[track]
+        return None if math.isnan(seconds) else seconds
+
+    def _append(self, path, key):
+        folder, name = split_path(path)
+        folder_id = self._folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = len(self._folders)
+            self._folders.append(folder)
+            self._folder_ids[folder] = folder_id
+        self._folder_of.append(folder_id)
+        self._names += name.encode(*NAME_ENCODING)
+        self._name_ends.append(len(self._names))
+        self._hashes.append(key)
+        self.durations.append(math.nan)
+        return len(self._hashes) - 1
+
+    def _grow(self):
+        # Doubling at two thirds full leaves the table a third full
+        slots = array('i', [-1]) * (2 * len(self._slots))
+        mask = len(slots) - 1
+        for track, key in enumerate(self._hashes):
+            slot = key & mask
+            while slots[slot] >= 0:
+                slot = (slot + 1) & mask
+            slots[slot] = track
+        self._slots = slots
+
+
+tracks = TrackTable()  # Shared by every Playlist and the search index
@@ -0,0 +1,300 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PyQt5.QtCore import Qt, QEvent, QLineF, QObject, QRect, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QPalette, QPixmap
+from PyQt5.QtWidgets import QSlider, QStyle
+
+from audio_analysis import AnalysisCache, analyze_file, init_worker
+from replaygain import measure_gain, needs_measuring
+
+# Each worker holds one whole decoded track (about 600 MB for an hour of stereo)
+MAX_ANALYSIS_WORKERS = 4
+
+
+class WaveformLoader(QObject):
+    """Analyzes tracks in a pool of worker processes and serves the results.
+
+    ``request`` returns the cached analysis record (peak/RMS waveform and
+    integrated loudness, see audio_analysis) straight away when there is
+    one; otherwise it queues the track and ``waveform_ready`` fires on the
+    GUI thread once the record is on disk. Decoding never happens in the
+    GUI process, and tracks that fail are not retried until restart.
+    """
+
+    waveform_ready = pyqtSignal(str)
+    _finished = pyqtSignal(str, str)  # path, error message (empty on success)
+
+    def __init__(self, cache=None, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or AnalysisCache()
+        self.max_workers = max_workers or max(1, min(2, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._in_flight = set()
+        self._failed = set()
+        self._finished.connect(self._on_finished)
+
+    def request(self, path):
+        """Analysis record for path, or None while it is being analyzed"""
+        record = self.cache.load(path)
+        if record is None:
+            self._submit(path)
+        return record
+
+    def prefetch(self, paths):
+        """Analyze upcoming tracks ahead of time"""
+        for path in paths:
+            if self.cache.path_for(path) is not None and self.cache.load(path) is None:
+                self._submit(path)
+
+    def _submit(self, path):
+        if path in self._in_flight or path in self._failed or not os.path.exists(path):
+            return
+        if self._executor is None:
+            # Spawned, not forked: the GUI process has Qt and the mixer running
+            self._executor = ProcessPoolExecutor(self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=init_worker)
+        self._in_flight.add(path)
+        executor = self._executor
+        future = executor.submit(analyze_file, path, self.cache.directory)
+        future.add_done_callback(lambda f: self._report(executor, path, f))
+
+    def _report(self, executor, path, future):
+        # Runs on the pool's thread; after shutdown, or once Qt has deleted this
+        # object along with its parent, the result has nowhere to go
+        try:
+            if executor is not self._executor:
+                return
+            self._finished.emit(path, "" if future.cancelled() or future.exception() is None
+                                else str(future.exception()))
+        except RuntimeError:
+            pass
+
+    def _on_finished(self, path, error):
+        self._in_flight.discard(path)
+        if error:
+            print(f"Error analyzing {os.path.basename(path)}: {error}")
+            self._failed.add(path)
+            return
+        self.waveform_ready.emit(path)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class LoudnessAnalyzer(QObject):
+    """Batch ReplayGain analysis of a library on several cores.
+
+    Tracks without an analysis record are measured by ``measure_gain`` in
+    worker processes, a few at a time per worker so that stopping is
+    immediate. Results go to the same on-disk cache the seek bar uses,
+    one file per track as it completes, so a stopped or interrupted batch
+    resumes where it left off. Tracks with ReplayGain tags are only
+    checked for the tags, never decoded.
+    """
+
+    progress = pyqtSignal(int, int)  # tracks done, tracks in this batch
+    finished = pyqtSignal(int, int, int, bool)  # analyzed, tagged, failed, stopped early
+    _finished_one = pyqtSignal(str, str, str)  # path, source, error message
+
+    def __init__(self, cache=None, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or AnalysisCache()
+        self.max_workers = max_workers or min(MAX_ANALYSIS_WORKERS, os.cpu_count() or 1)
+        self._executor = None
+        self._workers = 0
+        self._pending = []
+        self._in_flight = 0
+        self._done = 0
+        self._total = 0
+        self._counts = {"analysis": 0, "tag": 0, "failed": 0}
+        self._finished_one.connect(self._on_finished_one)
+
+    def is_running(self):
+        return self._executor is not None
+
+    def start(self, paths):
+        """Measure every track in paths that hasn't been measured yet"""
+        if self.is_running():
+            return
+        self._pending = [path for path in dict.fromkeys(paths)
+                         if needs_measuring(self.cache, path)]
+        self._pending.reverse()  # Popped from the end, so analyze in the given order
+        self._total = len(self._pending)
+        self._done = 0
+        self._counts = dict.fromkeys(self._counts, 0)
+        if not self._pending:
+            self.finished.emit(0, 0, 0, False)
+            return
+        self._workers = min(self.max_workers, self._total)
+        self._executor = ProcessPoolExecutor(self._workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=init_worker)
+        self._submit_more()
+
+    def stop(self):
+        if not self.is_running():
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._pending = []
+        self._in_flight = 0
+        self.finished.emit(self._counts["analysis"], self._counts["tag"],
+                           self._counts["failed"], True)
+
+    def _submit_more(self):
+        # Keep every worker busy with a short queue behind it
+        while self._pending and self._in_flight < 2 * self._workers:
+            path = self._pending.pop()
+            executor = self._executor
+            future = executor.submit(measure_gain, path, self.cache.directory)
+            future.add_done_callback(lambda f, path=path: self._report(executor, path, f))
+            self._in_flight += 1
+
+    def _report(self, executor, path, future):
+        # Runs on the pool's thread; results of a stopped batch are dropped here, as
+        # after shutdown, or once Qt has deleted this object, they have nowhere to go
+        try:
+            if executor is not self._executor:
+                return
+            self._finished_one.emit(
+                path, "" if future.cancelled() or future.exception() else future.result()[1],
+                "cancelled" if future.cancelled() else str(future.exception() or ""))
+        except RuntimeError:
+            pass
+
+    def _on_finished_one(self, path, source, error):
+        if not self.is_running():
+            return  # Stopped; this is a straggler
+        self._in_flight -= 1
+        self._done += 1
+        if error:
+            print(f"Error measuring loudness of {os.path.basename(path)}: {error}")
+            self._counts["failed"] += 1
+        else:
+            self._counts[source] += 1
+        self.progress.emit(self._done, self._total)
+        if self._done == self._total:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self.finished.emit(self._counts["analysis"], self._counts["tag"],
+                               self._counts["failed"], False)
+        else:
+            self._submit_more()
+
+
+class WaveformSlider(QSlider):
+    """Seek bar drawing the track's waveform, played part in the highlight color.
+
+    Without a waveform it is an ordinary QSlider. The waveform is rendered
+    into two pixmaps (played and unplayed colors) whenever the size, palette
+    or data change; a position update then only blits the two halves.
+    Clicking anywhere jumps there and starts a drag.
+    """
+
+    def __init__(self, orientation=Qt.Horizontal, parent=None):
+        super().__init__(orientation, parent)
+        self.setMinimumHeight(40)
+        self._peak = None
+        self._rms = None
+        self._pixmaps = None  # (played, unplayed) for the current size and palette
+
+    def set_waveform(self, record):
+        """Show the peak/RMS columns of an analysis record, or None for a plain slider"""
+        if record is None:
+            self._peak = self._rms = None
+        else:
+            self._peak = record["peak"]
+            self._rms = record["rms"]
+        self._pixmaps = None
+        self.update()
+
+    def has_waveform(self):
+        return self._peak is not None
+
+    def resizeEvent(self, event):
+        self._pixmaps = None
+        super().resizeEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.PaletteChange, QEvent.StyleChange):
+            self._pixmaps = None
+        super().changeEvent(event)
+
+    def _columns(self, width):
+        """Peak and RMS per pixel column, from the stored bins"""
+        import numpy as np
+
+        bins = len(self._peak)
+        starts = np.minimum((np.arange(width) * bins) // width, bins - 1)
+        peak = np.maximum.reduceat(np.asarray(self._peak, np.float32), starts)
+        rms = np.maximum.reduceat(np.asarray(self._rms, np.float32), starts)
+        # Louder tracks fill the height; quiet ones stay visibly quiet
+        scale = 1.0 / max(float(peak.max()), 0.25)
+        return np.minimum(peak * scale, 1.0), np.minimum(rms * scale, 1.0)
+
+    def _render(self, color):
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        width, height = self.width(), self.height()
+        middle = height / 2
+        peak, rms = self._columns(width)
+        painter = QPainter(pixmap)
+        faded = QColor(color)
+        faded.setAlphaF(color.alphaF() * 0.45)
+        painter.setPen(faded)
+        painter.drawLines([QLineF(x + 0.5, middle - p * middle, x + 0.5, middle + p * middle)
+                           for x, p in enumerate(peak.tolist())])
+        painter.setPen(color)
+        painter.drawLines([QLineF(x + 0.5, middle - r * middle, x + 0.5, middle + r * middle)
+                           for x, r in enumerate(rms.tolist())])
+        painter.end()
+        return pixmap
+
+    def _position(self):
+        return QStyle.sliderPositionFromValue(self.minimum(), self.maximum(), self.value(),
+                                              self.width())
+
+    def paintEvent(self, event):
+        if self._peak is None:
+            super().paintEvent(event)
+            return
+        if self._pixmaps is None:
+            played = self.palette().color(QPalette.Highlight)
+            unplayed = QColor(played)
+            unplayed.setAlphaF(0.3)  # Readable on both the dark and light theme
+            self._pixmaps = (self._render(played), self._render(unplayed))
+
+        played, unplayed = self._pixmaps
+        position = self._position()
+        height = self.height()
+        painter = QPainter(self)
+        painter.drawPixmap(QRect(0, 0, position, height), played, _source(played, 0, position))
+        painter.drawPixmap(QRect(position, 0, self.width() - position, height), unplayed,
+                           _source(unplayed, position, self.width() - position))
+        painter.fillRect(QRect(position - 1, 0, 2, height), self.palette().color(QPalette.Highlight))
+
+    def mousePressEvent(self, event):
+        if self._peak is not None and event.button() == Qt.LeftButton:
+            # Jump to the click; QSlider then treats the press as grabbing the handle
+            self.setValue(QStyle.sliderValueFromPosition(self.minimum(), self.maximum(),
+                                                         event.pos().x(), self.width()))
+            super().mousePressEvent(event)
+            if self.isSliderDown():
+                # Report the jump like a drag to that spot
+                self.sliderMoved.emit(self.value())
+            return
+        super().mousePressEvent(event)
+
+
+def _source(pixmap, x, width):
+    """Rectangle in device pixels of pixmap for the logical columns x .. x + width"""
+    ratio = pixmap.devicePixelRatio()
+    return QRect(int(x * ratio), 0, int(width * ratio), pixmap.height())